@@ -0,0 +1,368 @@
+"""
+Curvas e retalhos (patches) de Bézier cúbicos, tesselados adaptativamente:
+o número de subdivisões de cada curva ou retalho é escolhido de forma que
+o erro da aproximação linear, medido em pixels do `Viewport`, fique abaixo
+de uma tolerância.
+"""
+
+import dataclasses
+import pathlib
+
+import numpy as np
+import numpy.typing as npt
+
+import cgpy.colors as cc
+import cgpy.devices as cd
+import cgpy.meshes as cm
+import cgpy.universes as cu
+
+# B(t) = [t^3, t^2, t, 1] @ BERNSTEIN_MATRIX @ control points
+BERNSTEIN_MATRIX = np.asarray(
+    [
+        [-1, 3, -3, 1],
+        [3, -6, 3, 0],
+        [-3, 3, 0, 0],
+        [1, 0, 0, 0],
+    ],
+    dtype=np.float64,
+)
+
+# level `k` divides each parameter interval into 2 ** k segments
+MAX_LEVEL = 6
+
+DEFAULT_TOLERANCE_PIXELS = 0.5
+
+
+def bernstein_basis(ts: npt.ArrayLike) -> cu.FloatArray:
+    """
+    Retorna um array (T, 4) com os polinômios de Bernstein cúbicos
+    avaliados em cada parâmetro de `ts`.
+    """
+    t = np.asarray(ts, dtype=np.float64).reshape(-1, 1)
+    powers = np.concatenate([t**3, t**2, t, np.ones_like(t)], axis=1)
+    basis: cu.FloatArray = powers @ BERNSTEIN_MATRIX
+    return basis
+
+
+def evaluate_curves(control: cu.FloatArray, ts: npt.ArrayLike) -> cu.FloatArray:
+    """
+    Avalia as curvas de pontos de controle (C, 4, D) nos parâmetros `ts`,
+    retornando um array (C, T, D) com a mesma precisão de `control`.
+    """
+    assert control.ndim == 3
+    assert control.shape[1] == 4
+
+    basis = bernstein_basis(ts).astype(control.dtype)
+    points: cu.FloatArray = np.einsum("tk,ckd->ctd", basis, control)
+    return points
+
+
+def evaluate_patches(
+    control: cu.FloatArray,
+    us: npt.ArrayLike,
+    vs: npt.ArrayLike,
+) -> cu.FloatArray:
+    """
+    Avalia os retalhos de pontos de controle (P, 4, 4, 3) na grade `us` x `vs`,
+    retornando um array (P, U, V, 3) com a mesma precisão de `control`.
+    """
+    assert control.ndim == 4
+    assert control.shape[1:3] == (4, 4)
+
+    basis_u = bernstein_basis(us).astype(control.dtype)
+    basis_v = bernstein_basis(vs).astype(control.dtype)
+    points: cu.FloatArray = np.einsum(
+        "ui,pijd,vj->puvd", basis_u, control, basis_v, optimize=True
+    )
+    return points
+
+
+def _level_parameters(level: int) -> cu.FloatArray:
+    return np.linspace(0, 1, 2**level + 1)
+
+
+def _to_pixels(
+    points: cu.FloatArray,
+    trans: cu.Matrix4x4,
+    zpp: float,
+    zcp: float,
+    window: cu.Window,
+    port: cd.Viewport,
+) -> cu.FloatArray:
+    # like the rendering pipeline, but without truncating or validating,
+    # since control points may lie outside the window
+    projected = cu.perspective_project_points(
+        cu.transform_points_3d(cu.make_points4(points, dtype=np.float64), trans),
+        zpp=zpp,
+        zcp=zcp,
+    )
+    normalized = cu.normalize_points_2d(projected, window)
+    scale = np.asarray([port.num_columns - 1, port.num_rows - 1], dtype=np.float64)
+    pixels: cu.FloatArray = normalized * scale
+    return pixels
+
+
+def _levels_for_second_differences(
+    second_differences: cu.FloatArray,
+    tolerance: float,
+    max_level: int,
+) -> npt.NDArray[np.int64]:
+    # with n uniform segments, a cubic deviates from its polyline by at most
+    # |B''| / (8 n^2), and |B''| <= 6 * max |P[i] - 2 P[i + 1] + P[i + 2]|
+    assert tolerance > 0
+
+    segments = np.sqrt(0.75 * second_differences / tolerance)
+    levels = np.ceil(np.log2(np.maximum(segments, 1)))
+    return np.clip(levels, 0, max_level).astype(np.int64)
+
+
+def _max_second_difference(pixels: cu.FloatArray, axis: int) -> cu.FloatArray:
+    # `pixels` has the 4 control points along `axis` and (x, y) in the last axis
+    a, b, c, d = (np.take(pixels, i, axis=axis) for i in range(4))
+    first = np.linalg.norm(a - 2 * b + c, axis=-1)
+    second = np.linalg.norm(b - 2 * c + d, axis=-1)
+    largest: cu.FloatArray = np.maximum(first, second)
+    return largest
+
+
+@dataclasses.dataclass(frozen=True, eq=False)
+class BezierPatches:
+    """
+    Retalhos de Bézier bicúbicos, com pontos de controle (P, 4, 4, 3).
+    As grades avaliadas são guardadas por nível de subdivisão.
+    """
+
+    control: cu.FloatArray
+    _grids: dict[int, cu.FloatArray] = dataclasses.field(
+        default_factory=dict, init=False, repr=False
+    )
+
+    def __post_init__(self) -> None:
+        assert self.control.ndim == 4
+        assert self.control.shape[1:] == (4, 4, 3)
+        assert self.control.dtype in cu.SUPPORTED_PRECISIONS
+
+    @property
+    def num_patches(self) -> int:
+        return int(self.control.shape[0])
+
+    def grid(self, level: int) -> cu.FloatArray:
+        """
+        Retorna os pontos (P, n + 1, n + 1, 3), com n = 2 ** `level`,
+        de todos os retalhos.
+        """
+        assert 0 <= level <= MAX_LEVEL
+
+        if level not in self._grids:
+            ts = _level_parameters(level)
+            self._grids[level] = evaluate_patches(self.control, ts, ts)
+        return self._grids[level]
+
+    def levels_for_view(
+        self,
+        trans: cu.Matrix4x4,
+        zpp: float,
+        zcp: float,
+        window: cu.Window,
+        port: cd.Viewport,
+        tolerance: float = DEFAULT_TOLERANCE_PIXELS,
+        max_level: int = MAX_LEVEL,
+    ) -> npt.NDArray[np.int64]:
+        """
+        Retorna, para cada retalho, o menor nível cujo erro estimado
+        (a partir dos pontos de controle projetados) é de até `tolerance` pixels.
+        """
+        pixels = _to_pixels(
+            self.control.reshape(-1, 3), trans, zpp, zcp, window, port
+        ).reshape(-1, 4, 4, 2)
+
+        # the same level is used in both directions, so the grids can be shared
+        along_u = _max_second_difference(pixels, axis=1).max(axis=1)
+        along_v = _max_second_difference(pixels, axis=2).max(axis=1)
+        return _levels_for_second_differences(
+            np.maximum(along_u, along_v), tolerance, max_level
+        )
+
+    def tessellate(self, levels: npt.NDArray[np.int64]) -> cm.IndexedMesh:
+        """
+        Retorna uma malha com cada retalho `i` subdividido no nível `levels[i]`.
+        Retalhos vizinhos com níveis diferentes não compartilham vértices.
+        """
+        assert levels.shape == (self.num_patches,)
+
+        vertices = []
+        faces = []
+        num_vertices = 0
+        for level in np.unique(levels).tolist():
+            grids = self.grid(level)[levels == level]
+            template = _grid_faces(2**level)
+
+            points_per_patch = grids.shape[1] * grids.shape[2]
+            for i, grid in enumerate(grids):
+                vertices.append(grid.reshape(-1, 3))
+                faces.append(template + num_vertices + i * points_per_patch)
+            num_vertices += len(grids) * points_per_patch
+
+        return cm.make_indexed_mesh(
+            np.concatenate(vertices), np.concatenate(faces), dtype=self.control.dtype
+        )
+
+
+def _grid_faces(n: int) -> npt.NDArray[np.int64]:
+    # two triangles for each cell of a (n + 1) x (n + 1) grid of points
+    index = np.arange((n + 1) ** 2, dtype=np.int64).reshape(n + 1, n + 1)
+    a = index[:-1, :-1].ravel()
+    b = index[1:, :-1].ravel()
+    c = index[1:, 1:].ravel()
+    d = index[:-1, 1:].ravel()
+    return np.concatenate([np.stack([a, b, c], 1), np.stack([a, c, d], 1)])
+
+
+def draw_patches_wireframe(
+    patches: BezierPatches,
+    trans: cu.Matrix4x4,
+    zpp: float,
+    zcp: float,
+    window: cu.Window,
+    port: cd.Viewport,
+    color_id: cc.ColorId,
+    tolerance: float = DEFAULT_TOLERANCE_PIXELS,
+) -> cm.IndexedMesh:
+    """
+    Tessela `patches` para a vista atual e desenha a malha resultante,
+    que é retornada.
+    """
+    levels = patches.levels_for_view(trans, zpp, zcp, window, port, tolerance)
+    mesh = patches.tessellate(levels)
+    cm.draw_mesh_wireframe(mesh, trans, zpp, zcp, window, port, color_id)
+    return mesh
+
+
+@dataclasses.dataclass(frozen=True, eq=False)
+class BezierCurves:
+    """
+    Curvas de Bézier cúbicas, com pontos de controle (C, 4, 3).
+    As curvas avaliadas são guardadas por nível de subdivisão.
+    """
+
+    control: cu.FloatArray
+    _points: dict[int, cu.FloatArray] = dataclasses.field(
+        default_factory=dict, init=False, repr=False
+    )
+
+    def __post_init__(self) -> None:
+        assert self.control.ndim == 3
+        assert self.control.shape[1:] == (4, 3)
+        assert self.control.dtype in cu.SUPPORTED_PRECISIONS
+
+    @property
+    def num_curves(self) -> int:
+        return int(self.control.shape[0])
+
+    def points(self, level: int) -> cu.FloatArray:
+        """
+        Retorna os pontos (C, n + 1, 3), com n = 2 ** `level`, de todas as curvas.
+        """
+        assert 0 <= level <= MAX_LEVEL
+
+        if level not in self._points:
+            self._points[level] = evaluate_curves(
+                self.control, _level_parameters(level)
+            )
+        return self._points[level]
+
+    def levels_for_view(
+        self,
+        trans: cu.Matrix4x4,
+        zpp: float,
+        zcp: float,
+        window: cu.Window,
+        port: cd.Viewport,
+        tolerance: float = DEFAULT_TOLERANCE_PIXELS,
+        max_level: int = MAX_LEVEL,
+    ) -> npt.NDArray[np.int64]:
+        pixels = _to_pixels(
+            self.control.reshape(-1, 3), trans, zpp, zcp, window, port
+        ).reshape(-1, 4, 2)
+        return _levels_for_second_differences(
+            _max_second_difference(pixels, axis=1), tolerance, max_level
+        )
+
+
+def _curve_segments(
+    points: cu.FloatArray,
+    trans: cu.Matrix4x4,
+    zpp: float,
+    zcp: float,
+    window: cu.Window,
+    port: cd.Viewport,
+) -> npt.NDArray[np.int64]:
+    # `points` is (C, n + 1, 3); consecutive points of each curve are joined
+    num_curves, num_points, _ = points.shape
+    projected = cu.perspective_project_points(
+        cu.transform_points_3d(
+            cu.make_points4(points.reshape(-1, 3), dtype=points.dtype), trans
+        ),
+        zpp=zpp,
+        zcp=zcp,
+    )
+    normalized = cu.normalize_points_2d(projected, window)
+    device_points = cd.normalized_points_to_device_points(normalized, port).reshape(
+        num_curves, num_points, 2
+    )
+    segments: npt.NDArray[np.int64] = np.concatenate(
+        [device_points[:, :-1], device_points[:, 1:]], axis=2
+    ).reshape(-1, 4)
+    return segments
+
+
+def draw_curves(
+    curves: BezierCurves,
+    trans: cu.Matrix4x4,
+    zpp: float,
+    zcp: float,
+    window: cu.Window,
+    port: cd.Viewport,
+    color_id: cc.ColorId,
+    tolerance: float = DEFAULT_TOLERANCE_PIXELS,
+) -> None:
+    """
+    Tessela `curves` para a vista atual e desenha as poligonais resultantes
+    com uma única chamada. Como em `cm.draw_mesh_wireframe`,
+    as curvas devem estar inteiramente dentro de `window`.
+    """
+    levels = curves.levels_for_view(trans, zpp, zcp, window, port, tolerance)
+
+    segments = [
+        _curve_segments(
+            curves.points(level)[levels == level], trans, zpp, zcp, window, port
+        )
+        for level in np.unique(levels).tolist()
+    ]
+    if segments:
+        cd.draw_lines(np.concatenate(segments), color_id, port)
+
+
+def load_bezier_patches_bpt(path: pathlib.Path) -> BezierPatches:
+    """
+    Carrega retalhos no formato ".bpt" (usado, por exemplo, pelo
+    bule de Utah): o número de retalhos e, para cada retalho,
+    uma linha "3 3" seguida de 16 linhas "x y z".
+    Usa a precisão do contexto atual.
+    """
+    tokens = pathlib.Path(path).read_text().split()
+    num_patches = int(tokens[0])
+
+    control = np.empty(shape=(num_patches, 4, 4, 3), dtype=cu.get_precision())
+    position = 1
+    for patch in range(num_patches):
+        degree_u, degree_v = int(tokens[position]), int(tokens[position + 1])
+        if (degree_u, degree_v) != (3, 3):
+            raise ValueError(f"apenas retalhos bicúbicos são suportados: {path}")
+        position += 2
+
+        values = tokens[position : position + 48]
+        control[patch] = np.asarray(values, dtype=np.float64).reshape(4, 4, 3)
+        position += 48
+
+    return BezierPatches(control)
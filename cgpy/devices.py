@@ -1,15 +1,32 @@
+import collections
+import contextlib
+import contextvars
 import dataclasses
 import itertools
 import pathlib
+import queue
+import threading
+import time
 import typing
 
 import numpy as np
 import numpy.typing as npt
-import pygame
 
 import cgpy.colors as cc
+import cgpy.kernels as kernels
+import cgpy.png as cpng
 import cgpy.universes as cu
 
+if typing.TYPE_CHECKING:
+    import pygame
+
+T = typing.TypeVar("T")
+
+MAX_INDEXED_COLORS = 256
+
+# number of rows converted to RGB at once when exporting to PNG
+PNG_ROWS_PER_STRIP = 256
+
 
 @dataclasses.dataclass
 class DevicePoint:
@@ -21,6 +38,56 @@ class DevicePoint:
         assert self.y >= 0
 
 
+@dataclasses.dataclass(frozen=True, slots=True)
+class DrawCall:
+    name: str
+    writes: int
+
+
+class WriteDiagnostics:
+    """
+    Conta quantas vezes cada pixel de um `Device` foi escrito
+    e quantos pixels cada chamada de desenho escreveu.
+    """
+
+    def __init__(self, num_rows: int, num_columns: int) -> None:
+        self.counts: kernels.Counts = np.zeros(
+            shape=(num_rows, num_columns), dtype=np.uint32
+        )
+        self.draw_calls: list[DrawCall] = []
+        self.total_writes = 0
+        self._depth = 0
+
+    @property
+    def pixels_written(self) -> int:
+        return int(np.count_nonzero(self.counts))
+
+    @property
+    def overdraw(self) -> float:
+        """
+        Média de escritas por pixel escrito (1.0 significa nenhum desperdício).
+        """
+        pixels_written = self.pixels_written
+        return self.total_writes / pixels_written if pixels_written > 0 else 0.0
+
+    def writes_per_call_name(self) -> dict[str, int]:
+        totals: collections.Counter[str] = collections.Counter()
+        for call in self.draw_calls:
+            totals[call.name] += call.writes
+        return dict(totals)
+
+    def reset(self) -> None:
+        self.counts[:] = 0
+        self.draw_calls.clear()
+        self.total_writes = 0
+
+    def __repr__(self) -> str:
+        return (
+            f"writes={self.total_writes}, pixels_written={self.pixels_written}, "
+            f"overdraw={self.overdraw:.2f}, draw_calls={len(self.draw_calls)}"
+        )
+
+
 class Device:
     def __init__(
         self,
@@ -34,6 +101,24 @@ class Device:
             shape=(num_rows, num_columns),
             dtype=cc.ColorId,
         )
+        self._diagnostics: WriteDiagnostics | None = None
+        self._version = 0
+
+    @classmethod
+    def from_buffer(cls, buffer: npt.NDArray[cc.ColorId]) -> "Device":
+        """
+        Cria um dispositivo que usa `buffer` (sem copiá-lo) como memória.
+        """
+        assert isinstance(buffer, np.ndarray)
+        assert buffer.ndim == 2
+        assert buffer.dtype == cc.ColorId
+
+        assert buffer.shape[0] > 0
+        assert buffer.shape[1] > 0
+
+        device = cls(num_rows=1, num_columns=1)
+        device._buffer = buffer
+        return device
 
     @property
     def num_rows(self) -> int:
@@ -45,8 +130,40 @@ class Device:
 
     @property
     def raw_buffer(self) -> npt.NDArray[cc.ColorId]:
+        # the array may be written through, so it is counted as a modification
+        self._version += 1
         return self._buffer
 
+    @property
+    def version(self) -> int:
+        """
+        Muda a cada acesso a `raw_buffer` e a cada escrita com `set`
+        (ou seja, sempre que o conteúdo pode ter mudado), o que inclui
+        todas as funções de desenho. Quem guardar o array de `raw_buffer`
+        (ou o passado a `from_buffer`) e escrever nele depois
+        deve chamar `mark_modified`.
+        """
+        return self._version
+
+    def mark_modified(self) -> None:
+        self._version += 1
+
+    @property
+    def diagnostics(self) -> WriteDiagnostics | None:
+        return self._diagnostics
+
+    def enable_write_diagnostics(self) -> WriteDiagnostics:
+        """
+        Passa a contar as escritas em cada pixel (veja `WriteDiagnostics`).
+        As funções de desenho ficam mais lentas enquanto a contagem está ativa.
+        """
+        if self._diagnostics is None:
+            self._diagnostics = WriteDiagnostics(self.num_rows, self.num_columns)
+        return self._diagnostics
+
+    def disable_write_diagnostics(self) -> None:
+        self._diagnostics = None
+
     def __repr__(self) -> str:
         return f"rows={self.num_rows}, columns={self.num_columns}"
 
@@ -58,6 +175,10 @@ class Device:
         assert 0 <= y < self.num_rows
 
         self._buffer[y, x] = color_id
+        self._version += 1
+        if self._diagnostics is not None:
+            self._diagnostics.counts[y, x] += 1
+            self._diagnostics.total_writes += 1
 
     def get(self, x: int, y: int) -> cc.ColorId:
         assert 0 <= x < self.num_columns
@@ -135,6 +256,34 @@ def create_device_with_max_size() -> Device:
     return Device(num_columns=info.current_h, num_rows=info.current_w)
 
 
+def create_mapped_device(
+    path: pathlib.Path,
+    num_rows: int,
+    num_columns: int,
+) -> Device:
+    """
+    Cria um dispositivo cujo buffer é um arquivo `.npy` mapeado em memória,
+    para telas que não cabem na RAM: apenas as páginas tocadas pela
+    rasterização são carregadas. Use `raw_buffer.flush()` para gravar
+    as alterações antes de abrir o arquivo em outro processo.
+    """
+    assert num_columns > 0
+    assert num_rows > 0
+
+    buffer = np.lib.format.open_memmap(
+        path, mode="w+", dtype=cc.ColorId, shape=(num_rows, num_columns)
+    )
+    return Device.from_buffer(buffer)
+
+
+def open_mapped_device(path: pathlib.Path, writable: bool = True) -> Device:
+    """
+    Abre um dispositivo criado com `create_mapped_device`.
+    """
+    buffer = np.load(path, mmap_mode="r+" if writable else "r")
+    return Device.from_buffer(buffer)
+
+
 def make_viewport_from_corners(
     pt0: DevicePoint,
     pt1: DevicePoint,
@@ -170,7 +319,95 @@ def normalized_point_to_device_point(
     return DevicePoint(x=port.lower_left.x + x_offset, y=port.lower_left.y + y_offset)
 
 
+def normalized_points_to_device_points(
+    points: cu.FloatArray,
+    port: Viewport,
+    out: npt.NDArray[np.int64] | None = None,
+) -> npt.NDArray[np.int64]:
+    """
+    Versão vetorizada de `normalized_point_to_device_point`.
+    Recebe um array (N, 2) de pontos normalizados e retorna
+    um array (N, 2) com as coordenadas (x, y) no dispositivo,
+    que é escrito em `out`, se ele for informado.
+    """
+    cu.validate_normalized_points(points)
+
+    if out is None:
+        out = np.empty(shape=points.shape, dtype=np.int64)
+    assert out.shape == points.shape
+    assert out.dtype == np.int64
+
+    for column, offset, extent in (
+        (0, port.lower_left.x, port.num_columns - 1),
+        (1, port.lower_left.y, port.num_rows - 1),
+    ):
+        # the unsafe cast truncates, like `astype(np.int64)`
+        np.multiply(points[:, column], extent, out=out[:, column], casting="unsafe")
+        np.add(out[:, column], offset, out=out[:, column])
+    return out
+
+
+def _write_counts(device: Device) -> kernels.Counts:
+    diagnostics = device.diagnostics
+    return kernels.NO_COUNTS if diagnostics is None else diagnostics.counts
+
+
+def _count_writes(device: Device, writes: int) -> None:
+    if device.diagnostics is not None:
+        device.diagnostics.total_writes += writes
+
+
+@contextlib.contextmanager
+def _draw_call(device: Device, name: str) -> typing.Iterator[None]:
+    # records the writes of the outermost drawing function only,
+    # e.g. one `draw_polygon` instead of each of its lines
+    diagnostics = device.diagnostics
+    if diagnostics is None:
+        yield
+        return
+
+    diagnostics._depth += 1
+    writes_before = diagnostics.total_writes
+    try:
+        yield
+    finally:
+        diagnostics._depth -= 1
+        if diagnostics._depth == 0:
+            writes = diagnostics.total_writes - writes_before
+            diagnostics.draw_calls.append(DrawCall(name, writes))
+
+
+# 0 means "never written"; the last color means "at least 7 writes"
+HEATMAP_PALETTE = cc.Palette(
+    [
+        cc.Color(0, 0, 0),
+        cc.Color(0, 0, 1),
+        cc.Color(0, 1, 1),
+        cc.Color(0, 1, 0),
+        cc.Color(1, 1, 0),
+        cc.Color(1, 0.5, 0),
+        cc.Color(1, 0, 0),
+        cc.Color(1, 1, 1),
+    ]
+)
+
+
+def write_count_heatmap(diagnostics: WriteDiagnostics) -> Device:
+    """
+    Retorna um dispositivo para ser exibido com `HEATMAP_PALETTE`,
+    em que a cor de cada pixel indica quantas vezes ele foi escrito.
+    """
+    max_color_id = len(HEATMAP_PALETTE) - 1
+    levels = np.minimum(diagnostics.counts, max_color_id).astype(cc.ColorId)
+    return Device.from_buffer(levels)
+
+
 def draw_viewport(port: Viewport, color_id: cc.ColorId) -> None:
+    with _draw_call(port.device, "draw_viewport"):
+        _draw_viewport(port, color_id)
+
+
+def _draw_viewport(port: Viewport, color_id: cc.ColorId) -> None:
     for x in range(0, port.num_columns):
         port.set(x=x, y=port.inclusive_bottom, color_id=color_id)
         port.set(x=x, y=port.exclusive_top - 1, color_id=color_id)
@@ -185,47 +422,23 @@ def draw_line_bresenham(
     color_id: cc.ColorId,
     port: Viewport,
 ) -> None:
-    # based on:
-    # http://www.roguebasin.com/index.php/Bresenham%27s_Line_Algorithm#Python
-
-    x0 = pt0.x
-    y0 = pt0.y
-    x1 = pt1.x
-    y1 = pt1.y
-    dx = x1 - x0
-    dy = y1 - y0
-
-    # Determine how steep the line is
-    is_steep = abs(dy) > abs(dx)
-
-    # Rotate line
-    if is_steep:
-        x0, y0 = y0, x0
-        x1, y1 = y1, x1
-
-    if x0 > x1:
-        x0, x1 = x1, x0
-        y0, y1 = y1, y0
-
-    # Recalculate differentials
-    dx = x1 - x0
-    dy = y1 - y0
-
-    # Calculate error
-    error = int(dx / 2.0)
-    ystep = 1 if y0 < y1 else -1
-
-    # Iterate over bounding box generating points between start and end
-    y = y0
-    for x in range(x0, x1 + 1):
-        if is_steep:
-            port.set(x=y, y=x, color_id=color_id)
-        else:
-            port.set(x=x, y=y, color_id=color_id)
-        error -= abs(dy)
-        if error < 0:
-            y += ystep
-            error += dx
+    assert pt0 in port
+    assert pt1 in port
+
+    # both endpoints are inside the viewport,
+    # so every pixel of the line is inside it as well
+    device = port.device
+    with _draw_call(device, "draw_line_bresenham"):
+        writes = kernels.draw_line(
+            device.raw_buffer,
+            pt0.x,
+            pt0.y,
+            pt1.x,
+            pt1.y,
+            color_id,
+            counts=_write_counts(device),
+        )
+        _count_writes(device, writes)
 
 
 def draw_polygon(
@@ -235,11 +448,73 @@ def draw_polygon(
 ) -> None:
     assert len(poly) >= 2
 
-    connected = itertools.chain(poly, [poly[0]])
-    for a, b in itertools.pairwise(connected):
-        dev_a = normalized_point_to_device_point(a, port)
-        dev_b = normalized_point_to_device_point(b, port)
-        draw_line_bresenham(dev_a, dev_b, color_id, port)
+    with _draw_call(port.device, "draw_polygon"):
+        connected = itertools.chain(poly, [poly[0]])
+        for a, b in itertools.pairwise(connected):
+            dev_a = normalized_point_to_device_point(a, port)
+            dev_b = normalized_point_to_device_point(b, port)
+            draw_line_bresenham(dev_a, dev_b, color_id, port)
+
+
+def draw_lines(
+    segments: npt.NDArray[np.int64],
+    color_id: cc.ColorId,
+    port: Viewport,
+) -> None:
+    """
+    Desenha vários segmentos com uma única chamada.
+    `segments` é um array (N, 4) com as linhas (x0, y0, x1, y1),
+    em coordenadas do dispositivo.
+    """
+    assert segments.ndim == 2
+    assert segments.shape[1] == 4
+
+    if len(segments) == 0:
+        return
+
+    xs = segments[:, 0::2]
+    ys = segments[:, 1::2]
+    assert xs.min() >= port.inclusive_left
+    assert xs.max() < port.exclusive_right
+    assert ys.min() >= port.inclusive_bottom
+    assert ys.max() < port.exclusive_top
+
+    device = port.device
+    with _draw_call(device, "draw_lines"):
+        writes = kernels.draw_lines(
+            device.raw_buffer, segments, color_id, counts=_write_counts(device)
+        )
+        _count_writes(device, writes)
+
+
+def fill_spans(
+    spans: npt.NDArray[np.int64],
+    color_id: cc.ColorId,
+    port: Viewport,
+) -> None:
+    """
+    Pinta vários trechos horizontais com uma única chamada.
+    `spans` é um array (N, 3) com as linhas (y, x0, x1), em coordenadas
+    do dispositivo, e cada trecho vai de (x0, y) até (x1 - 1, y).
+    """
+    assert spans.ndim == 2
+    assert spans.shape[1] == 3
+
+    spans = spans[spans[:, 1] < spans[:, 2]]
+    if len(spans) == 0:
+        return
+
+    assert spans[:, 0].min() >= port.inclusive_bottom
+    assert spans[:, 0].max() < port.exclusive_top
+    assert spans[:, 1].min() >= port.inclusive_left
+    assert spans[:, 2].max() <= port.exclusive_right
+
+    device = port.device
+    with _draw_call(device, "fill_spans"):
+        writes = kernels.fill_spans(
+            device.raw_buffer, spans, color_id, counts=_write_counts(device)
+        )
+        _count_writes(device, writes)
 
 
 def _flood_fill(
@@ -247,29 +522,34 @@ def _flood_fill(
     new_color: cc.ColorId,
     border_color: cc.ColorId,
     buffer: npt.NDArray[cc.ColorId],
-) -> None:
+    counts: kernels.Counts = kernels.NO_COUNTS,
+) -> int:
+    return kernels.flood_fill(
+        buffer, seed.x, seed.y, new_color, border_color, counts=counts
+    )
 
-    to_visit = [(seed.x, seed.y)]
-    height, width = buffer.shape
 
-    while to_visit:
-        x, y = to_visit.pop()
+def _viewport_write_counts(port: Viewport) -> kernels.Counts:
+    counts = _write_counts(port.device)
+    if counts.size == 0:
+        return counts
+    return counts[
+        port.inclusive_bottom : port.exclusive_top,
+        port.inclusive_left : port.exclusive_right,
+    ]
 
-        if not (0 < x < width):
-            continue
-        if not (0 < y < height):
-            continue
-        if buffer[y, x] in (new_color, border_color):
-            continue
 
-        buffer[y, x] = new_color
-        to_visit.append((x - 1, y))
-        to_visit.append((x + 1, y))
-        to_visit.append((x, y - 1))
-        to_visit.append((x, y + 1))
+def fill_polygon_flood(
+    poly: list[cu.NormalizedPoint],
+    seed: cu.NormalizedPoint,
+    color_id: cc.ColorId,
+    port: Viewport,
+) -> None:
+    with _draw_call(port.device, "fill_polygon_flood"):
+        _fill_polygon_flood(poly, seed, color_id, port)
 
 
-def fill_polygon_flood(
+def _fill_polygon_flood(
     poly: list[cu.NormalizedPoint],
     seed: cu.NormalizedPoint,
     color_id: cc.ColorId,
@@ -279,54 +559,177 @@ def fill_polygon_flood(
     draw_polygon(poly, port, fake_color)
 
     buffer = port.buffer_view
+    counts = _viewport_write_counts(port)
     device_seed = normalized_point_to_device_point(seed, port)
-    _flood_fill(
+    writes = _flood_fill(
         device_seed,
         new_color=fake_color,
         border_color=fake_color,
         buffer=buffer,
+        counts=counts,
     )
+    _count_writes(port.device, writes)
 
-    buffer[buffer == fake_color] = color_id
+    # every pixel of the polygon is written once more, with the actual color
+    filled = buffer == fake_color
+    buffer[filled] = color_id
+    if counts.size > 0:
+        counts[filled] += 1
+    _count_writes(port.device, int(np.count_nonzero(filled)))
 
 
-def _device_to_surface(
+def palette_to_rgb(palette: cc.Palette) -> npt.NDArray[np.uint8]:
+    """
+    Retorna um array (cores, 3) com os bytes RGB de cada cor de `palette`.
+    """
+    assert len(palette) > 0
+
+    # decoding "float colors" to "byte colors"
+    return np.asarray(
+        [
+            (
+                cc.extract_red_channel(c),
+                cc.extract_green_channel(c),
+                cc.extract_blue_channel(c),
+            )
+            for c in palette
+        ],
+        dtype=np.uint8,
+    )
+
+
+def _device_to_rgb(
     device: Device,
-    palette: list[cc.Color],
-) -> pygame.surface.Surface:
+    palette: cc.Palette,
+) -> npt.NDArray[np.uint8]:
+    """
+    Retorna um array (linhas, colunas, 3) RGB com a primeira linha
+    correspondendo ao topo da tela.
+    """
     assert len(palette) > 0
 
     # validating 'color_ids'
     if np.min(device.raw_buffer) < 0 or np.max(device.raw_buffer) >= len(palette):
         raise ValueError("dispositivo contem `ColorId`s fora da `palette`")
 
-    # decoding "float colors" to "byte colors"
-    red_palette = np.asarray([cc.extract_red_channel(c) for c in palette]).flatten()
-    green_palette = np.asarray([cc.extract_green_channel(c) for c in palette]).flatten()
-    blue_palette = np.asarray([cc.extract_blue_channel(c) for c in palette]).flatten()
+    # place origin on the bottom-left part of the screen
+    mirrored_buffer = np.flip(device.raw_buffer, axis=0)
 
-    tranposed_buffer = device.raw_buffer.transpose()
-    flattened_buffer: npt.NDArray[cc.ColorId] = tranposed_buffer.flatten()
+    rgb: npt.NDArray[np.uint8] = palette_to_rgb(palette)[mirrored_buffer]
+    return rgb
 
-    red_buffer = red_palette[flattened_buffer].reshape(tranposed_buffer.shape)
-    green_buffer = green_palette[flattened_buffer].reshape(tranposed_buffer.shape)
-    blue_buffer = blue_palette[flattened_buffer].reshape(tranposed_buffer.shape)
 
-    pixel_array = np.stack((red_buffer, green_buffer, blue_buffer), axis=-1).astype(
-        np.uint8
-    )
+def device_to_surface(
+    device: Device,
+    palette: cc.Palette,
+) -> "pygame.surface.Surface":
+    """
+    Cria uma superfície RGB com as cores de `device` segundo `palette`.
+    """
+    import pygame
+
+    # surfarray expects (columns, rows, channels)
+    pixel_array = _device_to_rgb(device, palette).transpose(1, 0, 2)
+
+    surface = pygame.surfarray.make_surface(pixel_array)
+    return surface
+
+
+def _palette_to_colors(palette: cc.Palette) -> list[tuple[int, int, int]]:
+    return [(r, g, b) for r, g, b in palette_to_rgb(palette).tolist()]
+
+
+def device_to_indexed_surface(device: Device) -> "pygame.surface.Surface":
+    """
+    Cria uma superfície de 8 bits cujos pixels são os `ColorId`s de `device`;
+    as cores são definidas depois, com `Surface.set_palette`.
+    """
+    import pygame
+
+    buffer = device.raw_buffer
+    assert np.min(buffer) >= 0
+    assert np.max(buffer) < MAX_INDEXED_COLORS
 
     # place origin on the bottom-left part of the screen
-    mirrored_array = np.flip(pixel_array, axis=1)
+    indices = np.flip(buffer, axis=0).transpose().astype(np.uint8)
 
-    surface = pygame.surfarray.make_surface(mirrored_array)
+    surface = pygame.Surface((device.num_columns, device.num_rows), depth=8)
+    pygame.surfarray.blit_array(surface, indices)
     return surface
 
 
-def device_to_png(device: Device, palette: list[cc.Color], path: pathlib.Path) -> None:
+def _device_to_rgb_strips(
+    device: Device,
+    palette: cc.Palette,
+    rows_per_strip: int,
+) -> typing.Iterator[npt.NDArray[np.uint8]]:
+    """
+    Versão de `_device_to_rgb` que gera a imagem em faixas
+    de até `rows_per_strip` linhas, do topo para a base.
+    """
+    assert len(palette) > 0
+    assert rows_per_strip > 0
+
+    # validating 'color_ids'
+    if np.min(device.raw_buffer) < 0 or np.max(device.raw_buffer) >= len(palette):
+        raise ValueError("dispositivo contem `ColorId`s fora da `palette`")
+
+    rgb_palette = palette_to_rgb(palette)
+    for top in range(device.num_rows, 0, -rows_per_strip):
+        bottom = max(0, top - rows_per_strip)
+
+        # place origin on the bottom-left part of the screen
+        mirrored_strip = np.flip(device.raw_buffer[bottom:top], axis=0)
+        # `np.take` is considerably faster than fancy indexing here
+        yield np.take(rgb_palette, mirrored_strip, axis=0)
+
+
+def device_to_png(
+    device: Device,
+    palette: cc.Palette,
+    path: pathlib.Path,
+    rows_per_strip: int = PNG_ROWS_PER_STRIP,
+) -> None:
+    """
+    A imagem é convertida e comprimida em faixas de `rows_per_strip` linhas,
+    então a memória usada não depende da altura de `device`
+    (que pode ter sido criado com `create_mapped_device`).
+    """
     assert len(palette) > 0
-    surface = _device_to_surface(device, palette)
-    pygame.image.save(surface, path)
+    cpng.write_png_strips(
+        path,
+        width=device.num_columns,
+        height=device.num_rows,
+        strips=_device_to_rgb_strips(device, palette, rows_per_strip),
+    )
+
+
+def is_quit_event(event: "pygame.event.Event") -> bool:
+    """
+    Indica se `event` pede o fechamento da janela (fechá-la ou pressionar ESC).
+    """
+    import pygame
+
+    if event.type == pygame.QUIT:
+        return True
+    return event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE
+
+
+def present(
+    screen: "pygame.surface.Surface",
+    surface: "pygame.surface.Surface",
+) -> None:
+    """
+    Desenha `surface` em `screen`, redimensionando-a se necessário.
+    """
+    import pygame
+
+    # the window may have been resized by the user
+    if surface.get_size() != screen.get_size():
+        surface = pygame.transform.scale(surface, screen.get_size())
+
+    screen.blit(surface, (0, 0))
+    pygame.display.flip()
 
 
 def show_device(
@@ -334,43 +737,352 @@ def show_device(
     palette: cc.Palette,
     close_after_milliseconds: int = 2000,
 ) -> None:
+    import pygame
+
     assert close_after_milliseconds > 0
     assert len(palette) > 0
 
+    pygame.init()
     screen = pygame.display.set_mode(
-        (device.num_columns, device.num_rows), pygame.NOFRAME
+        (device.num_columns, device.num_rows), pygame.RESIZABLE
     )
 
-    surface = _device_to_surface(device, palette)
-    screen.blit(surface, (0, 0))
-    pygame.display.update()
-    clock = pygame.time.Clock()
-    for _ in range(close_after_milliseconds):
-        clock.tick(1000)
+    surface = device_to_surface(device, palette)
+    present(screen, surface)
+
+    # the process sleeps inside `event.wait` until something happens
+    close_event = pygame.USEREVENT
+    pygame.time.set_timer(close_event, close_after_milliseconds, loops=1)
+    try:
+        while True:
+            event = pygame.event.wait()
+            if event.type == close_event or is_quit_event(event):
+                break
+            if event.type in (pygame.VIDEORESIZE, pygame.WINDOWEXPOSED):
+                present(screen, surface)
+    finally:
+        pygame.time.set_timer(close_event, 0)
+
+
+def _cycle(items: typing.Iterable[T]) -> typing.Iterator[T]:
+    # iterators can be consumed only once, so their items must be cached;
+    # containers (and other re-iterable objects) are simply iterated again
+    if iter(items) is items:
+        yield from itertools.cycle(items)
+        return
+
+    while True:
+        is_empty = True
+        for item in items:
+            is_empty = False
+            yield item
+
+        if is_empty:
+            return
+
+
+class _Frame(typing.NamedTuple):
+    surface: "pygame.surface.Surface"
+    # `None` for RGB surfaces
+    palette: list[tuple[int, int, int]] | None
+
+
+# a frame and its position in the timeline of the animation
+_TimedFrame = tuple[int, _Frame]
+
+
+class _Schedule:
+    """
+    Horário de exibição de cada quadro: o quadro `i` deve ser exibido
+    `i / fps` segundos após o início da animação.
+    """
+
+    def __init__(self, fps: float) -> None:
+        assert fps > 0
+
+        self.period = 1 / fps
+        self._start: float | None = None
+
+    def start(self) -> None:
+        self._start = time.perf_counter()
+
+    def time_of(self, index: int) -> float:
+        assert self._start is not None
+        return self._start + index * self.period
+
+    def is_late(self, index: int) -> bool:
+        """
+        Indica se o horário do quadro seguinte a `index` já chegou,
+        caso em que não vale mais a pena exibir o quadro `index`.
+        """
+        if self._start is None:
+            return False
+        return time.perf_counter() >= self.time_of(index + 1)
+
+
+def _convert_frames(
+    frames: typing.Iterator[tuple[Device, cc.Palette]],
+    schedule: _Schedule,
+) -> typing.Iterator[_TimedFrame]:
+    """
+    Converte os quadros em `pygame.Surface`s, pulando (sem converter)
+    os quadros atrasados. Quadros com até `MAX_INDEXED_COLORS` cores usam
+    superfícies de 8 bits, cuja paleta é aplicada apenas no momento da exibição.
+    """
+    # the device (and its version) converted last, to detect when the
+    # conversion can be reused
+    last_device: Device | None = None
+    last_version = 0
+    indexed_surface = None
+    max_color_id = 0
+
+    for index in itertools.count():
+        fetch_started = time.perf_counter()
+        item = next(frames, None)
+        if item is None:
+            return
+        device, palette = item
+
+        # skipping a late frame only helps if the next one arrives in time,
+        # which is not the case when rendering is slower than the frame rate
+        fetch_seconds = time.perf_counter() - fetch_started
+        if fetch_seconds < schedule.period and schedule.is_late(index):
+            continue
+
+        # the conversion is only redone when the buffer may have changed, so
+        # cycling palettes over the same image costs nothing per pixel; the same
+        # `Device` may be redrawn and yielded again, so its identity is not enough
+        if device is not last_device or device.version != last_version:
+            indexed_surface = None
+            buffer = device.raw_buffer
+            min_color_id = int(np.min(buffer))
+            max_color_id = int(np.max(buffer))
+            if min_color_id >= 0 and max_color_id < MAX_INDEXED_COLORS:
+                indexed_surface = device_to_indexed_surface(device)
+            # after the conversion, which also reads `raw_buffer`
+            last_device = device
+            last_version = device.version
+
+        if indexed_surface is not None and max_color_id < len(palette):
+            yield index, _Frame(indexed_surface, _palette_to_colors(palette))
+        else:
+            yield index, _Frame(device_to_surface(device, palette), None)
+
+
+def _apply_palette(frame: _Frame) -> "pygame.surface.Surface":
+    if frame.palette is not None:
+        frame.surface.set_palette(frame.palette)
+    return frame.surface
+
+
+class _SurfacePrefetcher:
+    """
+    Converte os quadros em uma thread separada, de forma que a renderização
+    (caso `devices` seja um gerador) e a conversão ocorram enquanto
+    o quadro anterior é exibido.
+    """
+
+    _END = object()
+
+    def __init__(
+        self,
+        frames: typing.Iterator[_TimedFrame],
+        max_buffered_frames: int,
+    ) -> None:
+        assert max_buffered_frames > 0
+
+        self._frames = frames
+        self._queue: queue.Queue[typing.Any] = queue.Queue(maxsize=max_buffered_frames)
+        self._stop = threading.Event()
+        # frames are rendered (if `devices` is a generator) in the context
+        # of the caller, so settings such as `cu.precision` still apply
+        self._thread = threading.Thread(
+            target=contextvars.copy_context().run, args=(self._run,), daemon=True
+        )
+        self._thread.start()
+
+    def _run(self) -> None:
+        try:
+            for frame in self._frames:
+                self._queue.put(frame)
+                if self._stop.is_set():
+                    return
+        except BaseException as ex:
+            self._queue.put(ex)
+
+        self._queue.put(self._END)
+
+    def _unwrap(self, item: typing.Any) -> _TimedFrame | None:
+        if item is self._END:
+            self._queue.put(self._END)
+            return None
+        if isinstance(item, BaseException):
+            raise item
+
+        index, frame = item
+        assert isinstance(frame, _Frame)
+        return index, frame
+
+    def wait(self) -> _TimedFrame | None:
+        """
+        Bloqueia até o próximo quadro ficar pronto.
+        Retorna `None` quando não há mais quadros.
+        """
+        return self._unwrap(self._queue.get())
+
+    def poll(self) -> _TimedFrame | None:
+        """
+        Retorna o próximo quadro, se ele já estiver pronto.
+        """
+        try:
+            return self._unwrap(self._queue.get_nowait())
+        except queue.Empty:
+            return None
+
+    def has_ready_frames(self) -> bool:
+        return not self._queue.empty()
+
+    def close(self) -> None:
+        self._stop.set()
+        # unblocks the producer if it is waiting for room in the queue
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+
+
+class _SynchronousFrames:
+    """
+    Mesma interface de `_SurfacePrefetcher`, mas convertendo cada quadro
+    apenas quando ele é pedido, na thread que o pediu.
+    """
+
+    def __init__(self, frames: typing.Iterator[_TimedFrame]) -> None:
+        self._frames = frames
+
+    def wait(self) -> _TimedFrame | None:
+        return next(self._frames, None)
+
+    def poll(self) -> _TimedFrame | None:
+        return self.wait()
+
+    def has_ready_frames(self) -> bool:
+        # converting a frame to check whether it is newer would block
+        return False
+
+    def close(self) -> None:
+        pass
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class PlaybackStats:
+    """
+    Estatísticas de `animate_devices`. A latência de um quadro é o atraso
+    entre o horário previsto para a sua exibição e a exibição de fato;
+    quadros descartados são os que não foram exibidos por estarem atrasados.
+    """
+
+    frames_shown: int
+    frames_dropped: int
+    mean_latency_seconds: float
+    max_latency_seconds: float
 
 
 def animate_devices(
     devices: typing.Iterable[Device],
     palettes: typing.Iterable[cc.Palette],
     fps: int,
-) -> None:
+    max_buffered_frames: int = 2,
+    prefetch: bool = True,
+) -> PlaybackStats:
+    """
+    Exibe `devices` (e `palettes`) ciclicamente, a `fps` quadros por segundo,
+    até a janela ser fechada ou a tecla ESC ser pressionada.
+    O quadro `i` é exibido `i / fps` segundos após o primeiro; quando
+    a conversão (ou a renderização, caso `devices` seja um gerador) atrasa,
+    quadros são descartados para manter esse cronograma. Com `prefetch`,
+    os próximos quadros são convertidos em uma thread separada
+    enquanto o quadro atual é exibido.
+    """
+    import pygame
 
-    screen = None
+    assert fps > 0
 
-    clock = pygame.time.Clock()
-    for device, palette in zip(
-        itertools.cycle(devices),
-        itertools.cycle(palettes),
-    ):
-        if screen is None:
-            screen = pygame.display.set_mode(
-                (device.num_columns, device.num_rows),
-                pygame.NOFRAME,
-            )
-        else:
-            assert screen.get_size() == (device.num_columns, device.num_rows)
+    pygame.init()
 
-        sur = _device_to_surface(device, palette)
-        screen.blit(sur, (0, 0))
-        pygame.display.update()
-        clock.tick(fps)
+    schedule = _Schedule(fps)
+    converted = _convert_frames(zip(_cycle(devices), _cycle(palettes)), schedule)
+    frames: _SurfacePrefetcher | _SynchronousFrames
+    if prefetch:
+        frames = _SurfacePrefetcher(converted, max_buffered_frames=max_buffered_frames)
+    else:
+        frames = _SynchronousFrames(converted)
+
+    latencies: list[float] = []
+    last_index = 0
+    # how long to sleep while the next frame is not ready
+    poll_milliseconds = max(1, round(1000 / fps / 4))
+    try:
+        first = frames.wait()
+        if first is None:
+            return PlaybackStats(0, 0, 0.0, 0.0)
+
+        surface = _apply_palette(first[1])
+        frame_size = surface.get_size()
+        screen = pygame.display.set_mode(frame_size, pygame.RESIZABLE)
+        present(screen, surface)
+        schedule.start()
+        latencies.append(0.0)
+
+        pending: _TimedFrame | None = None
+        while True:
+            if pending is None:
+                pending = frames.poll()
+
+            # a frame may become late while waiting in the queue,
+            # and then it is replaced by a newer one, if there is any
+            while (
+                pending is not None
+                and schedule.is_late(pending[0])
+                and frames.has_ready_frames()
+            ):
+                newer = frames.poll()
+                if newer is None:
+                    break
+                pending = newer
+
+            if pending is None:
+                timeout = poll_milliseconds
+            else:
+                remaining = schedule.time_of(pending[0]) - time.perf_counter()
+                timeout = max(1, round(remaining * 1000))
+
+            event = pygame.event.wait(timeout)
+            if is_quit_event(event):
+                break
+
+            if event.type in (pygame.VIDEORESIZE, pygame.WINDOWEXPOSED):
+                present(screen, surface)
+
+            if pending is None or time.perf_counter() < schedule.time_of(pending[0]):
+                continue
+
+            index, frame = pending
+            pending = None
+
+            surface = _apply_palette(frame)
+            assert surface.get_size() == frame_size
+            present(screen, surface)
+
+            latencies.append(time.perf_counter() - schedule.time_of(index))
+            last_index = index
+    finally:
+        frames.close()
+
+    return PlaybackStats(
+        frames_shown=len(latencies),
+        frames_dropped=last_index + 1 - len(latencies),
+        mean_latency_seconds=float(np.mean(latencies)),
+        max_latency_seconds=max(latencies),
+    )
@@ -1,4 +1,4 @@
-import itertools
+import functools
 import multiprocessing as mp
 import pathlib
 
@@ -6,9 +6,18 @@ import pandas as pd
 
 import cgpy.colors as cc
 import cgpy.devices as cd
+import cgpy.framecache as fc
+import cgpy.meshes as cm
+import cgpy.preview as cp
 import cgpy.universes as cu
 
 DATA_DIR = pathlib.Path(__file__).parent.parent / "data"
+CACHE_DIR = pathlib.Path.home() / ".cache" / "cgpy" / "frames"
+
+ZPP = 40
+ZCP = -45
+WINDOW = cu.Window(-10, -10, 10, 10)
+COLOR_ID = cc.ColorId(1)
 
 
 def load_teapot() -> cu.Object3D:
@@ -28,54 +37,97 @@ def load_teapot() -> cu.Object3D:
     return teapot
 
 
-def generate_device(teapot: cu.Object3D, degrees: float) -> cd.Device:
-    rotation_matrix = cu.make_y_rotation_3d(degrees)
-    rotated_teapot = cu.transform_object(teapot, rotation_matrix)
-
-    observer = cu.create_observer_transformation_matrix(
+def _make_observer() -> cu.Matrix4x4:
+    return cu.create_observer_transformation_matrix(
         normal=cu.make_vector4(0, 0, 1),
         up=cu.make_vector4(0, 1, 0),
         offset=cu.make_vector4(0, 0, 0),
     )
 
-    obj_for_observer_1 = cu.transform_object(rotated_teapot, observer)
-    zpp = 40
-    zcp = -45
-
-    projected_teapot = cu.perspective_project_object(
-        obj_for_observer_1, zpp=zpp, zcp=zcp
-    )
-    teapot_2d = cu.object3d_to_object2d(projected_teapot)
 
+def _make_viewport() -> cd.Viewport:
     device = cd.Device(num_columns=800, num_rows=600)
 
-    port = cd.Viewport(
+    return cd.Viewport(
         lower_left=cd.DevicePoint(0, 0),
         num_columns=device.num_columns,
         num_rows=device.num_rows,
         device=device,
     )
 
-    window = cu.Window(-10, -10, 10, 10)
 
-    for poly in teapot_2d:
-        npoly = cu.normalize_polygon(poly, window)
-        cd.draw_polygon(npoly, port, cc.ColorId(1))
+def load_teapot_mesh() -> cm.IndexedMesh:
+    return cm.load_indexed_mesh_csv(
+        DATA_DIR / "teapot_vertices.csv", DATA_DIR / "teapot_faces.csv"
+    )
+
+
+def generate_device(workspace: cm.MeshWorkspace, degrees: float) -> cd.Device:
+    # the same image as drawing each face of the (rotated, observed and
+    # projected) `load_teapot()` with `draw_polygon`, but reusing the
+    # buffers of `workspace` instead of allocating arrays for every point
+    trans = cu.Matrix4x4(_make_observer() @ cu.make_y_rotation_3d(degrees))
+
+    port = _make_viewport()
+    cm.draw_mesh_wireframe(
+        workspace.mesh, trans, ZPP, ZCP, WINDOW, port, COLOR_ID, workspace=workspace
+    )
 
     print(".", end="")
 
-    return device
+    return port.device
+
+
+# per-process state, set by `_init_worker`
+_worker_workspace: cm.MeshWorkspace | None = None
+
+
+def _init_worker() -> None:
+    # each worker builds its workspace once and reuses it for all its frames
+    global _worker_workspace
+    _worker_workspace = cm.MeshWorkspace(load_teapot_mesh())
 
 
-def animate_teapot() -> None:
-    teapot = load_teapot()
+def _generate_device_in_worker(degrees: float) -> cd.Device:
+    assert _worker_workspace is not None
+    return generate_device(_worker_workspace, degrees)
+
+
+def _frame_key(
+    mesh: cm.IndexedMesh,
+    degrees: float,
+    port: cd.Viewport,
+) -> str:
+    # the key covers exactly what the workers draw
+    return fc.frame_key(
+        mesh_arrays=[mesh.vertices, mesh.faces],
+        matrices=[cu.make_y_rotation_3d(degrees), _make_observer()],
+        window=WINDOW,
+        port=port,
+        extra=(ZPP, ZCP, COLOR_ID),
+    )
+
+
+def animate_teapot(cache_dir: pathlib.Path = CACHE_DIR) -> None:
     number_of_devices = 360
 
-    with mp.Pool() as pool:
-        teapots = itertools.repeat(teapot)
-        timesteps = range(number_of_devices)
-        args = zip(teapots, timesteps)
-        devices = pool.starmap(generate_device, args)
+    # only the frames that are not in the cache are rendered
+    cache = fc.FrameCache(cache_dir)
+    mesh = load_teapot_mesh()
+    port = _make_viewport()
+    keys = [_frame_key(mesh, t, port) for t in range(number_of_devices)]
+    cached = [cache.get(k) for k in keys]
+    missing = [t for t, device in enumerate(cached) if device is None]
+
+    with mp.Pool(initializer=_init_worker) as pool:
+        rendered = pool.map(_generate_device_in_worker, missing)
+
+    for timestep, device in zip(missing, rendered):
+        cache.put(keys[timestep], device)
+        cached[timestep] = device
+
+    devices = [device for device in cached if device is not None]
+    print(f"\n{cache.stats}")
 
     palette = cc.Palette([cc.Color(0, 0, 0), cc.Color(1, 0, 0)])
     cd.animate_devices(
@@ -85,5 +137,35 @@ def animate_teapot() -> None:
     )
 
 
+def _draw_teapot_mesh(
+    mesh: cm.IndexedMesh,
+    degrees: float,
+    port: cd.Viewport,
+    token: cp.CancellationToken,
+) -> None:
+    trans = cu.Matrix4x4(_make_observer() @ cu.make_y_rotation_3d(degrees))
+    cm.draw_mesh_wireframe(mesh, trans, ZPP, ZCP, WINDOW, port, COLOR_ID)
+
+
+def scrub_teapot() -> None:
+    """
+    Gira o bule com as setas do teclado, exibindo primeiro
+    uma prévia em baixa resolução de cada ângulo.
+    """
+    mesh = load_teapot_mesh()
+    port = _make_viewport()
+    renderer: cp.ProgressiveRenderer[float] = cp.ProgressiveRenderer(
+        functools.partial(_draw_teapot_mesh, mesh),
+        num_rows=port.num_rows,
+        num_columns=port.num_columns,
+    )
+
+    palette = cc.Palette([cc.Color(0, 0, 0), cc.Color(1, 0, 0)])
+    try:
+        cp.scrub(renderer, list(range(360)), palette)
+    finally:
+        renderer.close()
+
+
 if __name__ == "__main__":
     animate_teapot()
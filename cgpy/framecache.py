@@ -0,0 +1,175 @@
+"""
+Cache em disco de quadros renderizados, endereçado pelo conteúdo
+(malha, matrizes, `Window`, `Viewport` e versão da biblioteca).
+"""
+
+import collections
+import dataclasses
+import hashlib
+import itertools
+import os
+import pathlib
+import typing
+
+import numpy as np
+import numpy.typing as npt
+
+import cgpy
+import cgpy.devices as cd
+import cgpy.universes as cu
+
+DEFAULT_MAX_BYTES = 256 * 2**20
+
+_SUFFIX = ".npz"
+
+
+@dataclasses.dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups > 0 else 0.0
+
+
+def frame_key(
+    mesh_arrays: typing.Iterable[npt.NDArray[typing.Any]],
+    matrices: typing.Iterable[npt.NDArray[typing.Any]],
+    window: cu.Window,
+    port: cd.Viewport,
+    extra: typing.Iterable[typing.Any] = (),
+) -> str:
+    """
+    Retorna o hash que identifica um quadro.
+    Parâmetros que não são arrays (como `zpp`, `zcp` e a cor)
+    devem ser passados em `extra`.
+    """
+    digest = hashlib.sha256()
+    digest.update(cgpy.__version__.encode())
+
+    for array in itertools.chain(mesh_arrays, matrices):
+        contiguous = np.ascontiguousarray(array)
+        digest.update(f"{contiguous.dtype}{contiguous.shape}".encode())
+        digest.update(contiguous.tobytes())
+
+    digest.update(repr(window).encode())
+    digest.update(
+        repr(
+            (
+                port.lower_left.x,
+                port.lower_left.y,
+                port.num_rows,
+                port.num_columns,
+                port.device.num_rows,
+                port.device.num_columns,
+            )
+        ).encode()
+    )
+    digest.update(repr(tuple(extra)).encode())
+
+    return digest.hexdigest()
+
+
+class FrameCache:
+    """
+    Armazena o buffer de cada `Device` comprimido em `directory`,
+    removendo os quadros usados menos recentemente quando o total
+    ultrapassa `max_bytes`. Deve haver um único processo escrevendo
+    em `directory` por vez.
+    """
+
+    def __init__(
+        self,
+        directory: pathlib.Path,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ) -> None:
+        assert max_bytes > 0
+
+        self._directory = directory
+        self._max_bytes = max_bytes
+        self._stats = CacheStats()
+        self._directory.mkdir(parents=True, exist_ok=True)
+
+        # key -> size in bytes, from the least to the most recently used
+        self._entries: collections.OrderedDict[str, int] = collections.OrderedDict()
+        existing = sorted(
+            self._directory.glob(f"*{_SUFFIX}"), key=lambda p: p.stat().st_mtime
+        )
+        for path in existing:
+            self._entries[path.stem] = path.stat().st_size
+
+        self._evict()
+
+    @property
+    def stats(self) -> CacheStats:
+        return self._stats
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(self._entries.values())
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def _path(self, key: str) -> pathlib.Path:
+        return self._directory / f"{key}{_SUFFIX}"
+
+    def get(self, key: str) -> cd.Device | None:
+        if key not in self._entries:
+            self._stats.misses += 1
+            return None
+
+        path = self._path(key)
+        try:
+            with np.load(path) as arrays:
+                buffer = arrays["buffer"]
+        except FileNotFoundError:
+            del self._entries[key]
+            self._stats.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        os.utime(path)
+        self._stats.hits += 1
+        return cd.Device.from_buffer(buffer)
+
+    def put(self, key: str, device: cd.Device) -> None:
+        path = self._path(key)
+        temporary = path.with_suffix(".tmp")
+        with open(temporary, "wb") as file:
+            np.savez_compressed(file, buffer=device.raw_buffer)
+        os.replace(temporary, path)
+
+        self._entries[key] = path.stat().st_size
+        self._entries.move_to_end(key)
+        self._evict()
+
+    def get_or_render(
+        self,
+        key: str,
+        render: typing.Callable[[], cd.Device],
+    ) -> cd.Device:
+        device = self.get(key)
+        if device is None:
+            device = render()
+            self.put(key, device)
+        return device
+
+    def _evict(self) -> None:
+        total = self.total_bytes
+        while total > self._max_bytes and self._entries:
+            key, size = self._entries.popitem(last=False)
+            self._path(key).unlink(missing_ok=True)
+            total -= size
+            self._stats.evictions += 1
+
+    def clear(self) -> None:
+        for key in list(self._entries):
+            self._path(key).unlink(missing_ok=True)
+        self._entries.clear()
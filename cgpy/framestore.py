@@ -0,0 +1,128 @@
+"""
+Armazenamento comprimido, em memória, de sequências de quadros.
+
+Cada quadro é guardado com um byte por pixel (índice na paleta) e comprimido
+com zlib; entre quadros-chave, apenas o XOR com o quadro anterior é guardado,
+o que é quase todo zero em animações onde pouco muda de um quadro para outro.
+"""
+
+import typing
+import zlib
+
+import numpy as np
+import numpy.typing as npt
+
+import cgpy.colors as cc
+import cgpy.devices as cd
+
+IndexBuffer = npt.NDArray[np.uint8]
+
+MAX_PALETTE_SIZE = 256
+
+
+class FrameStore:
+    def __init__(
+        self,
+        keyframe_interval: int = 30,
+        compression_level: int = 6,
+    ) -> None:
+        assert keyframe_interval > 0
+
+        self._keyframe_interval = keyframe_interval
+        self._compression_level = compression_level
+
+        self._frames: list[bytes] = []
+        self._shape: tuple[int, int] | None = None
+        self._previous: IndexBuffer | None = None
+
+    @property
+    def shape(self) -> tuple[int, int] | None:
+        """
+        (linhas, colunas) dos quadros, ou `None` se a sequência estiver vazia.
+        """
+        return self._shape
+
+    @property
+    def nbytes(self) -> int:
+        return sum(len(f) for f in self._frames)
+
+    @property
+    def uncompressed_nbytes(self) -> int:
+        if self._shape is None:
+            return 0
+        num_rows, num_columns = self._shape
+        return len(self) * num_rows * num_columns * np.dtype(cc.ColorId).itemsize
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    def _is_keyframe(self, index: int) -> bool:
+        return index % self._keyframe_interval == 0
+
+    def append(self, device: cd.Device) -> None:
+        buffer = device.raw_buffer
+        if np.min(buffer) < 0 or np.max(buffer) >= MAX_PALETTE_SIZE:
+            raise ValueError(
+                f"`FrameStore` aceita apenas `ColorId`s entre 0 e {MAX_PALETTE_SIZE - 1}"
+            )
+
+        if self._shape is None:
+            self._shape = (device.num_rows, device.num_columns)
+        assert self._shape == (device.num_rows, device.num_columns)
+
+        current = buffer.astype(np.uint8)
+        if self._is_keyframe(len(self)) or self._previous is None:
+            payload = current
+        else:
+            payload = np.bitwise_xor(current, self._previous)
+
+        self._frames.append(zlib.compress(payload.tobytes(), self._compression_level))
+        self._previous = current
+
+    def extend(self, devices: typing.Iterable[cd.Device]) -> None:
+        for device in devices:
+            self.append(device)
+
+    def _decode_into(self, index: int, indices: IndexBuffer) -> None:
+        decompressed = zlib.decompress(self._frames[index])
+        payload = np.frombuffer(decompressed, dtype=np.uint8).reshape(indices.shape)
+
+        if self._is_keyframe(index):
+            np.copyto(indices, payload)
+        else:
+            np.bitwise_xor(indices, payload, out=indices)
+
+    def __getitem__(self, index: int) -> cd.Device:
+        """
+        Decodifica um único quadro (a partir do quadro-chave anterior)
+        em um novo `Device`.
+        """
+        if index < 0:
+            index += len(self)
+        if not (0 <= index < len(self)):
+            raise IndexError(index)
+
+        assert self._shape is not None
+        indices = np.zeros(shape=self._shape, dtype=np.uint8)
+        keyframe = index - index % self._keyframe_interval
+        for i in range(keyframe, index + 1):
+            self._decode_into(i, indices)
+
+        return cd.Device.from_buffer(indices.astype(cc.ColorId))
+
+    def __iter__(self) -> typing.Iterator[cd.Device]:
+        """
+        Decodifica os quadros em sequência.
+        Para evitar alocações, todos os `Device`s retornados compartilham
+        o mesmo buffer, que é sobrescrito quando o próximo quadro é pedido;
+        use `Device.raw_buffer.copy()` para guardar um quadro.
+        """
+        if self._shape is None:
+            return
+
+        indices = np.zeros(shape=self._shape, dtype=np.uint8)
+        buffer = np.zeros(shape=self._shape, dtype=cc.ColorId)
+        for index in range(len(self)):
+            self._decode_into(index, indices)
+            np.copyto(buffer, indices)
+            yield cd.Device.from_buffer(buffer)
@@ -0,0 +1,152 @@
+"""
+Renderização de várias cópias (instâncias) de uma mesma malha.
+
+Cada instância é descrita por uma matriz 4x4 (modelo -> universo),
+e todas compartilham os vértices e as arestas de uma única `cm.IndexedMesh`.
+"""
+
+import itertools
+
+import numpy as np
+import numpy.typing as npt
+
+import cgpy.colors as cc
+import cgpy.devices as cd
+import cgpy.meshes as cm
+import cgpy.universes as cu
+
+# upper bound of the number of transformed vertices kept in memory at once
+DEFAULT_MAX_POINTS_PER_BATCH = 2**16
+
+
+def validate_instance_matrices(matrices: npt.NDArray[np.floating]) -> None:
+    assert isinstance(matrices, np.ndarray)
+    assert matrices.ndim == 3
+    assert matrices.shape[1:] == (4, 4)
+    assert matrices.dtype in cu.SUPPORTED_PRECISIONS
+
+
+def make_translation_matrices(offsets: npt.ArrayLike) -> cu.FloatArray:
+    """
+    Retorna um array (I, 4, 4) com uma translação para cada linha
+    do array (I, 3) `offsets`; útil para dispor instâncias em grade.
+    """
+    deltas = np.asarray(offsets).reshape(-1, 3)
+
+    matrices = np.zeros(shape=(len(deltas), 4, 4), dtype=cu.get_precision())
+    matrices[:] = np.eye(4)
+    matrices[:, :3, 3] = deltas
+    return matrices
+
+
+def _combined_matrices(
+    matrices: cu.FloatArray,
+    trans: cu.Matrix4x4,
+    dtype: np.dtype[np.floating],
+) -> cu.FloatArray:
+    validate_instance_matrices(matrices)
+    assert trans.shape == (4, 4)
+
+    combined: cu.FloatArray = (trans @ matrices).astype(dtype, copy=False)
+    return combined
+
+
+def _bounding_box_corners(mesh: cm.IndexedMesh) -> cu.FloatArray:
+    lower = mesh.vertices.min(axis=0)
+    upper = mesh.vertices.max(axis=0)
+    corners = list(itertools.product(*zip(lower, upper)))
+    return cu.make_points4(corners, dtype=mesh.vertices.dtype)
+
+
+def visible_instances(
+    mesh: cm.IndexedMesh,
+    matrices: cu.FloatArray,
+    trans: cu.Matrix4x4,
+    zpp: float,
+    zcp: float,
+    window: cu.Window,
+) -> npt.NDArray[np.bool_]:
+    """
+    Retorna um array (I,) indicando quais instâncias podem aparecer em `window`.
+    Apenas os 8 cantos da caixa envolvente de `mesh` são transformados.
+    Instâncias inteiramente atrás do centro de projeção são descartadas;
+    as que estão só em parte atrás dele são mantidas (e recortadas ao desenhar).
+    """
+    combined = _combined_matrices(matrices, trans, mesh.vertices.dtype)
+    if mesh.num_vertices == 0:
+        return np.zeros(shape=len(combined), dtype=bool)
+
+    corners = _bounding_box_corners(mesh)
+    points = corners @ combined.transpose(0, 2, 1)  # (I, 8, 4)
+
+    # the same near plane used to clip the edges
+    near = cm.NEAR_PLANE_FRACTION * abs(zpp - zcp)
+    depths = points[:, :, 2] - zcp if zpp > zcp else zcp - points[:, :, 2]
+    in_front = depths >= near
+
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        projected = cu.perspective_project_points(
+            points.reshape(-1, 4), zpp=zpp, zcp=zcp
+        )
+        normalized = cu.normalize_points_2d(projected, window).reshape(-1, 8, 2)
+
+    # when every corner is in front, the projected box lies within the
+    # bounding rectangle of its projected corners
+    lower = normalized.min(axis=1)
+    upper = normalized.max(axis=1)
+    overlaps = ((upper >= 0) & (lower <= 1)).all(axis=1)
+
+    all_in_front = in_front.all(axis=1)
+    partly_in_front = in_front.any(axis=1) & ~all_in_front
+    visible: npt.NDArray[np.bool_] = (all_in_front & overlaps) | partly_in_front
+    return visible
+
+
+def draw_instances_wireframe(
+    mesh: cm.IndexedMesh,
+    matrices: cu.FloatArray,
+    trans: cu.Matrix4x4,
+    zpp: float,
+    zcp: float,
+    window: cu.Window,
+    port: cd.Viewport,
+    color_id: cc.ColorId,
+    max_points_per_batch: int = DEFAULT_MAX_POINTS_PER_BATCH,
+) -> int:
+    """
+    Equivalente a chamar `cm.draw_mesh_wireframe` com `trans @ matrices[i]`
+    para cada instância, mas descartando antes as instâncias fora de `window`
+    (veja `visible_instances`) e transformando as restantes em lotes de até
+    `max_points_per_batch` vértices. Como em `cm.draw_mesh_wireframe`,
+    instâncias parcialmente visíveis são recortadas.
+    Retorna o número de instâncias desenhadas.
+    """
+    assert max_points_per_batch > 0
+
+    visible = visible_instances(mesh, matrices, trans, zpp=zpp, zcp=zcp, window=window)
+    combined = _combined_matrices(matrices[visible], trans, mesh.vertices.dtype)
+    if len(combined) == 0:
+        return 0
+
+    points = cu.make_points4(mesh.vertices, dtype=mesh.vertices.dtype)
+    batch_size = max(1, max_points_per_batch // max(1, mesh.num_vertices))
+
+    for start in range(0, len(combined), batch_size):
+        batch = combined[start : start + batch_size]
+
+        # a single (V, 4) @ (4, B * 4) product transforms the vertices of
+        # all instances of the batch; the result is laid out as (V, B, 4)
+        stacked = batch.transpose(2, 0, 1).reshape(4, -1)
+        transformed = (points @ stacked).reshape(-1, 4)
+
+        # every instance uses the same edges, applied to its own vertices:
+        # vertex v of the instance b is the row v * len(batch) + b
+        edges = mesh.edges[:, np.newaxis, :] * len(batch)
+        edges = edges + np.arange(len(batch))[np.newaxis, :, np.newaxis]
+
+        segments = cm.project_clipped_edges(
+            transformed, edges.reshape(-1, 2), zpp, zcp, window, port
+        )
+        cd.draw_lines(segments, color_id, port)
+
+    return len(combined)
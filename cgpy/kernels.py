@@ -0,0 +1,331 @@
+"""
+Laços de rasterização que não vetorizam bem com NumPy.
+Os kernels são compilados com numba quando ele está instalado;
+caso contrário, o mesmo código roda como Python puro.
+
+Todos os kernels retornam o número de pixels escritos e, se `counts`
+não for vazio, também somam 1 em `counts` para cada pixel escrito.
+Pixels fora de `buffer` são ignorados: os kernels nunca escrevem fora dele,
+mesmo quando as validações (feitas com `assert`) estão desligadas.
+"""
+
+import importlib.util
+import typing
+
+import numpy as np
+import numpy.typing as npt
+
+import cgpy.colors as cc
+
+PYTHON_BACKEND = "python"
+NUMBA_BACKEND = "numba"
+
+Buffer = npt.NDArray[cc.ColorId]
+Counts = npt.NDArray[np.uint32]
+
+# passed as `counts` when writes are not being counted
+NO_COUNTS: Counts = np.zeros(shape=(0, 0), dtype=np.uint32)
+
+
+def _line_kernel(
+    buffer: Buffer,
+    counts: Counts,
+    x0: int,
+    y0: int,
+    x1: int,
+    y1: int,
+    color_id: cc.ColorId,
+) -> int:
+    # based on:
+    # http://www.roguebasin.com/index.php/Bresenham%27s_Line_Algorithm#Python
+
+    dx = x1 - x0
+    dy = y1 - y0
+
+    # Determine how steep the line is
+    is_steep = abs(dy) > abs(dx)
+
+    # Rotate line
+    if is_steep:
+        x0, y0 = y0, x0
+        x1, y1 = y1, x1
+
+    if x0 > x1:
+        x0, x1 = x1, x0
+        y0, y1 = y1, y0
+
+    # Recalculate differentials
+    dx = x1 - x0
+    dy = y1 - y0
+
+    # Calculate error
+    error = int(dx / 2.0)
+    ystep = 1 if y0 < y1 else -1
+
+    counting = counts.shape[0] > 0
+    num_rows, num_columns = buffer.shape
+    # bounds of the (possibly rotated) x and y
+    x_stop, y_stop = (num_rows, num_columns) if is_steep else (num_columns, num_rows)
+    writes = 0
+
+    # Iterate over bounding box generating points between start and end
+    y = y0
+    for x in range(x0, x1 + 1):
+        if x >= x_stop:
+            break  # x only grows
+        if x >= 0 and 0 <= y < y_stop:
+            if is_steep:
+                buffer[x, y] = color_id
+                if counting:
+                    counts[x, y] += 1
+            else:
+                buffer[y, x] = color_id
+                if counting:
+                    counts[y, x] += 1
+            writes += 1
+        error -= abs(dy)
+        if error < 0:
+            y += ystep
+            error += dx
+
+    return writes
+
+
+def _flood_fill_kernel(
+    buffer: Buffer,
+    counts: Counts,
+    seed_x: int,
+    seed_y: int,
+    new_color: cc.ColorId,
+    border_color: cc.ColorId,
+) -> int:
+    to_visit = [(seed_x, seed_y)]
+    height, width = buffer.shape
+    counting = counts.shape[0] > 0
+    writes = 0
+
+    while to_visit:
+        x, y = to_visit.pop()
+
+        if not (0 < x < width):
+            continue
+        if not (0 < y < height):
+            continue
+        if buffer[y, x] == new_color or buffer[y, x] == border_color:
+            continue
+
+        buffer[y, x] = new_color
+        if counting:
+            counts[y, x] += 1
+        writes += 1
+
+        to_visit.append((x - 1, y))
+        to_visit.append((x + 1, y))
+        to_visit.append((x, y - 1))
+        to_visit.append((x, y + 1))
+
+    return writes
+
+
+def _spans_kernel(
+    buffer: Buffer,
+    counts: Counts,
+    spans: npt.NDArray[np.int64],
+    color_id: cc.ColorId,
+) -> int:
+    counting = counts.shape[0] > 0
+    num_rows, num_columns = buffer.shape
+    writes = 0
+
+    for i in range(spans.shape[0]):
+        y = spans[i, 0]
+        if not (0 <= y < num_rows):
+            continue
+
+        start = max(spans[i, 1], 0)
+        stop = min(spans[i, 2], num_columns)
+        for x in range(start, stop):
+            buffer[y, x] = color_id
+            if counting:
+                counts[y, x] += 1
+        writes += max(0, stop - start)
+
+    return writes
+
+
+_LineKernel = typing.Callable[[Buffer, Counts, int, int, int, int, cc.ColorId], int]
+_FloodFillKernel = typing.Callable[
+    [Buffer, Counts, int, int, cc.ColorId, cc.ColorId], int
+]
+_LinesKernel = typing.Callable[[Buffer, Counts, npt.NDArray[np.int64], cc.ColorId], int]
+_SpansKernel = _LinesKernel
+
+
+def _make_lines_kernel(line: _LineKernel) -> _LinesKernel:
+    # `line` is a free variable so the numba backend can pass its compiled version
+    def _lines_kernel(
+        buffer: Buffer,
+        counts: Counts,
+        segments: npt.NDArray[np.int64],
+        color_id: cc.ColorId,
+    ) -> int:
+        writes = 0
+        for i in range(segments.shape[0]):
+            writes += line(
+                buffer,
+                counts,
+                segments[i, 0],
+                segments[i, 1],
+                segments[i, 2],
+                segments[i, 3],
+                color_id,
+            )
+        return writes
+
+    return _lines_kernel
+
+
+class _Kernels(typing.NamedTuple):
+    line: _LineKernel
+    flood_fill: _FloodFillKernel
+    lines: _LinesKernel
+    spans: _SpansKernel
+
+
+_PYTHON_KERNELS = _Kernels(
+    line=_line_kernel,
+    flood_fill=_flood_fill_kernel,
+    lines=_make_lines_kernel(_line_kernel),
+    spans=_spans_kernel,
+)
+_compiled: dict[str, _Kernels] = {PYTHON_BACKEND: _PYTHON_KERNELS}
+
+
+def _compile_numba_kernels() -> _Kernels:
+    import numba
+
+    def jit(func: typing.Any) -> typing.Any:
+        return numba.njit(cache=True, nogil=True)(func)
+
+    line = jit(_line_kernel)
+    return _Kernels(
+        line=line,
+        flood_fill=jit(_flood_fill_kernel),
+        lines=jit(_make_lines_kernel(line)),
+        spans=jit(_spans_kernel),
+    )
+
+
+def available_backends() -> list[str]:
+    backends = [PYTHON_BACKEND]
+    if importlib.util.find_spec("numba") is not None:
+        backends.append(NUMBA_BACKEND)
+    return backends
+
+
+def _default_backend() -> str:
+    return available_backends()[-1]
+
+
+_active_backend = _default_backend()
+
+
+def get_backend() -> str:
+    return _active_backend
+
+
+def set_backend(name: str) -> None:
+    """
+    Seleciona o backend usado pelos kernels.
+    A compilação do numba é feita (uma única vez) no primeiro desenho
+    feito com esse backend, não aqui.
+    """
+    global _active_backend
+
+    if name not in available_backends():
+        raise ValueError(f"backend indisponível: {name}")
+
+    _active_backend = name
+
+
+def _kernels() -> _Kernels:
+    kernels = _compiled.get(_active_backend)
+    if kernels is None:
+        kernels = _compile_numba_kernels()
+        _compiled[_active_backend] = kernels
+    return kernels
+
+
+def draw_line(
+    buffer: Buffer,
+    x0: int,
+    y0: int,
+    x1: int,
+    y1: int,
+    color_id: cc.ColorId,
+    counts: Counts = NO_COUNTS,
+) -> int:
+    """
+    Desenha o segmento (x0, y0)-(x1, y1), inclusive, diretamente em `buffer`.
+    Os pixels do segmento que ficam fora do buffer não são desenhados.
+    """
+    return int(_kernels().line(buffer, counts, x0, y0, x1, y1, cc.ColorId(color_id)))
+
+
+def draw_lines(
+    buffer: Buffer,
+    segments: npt.NDArray[np.int64],
+    color_id: cc.ColorId,
+    counts: Counts = NO_COUNTS,
+) -> int:
+    """
+    Desenha cada linha (x0, y0, x1, y1) do array (N, 4) `segments`.
+    """
+    return int(
+        _kernels().lines(
+            buffer,
+            counts,
+            np.ascontiguousarray(segments, dtype=np.int64),
+            cc.ColorId(color_id),
+        )
+    )
+
+
+def flood_fill(
+    buffer: Buffer,
+    seed_x: int,
+    seed_y: int,
+    new_color: cc.ColorId,
+    border_color: cc.ColorId,
+    counts: Counts = NO_COUNTS,
+) -> int:
+    return int(
+        _kernels().flood_fill(
+            buffer,
+            counts,
+            seed_x,
+            seed_y,
+            cc.ColorId(new_color),
+            cc.ColorId(border_color),
+        )
+    )
+
+
+def fill_spans(
+    buffer: Buffer,
+    spans: npt.NDArray[np.int64],
+    color_id: cc.ColorId,
+    counts: Counts = NO_COUNTS,
+) -> int:
+    """
+    Pinta, para cada linha (y, x0, x1) do array (N, 3) `spans`,
+    os pixels de (x0, y) até (x1 - 1, y).
+    """
+    return int(
+        _kernels().spans(
+            buffer,
+            counts,
+            np.ascontiguousarray(spans, dtype=np.int64),
+            cc.ColorId(color_id),
+        )
+    )
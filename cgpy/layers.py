@@ -0,0 +1,177 @@
+import dataclasses
+
+import numpy as np
+
+import cgpy.colors as cc
+import cgpy.devices as cd
+
+# (x0, y0, x1, y1), with x1 and y1 exclusive
+Region = tuple[int, int, int, int]
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class Layer:
+    """
+    Camada de um `LayeredDevice`: um `Device` próprio, do tamanho da
+    caixa envolvente do objeto, posicionado em `lower_left`.
+    Pixels com a cor `transparent` deixam as camadas de baixo visíveis.
+    """
+
+    name: str
+    lower_left: cd.DevicePoint
+    device: cd.Device
+    z_order: int
+    transparent: cc.ColorId
+
+    @property
+    def region(self) -> Region:
+        return (
+            self.lower_left.x,
+            self.lower_left.y,
+            self.lower_left.x + self.device.num_columns,
+            self.lower_left.y + self.device.num_rows,
+        )
+
+    @property
+    def viewport(self) -> cd.Viewport:
+        """
+        `Viewport` que cobre toda a camada, para ser usado com as funções de desenho.
+        """
+        return cd.Viewport(
+            lower_left=cd.DevicePoint(0, 0),
+            num_rows=self.device.num_rows,
+            num_columns=self.device.num_columns,
+            device=self.device,
+        )
+
+
+def _intersection(a: Region, b: Region) -> Region | None:
+    x0 = max(a[0], b[0])
+    y0 = max(a[1], b[1])
+    x1 = min(a[2], b[2])
+    y1 = min(a[3], b[3])
+    if x0 >= x1 or y0 >= y1:
+        return None
+    return (x0, y0, x1, y1)
+
+
+class LayeredDevice(cd.Device):
+    """
+    Dispositivo cujo buffer é a composição de várias camadas.
+    Depois de redesenhar uma camada, chame `invalidate`; `composite`
+    recompõe apenas as regiões invalidadas desde a última composição.
+    """
+
+    def __init__(
+        self,
+        num_rows: int,
+        num_columns: int,
+        background: cc.ColorId = cc.ColorId(0),
+    ) -> None:
+        super().__init__(num_rows=num_rows, num_columns=num_columns)
+        self._background = background
+        self._buffer[:] = background
+        self._layers: dict[str, Layer] = {}
+        self._dirty: list[Region] = []
+
+    @property
+    def layers(self) -> list[Layer]:
+        """
+        Camadas, da mais baixa para a mais alta.
+        """
+        return sorted(self._layers.values(), key=lambda layer: layer.z_order)
+
+    def __getitem__(self, name: str) -> Layer:
+        return self._layers[name]
+
+    def add_layer(
+        self,
+        name: str,
+        lower_left: cd.DevicePoint,
+        num_rows: int,
+        num_columns: int,
+        z_order: int = 0,
+        transparent: cc.ColorId = cc.ColorId(0),
+    ) -> Layer:
+        assert name not in self._layers
+
+        layer = Layer(
+            name=name,
+            lower_left=lower_left,
+            device=cd.Device(num_rows=num_rows, num_columns=num_columns),
+            z_order=z_order,
+            transparent=transparent,
+        )
+        layer.device.raw_buffer[:] = transparent
+        self._check_inside(layer)
+
+        self._layers[name] = layer
+        self._dirty.append(layer.region)
+        return layer
+
+    def _check_inside(self, layer: Layer) -> None:
+        x0, y0, x1, y1 = layer.region
+        assert cd.DevicePoint(x0, y0) in self
+        assert cd.DevicePoint(x1 - 1, y1 - 1) in self
+
+    def remove_layer(self, name: str) -> None:
+        layer = self._layers.pop(name)
+        self._dirty.append(layer.region)
+
+    def invalidate(self, name: str) -> None:
+        """
+        Indica que o conteúdo da camada `name` foi alterado.
+        """
+        self._dirty.append(self._layers[name].region)
+
+    def move_layer(self, name: str, lower_left: cd.DevicePoint) -> None:
+        """
+        Move a camada sem redesenhá-la.
+        """
+        old = self._layers[name]
+        new = dataclasses.replace(old, lower_left=lower_left)
+        self._check_inside(new)
+
+        self._layers[name] = new
+        self._dirty.append(old.region)
+        self._dirty.append(new.region)
+
+    def set_z_order(self, name: str, z_order: int) -> None:
+        layer = self._layers[name]
+        self._layers[name] = dataclasses.replace(layer, z_order=z_order)
+        self._dirty.append(layer.region)
+
+    def composite(self) -> int:
+        """
+        Recompõe as regiões invalidadas e retorna quantos pixels foram recompostos.
+        """
+        layers = self.layers
+        num_pixels = 0
+
+        # the same region may have been invalidated more than once
+        for dirty in dict.fromkeys(self._dirty):
+            x0, y0, x1, y1 = dirty
+            target = self._buffer[y0:y1, x0:x1]
+            target[:] = self._background
+            num_pixels += target.size
+
+            for layer in layers:
+                overlap = _intersection(dirty, layer.region)
+                if overlap is None:
+                    continue
+
+                ox0, oy0, ox1, oy1 = overlap
+                lx, ly = layer.lower_left.x, layer.lower_left.y
+                source = layer.device.raw_buffer[
+                    oy0 - ly : oy1 - ly, ox0 - lx : ox1 - lx
+                ]
+                np.copyto(
+                    self._buffer[oy0:oy1, ox0:ox1],
+                    source,
+                    where=source != layer.transparent,
+                )
+
+        if self._dirty:
+            self.mark_modified()
+        self._dirty.clear()
+        return num_pixels
@@ -0,0 +1,688 @@
+import dataclasses
+import functools
+import heapq
+import itertools
+import pathlib
+
+import numpy as np
+import numpy.typing as npt
+
+import cgpy.colors as cc
+import cgpy.devices as cd
+import cgpy.universes as cu
+
+IndexArray = npt.NDArray[np.int64]
+
+# points closer to the center of projection than this fraction of its distance
+# to the projection plane are clipped, so projecting never divides by ~0
+NEAR_PLANE_FRACTION = 1e-3
+
+
+@dataclasses.dataclass(frozen=True, eq=False)
+class IndexedMesh:
+    """
+    Malha de triângulos indexada:
+    `vertices` é um array (V, 3) de coordenadas cartesianas
+    e `faces` é um array (F, 3) de índices em `vertices`.
+    A precisão (float32 ou float64) de `vertices` é usada
+    em todo o pipeline de renderização da malha.
+    """
+
+    vertices: cu.FloatArray
+    faces: IndexArray
+
+    def __post_init__(self) -> None:
+        assert self.vertices.ndim == 2
+        assert self.vertices.shape[1] == 3
+        assert self.vertices.dtype in cu.SUPPORTED_PRECISIONS
+
+        assert self.faces.ndim == 2
+        assert self.faces.shape[1] == 3
+        assert self.faces.dtype == np.int64
+
+        if self.num_faces > 0:
+            assert self.faces.min() >= 0
+            assert self.faces.max() < self.num_vertices
+
+    @property
+    def num_vertices(self) -> int:
+        return int(self.vertices.shape[0])
+
+    @property
+    def num_faces(self) -> int:
+        return int(self.faces.shape[0])
+
+    @functools.cached_property
+    def edges(self) -> IndexArray:
+        """
+        Array (E, 2) com as arestas da malha, sem repetições.
+        """
+        pairs = np.concatenate(
+            [self.faces[:, [0, 1]], self.faces[:, [1, 2]], self.faces[:, [2, 0]]]
+        )
+        unique: IndexArray = np.unique(np.sort(pairs, axis=1), axis=0)
+        return unique
+
+    def astype(self, dtype: npt.DTypeLike) -> "IndexedMesh":
+        """
+        Retorna a mesma malha com os vértices na precisão `dtype`.
+        """
+        return IndexedMesh(vertices=self.vertices.astype(dtype), faces=self.faces)
+
+    def __repr__(self) -> str:
+        return f"vertices={self.num_vertices}, faces={self.num_faces}"
+
+
+def make_indexed_mesh(
+    vertices: npt.ArrayLike,
+    faces: npt.ArrayLike,
+    dtype: npt.DTypeLike | None = None,
+) -> IndexedMesh:
+    """
+    Se `dtype` não for informado, usa a precisão do contexto atual
+    (veja `cu.set_precision`).
+    """
+    dtype = cu.get_precision() if dtype is None else np.dtype(dtype)
+    return IndexedMesh(
+        vertices=np.asarray(vertices, dtype=dtype).reshape(-1, 3),
+        faces=np.asarray(faces, dtype=np.int64).reshape(-1, 3),
+    )
+
+
+def load_indexed_mesh_csv(
+    vertices_path: pathlib.Path,
+    faces_path: pathlib.Path,
+) -> IndexedMesh:
+    """
+    Carrega uma malha no formato dos arquivos em `cgpy/data`
+    (a primeira coluna de cada arquivo é o índice da linha).
+    """
+    vertices = np.loadtxt(vertices_path, delimiter=",", skiprows=1, ndmin=2)
+    faces = np.loadtxt(faces_path, delimiter=",", skiprows=1, ndmin=2, dtype=np.int64)
+    return make_indexed_mesh(vertices[:, 1:], faces[:, 1:])
+
+
+def mesh_to_object3d(mesh: IndexedMesh) -> cu.Object3D:
+    vertices = [cu.make_vector4(*v) for v in mesh.vertices]
+    return [cu.Face([vertices[i] for i in face]) for face in mesh.faces]
+
+
+def object3d_to_mesh(obj: cu.Object3D) -> IndexedMesh:
+    """
+    Converte um `Object3D` formado apenas por triângulos em uma malha indexada.
+    Vértices repetidos são unificados e a ordem das faces é preservada.
+    """
+    for face in obj:
+        assert len(face) == 3
+        for vec in face:
+            cu.validate_vector4(vec)
+
+    if len(obj) == 0:
+        return make_indexed_mesh(np.empty(shape=(0, 3)), np.empty(shape=(0, 3)))
+
+    points = np.asarray([[vec[:3, 0] for vec in face] for face in obj])
+    vertices, inverse = np.unique(points.reshape(-1, 3), axis=0, return_inverse=True)
+    return make_indexed_mesh(vertices, inverse.reshape(-1, 3))
+
+
+class MeshWorkspace:
+    """
+    Buffers, dimensionados para `mesh`, onde cada etapa do pipeline
+    (transformação, projeção e mapeamento para o dispositivo) escreve
+    o seu resultado. Reutilizar o mesmo `MeshWorkspace` em todos os quadros
+    evita alocar esses arrays a cada quadro; os arrays retornados pelas
+    funções que o recebem são sobrescritos na próxima chamada.
+    Não deve ser usado por mais de uma thread ao mesmo tempo.
+    """
+
+    def __init__(self, mesh: IndexedMesh) -> None:
+        dtype = mesh.vertices.dtype
+
+        self.mesh = mesh
+        # the homogeneous coordinates never change
+        self.points = cu.make_points4(mesh.vertices, dtype=dtype)
+        self.points.flags.writeable = False
+
+        self.projected = np.empty(shape=(mesh.num_vertices, 4), dtype=dtype)
+        self.normalized = np.empty(shape=(mesh.num_vertices, 2), dtype=dtype)
+        self.device_points = np.empty(shape=(mesh.num_vertices, 2), dtype=np.int64)
+        self.segments = np.empty(shape=(len(mesh.edges), 4), dtype=np.int64)
+
+    def __repr__(self) -> str:
+        return f"MeshWorkspace({self.mesh!r})"
+
+
+def _workspace_for(mesh: IndexedMesh, workspace: MeshWorkspace | None) -> MeshWorkspace:
+    if workspace is None:
+        return MeshWorkspace(mesh)
+
+    assert workspace.mesh is mesh
+    return workspace
+
+
+def project_mesh_vertices(
+    mesh: IndexedMesh,
+    trans: cu.Matrix4x4,
+    zpp: float,
+    zcp: float,
+    workspace: MeshWorkspace | None = None,
+) -> cu.FloatArray:
+    """
+    Aplica `trans` e a projeção perspectiva aos vértices de `mesh`,
+    retornando um array (V, 4) com a mesma precisão dos vértices
+    (que, com `workspace`, é `workspace.projected`).
+    """
+    work = _workspace_for(mesh, workspace)
+    cu.transform_points_3d(work.points, trans, out=work.projected)
+    return cu.perspective_project_points(
+        work.projected, zpp=zpp, zcp=zcp, out=work.projected
+    )
+
+
+def _near_depth(zpp: float, zcp: float) -> float:
+    assert zpp != zcp
+    return NEAR_PLANE_FRACTION * abs(zpp - zcp)
+
+
+def _depths(points: cu.FloatArray, zpp: float, zcp: float) -> cu.FloatArray:
+    # distance in front of the center of projection, towards the projection plane
+    depths: cu.FloatArray = points[:, 2] - zcp if zpp > zcp else zcp - points[:, 2]
+    return depths
+
+
+def _all_in_front(points: cu.FloatArray, zpp: float, zcp: float) -> bool:
+    # reductions, so checking does not allocate arrays as large as `points`
+    if points.size == 0:
+        return True
+    z = points[:, 2]
+    min_depth = z.min() - zcp if zpp > zcp else zcp - z.max()
+    return bool(min_depth >= _near_depth(zpp, zcp))
+
+
+def _all_inside_window(normalized: cu.FloatArray) -> bool:
+    return normalized.size == 0 or bool(normalized.min() >= 0 and normalized.max() <= 1)
+
+
+def _clip_to_near_plane(
+    starts: cu.FloatArray,
+    ends: cu.FloatArray,
+    zpp: float,
+    zcp: float,
+) -> tuple[cu.FloatArray, cu.FloatArray]:
+    # endpoints behind the near plane are moved, along their segment, onto it;
+    # segments entirely behind it are dropped
+    near = starts.dtype.type(_near_depth(zpp, zcp))
+    start_depths = _depths(starts, zpp, zcp)
+    end_depths = _depths(ends, zpp, zcp)
+
+    keep = (start_depths >= near) | (end_depths >= near)
+    starts, ends = starts[keep], ends[keep]
+    start_depths, end_depths = start_depths[keep], end_depths[keep]
+
+    # one endpoint is in front of the plane, so the denominators are not zero
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t_start = (near - start_depths) / (end_depths - start_depths)
+        t_end = (near - end_depths) / (start_depths - end_depths)
+        clipped_starts = np.where(
+            (start_depths < near)[:, np.newaxis],
+            starts + t_start[:, np.newaxis] * (ends - starts),
+            starts,
+        )
+        clipped_ends = np.where(
+            (end_depths < near)[:, np.newaxis],
+            ends + t_end[:, np.newaxis] * (starts - ends),
+            ends,
+        )
+    return clipped_starts, clipped_ends
+
+
+def _clip_to_unit_square(
+    starts: cu.FloatArray,
+    ends: cu.FloatArray,
+) -> cu.FloatArray:
+    # Liang-Barsky: each segment is starts + t * (ends - starts), 0 <= t <= 1,
+    # and each side of the square narrows the range of t
+    dtype = starts.dtype
+    deltas = ends - starts
+    t_enter = np.zeros(shape=len(starts), dtype=dtype)
+    t_leave = np.ones(shape=len(starts), dtype=dtype)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for axis in (0, 1):
+            origin = starts[:, axis]
+            delta = deltas[:, axis]
+            t_low = (0 - origin) / delta
+            t_high = (1 - origin) / delta
+
+            parallel = delta == 0
+            t_enter = np.where(
+                parallel, t_enter, np.maximum(t_enter, np.minimum(t_low, t_high))
+            )
+            t_leave = np.where(
+                parallel, t_leave, np.minimum(t_leave, np.maximum(t_low, t_high))
+            )
+            outside = parallel & ((origin < 0) | (origin > 1))
+            t_leave = np.where(outside, dtype.type(-1), t_leave)
+
+    # endpoints that are not clipped keep their exact coordinates
+    segments = np.stack(
+        [
+            np.where(
+                (t_enter > 0)[:, np.newaxis],
+                starts + t_enter[:, np.newaxis] * deltas,
+                starts,
+            ),
+            np.where(
+                (t_leave < 1)[:, np.newaxis],
+                starts + t_leave[:, np.newaxis] * deltas,
+                ends,
+            ),
+        ],
+        axis=1,
+    )[t_enter <= t_leave]
+
+    # rounding may leave clipped endpoints slightly outside the square
+    clipped: cu.FloatArray = np.clip(segments, 0, 1, out=segments)
+    return clipped
+
+
+def project_clipped_edges(
+    points: cu.FloatArray,
+    edges: IndexArray,
+    zpp: float,
+    zcp: float,
+    window: cu.Window,
+    port: cd.Viewport,
+) -> IndexArray:
+    """
+    Projeta e recorta as arestas `edges` (um array (E, 2) de índices em
+    `points`, um array (N, 4) de pontos já transformados): o que está atrás
+    do centro de projeção ou fora de `window` é descartado. Retorna um array
+    (M, 4) de segmentos (x0, y0, x1, y1) em coordenadas de `port`.
+    Arestas que não precisam ser recortadas são desenhadas com os mesmos
+    pixels que teriam sem o recorte.
+    """
+    cu.validate_points4(points)
+    assert edges.ndim == 2
+    assert edges.shape[1] == 2
+
+    in_front = _depths(points, zpp, zcp) >= _near_depth(zpp, zcp)
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        # the points behind the near plane are not used from here on
+        projected = cu.perspective_project_points(points, zpp=zpp, zcp=zcp)
+        normalized = cu.normalize_points_2d(projected, window)
+        inside = in_front & ((normalized >= 0) & (normalized <= 1)).all(axis=1)
+
+    starts, ends = edges[:, 0], edges[:, 1]
+    unclipped = inside[starts] & inside[ends]
+    clipped = ~unclipped
+
+    near_starts, near_ends = _clip_to_near_plane(
+        points[starts[clipped]], points[ends[clipped]], zpp, zcp
+    )
+    normalized_starts, normalized_ends = (
+        cu.normalize_points_2d(
+            cu.perspective_project_points(p, zpp=zpp, zcp=zcp), window
+        )
+        for p in (near_starts, near_ends)
+    )
+
+    segments = np.concatenate(
+        [
+            np.stack(
+                [normalized[starts[unclipped]], normalized[ends[unclipped]]], axis=1
+            ),
+            _clip_to_unit_square(normalized_starts, normalized_ends),
+        ]
+    )
+    device_points = cd.normalized_points_to_device_points(segments.reshape(-1, 2), port)
+    return device_points.reshape(-1, 4)
+
+
+def draw_mesh_wireframe(
+    mesh: IndexedMesh,
+    trans: cu.Matrix4x4,
+    zpp: float,
+    zcp: float,
+    window: cu.Window,
+    port: cd.Viewport,
+    color_id: cc.ColorId,
+    workspace: MeshWorkspace | None = None,
+) -> None:
+    """
+    Equivalente a transformar, projetar e desenhar (com `draw_polygon`)
+    todas as faces de `mesh`, mas processando todos os vértices de uma vez
+    e desenhando cada aresta uma única vez. Com `workspace`,
+    nenhum array proporcional ao tamanho da malha é alocado.
+    Partes da malha fora de `window` ou atrás do centro de projeção
+    são recortadas (veja `project_clipped_edges`); apenas nesse caso
+    arrays temporários são alocados.
+    """
+    work = _workspace_for(mesh, workspace)
+    transformed = cu.transform_points_3d(work.points, trans, out=work.projected)
+    if _all_in_front(transformed, zpp, zcp):
+        projected = cu.perspective_project_points(
+            transformed, zpp=zpp, zcp=zcp, out=work.projected
+        )
+        normalized = cu.normalize_points_2d(projected, window, out=work.normalized)
+        if _all_inside_window(normalized):
+            device_points = cd.normalized_points_to_device_points(
+                normalized, port, out=work.device_points
+            )
+
+            # with mode="raise", `np.take` writes to a temporary before copying
+            # to `out`; the edges are valid indices, so clipping never changes them
+            np.take(
+                device_points,
+                mesh.edges,
+                axis=0,
+                out=work.segments.reshape(-1, 2, 2),
+                mode="clip",
+            )
+            cd.draw_lines(work.segments, color_id, port)
+            return
+
+    # the workspace buffers were overwritten by the projection
+    points = cu.transform_points_3d(work.points, trans)
+    segments = project_clipped_edges(points, mesh.edges, zpp, zcp, window, port)
+    cd.draw_lines(segments, color_id, port)
+
+
+def _face_quadrics(vertices: cu.FloatArray, faces: IndexArray) -> cu.FloatArray:
+    # fundamental error quadric (Garland & Heckbert, 1997) of each face plane
+    v0 = vertices[faces[:, 0]]
+    v1 = vertices[faces[:, 1]]
+    v2 = vertices[faces[:, 2]]
+
+    normals = np.cross(v1 - v0, v2 - v0)
+    norms = np.linalg.norm(normals, axis=1)
+    non_degenerate = norms > 0
+    normals[non_degenerate] /= norms[non_degenerate, np.newaxis]
+    normals[~non_degenerate] = 0
+
+    planes = np.empty(shape=(len(faces), 4))
+    planes[:, :3] = normals
+    planes[:, 3] = -np.einsum("ij,ij->i", normals, v0)
+
+    quadrics: cu.FloatArray = planes[:, :, np.newaxis] * planes[:, np.newaxis, :]
+    return quadrics
+
+
+def _optimal_collapse(
+    quadric: cu.FloatArray,
+    pos_a: cu.FloatArray,
+    pos_b: cu.FloatArray,
+) -> tuple[float, cu.FloatArray]:
+    system = quadric.copy()
+    system[3] = (0, 0, 0, 1)
+
+    candidates = [pos_a, pos_b, (pos_a + pos_b) / 2]
+    if abs(np.linalg.det(system)) > 1e-12:
+        candidates.insert(0, np.linalg.solve(system, (0, 0, 0, 1))[:3])
+
+    best_cost = np.inf
+    best_position = candidates[-1]
+    for position in candidates:
+        homogeneous = np.append(position, 1)
+        cost = float(homogeneous @ quadric @ homogeneous)
+        if cost < best_cost:
+            best_cost = cost
+            best_position = position
+
+    return best_cost, best_position
+
+
+def _flips_faces(
+    positions: cu.FloatArray,
+    faces: IndexArray,
+    moved_faces: list[int],
+    moved_vertex: int,
+    new_position: cu.FloatArray,
+) -> bool:
+    if len(moved_faces) == 0:
+        return False
+
+    corners = positions[faces[moved_faces]]
+    before = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+
+    corners[faces[moved_faces] == moved_vertex] = new_position
+    after = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+
+    return bool((np.einsum("ij,ij->i", before, after) < 0).any())
+
+
+def simplify_mesh(mesh: IndexedMesh, target_num_faces: int) -> IndexedMesh:
+    """
+    Simplifica `mesh` por colapso de arestas guiado por quádricas de erro
+    (Garland & Heckbert, 1997) até restarem no máximo `target_num_faces` faces,
+    ou até não haver mais colapsos válidos.
+    """
+    assert target_num_faces > 0
+
+    if mesh.num_faces <= target_num_faces:
+        return mesh
+
+    # the quadrics are always accumulated in float64
+    positions = mesh.vertices.astype(np.float64)
+    faces = mesh.faces.copy()
+    face_alive = np.ones(shape=mesh.num_faces, dtype=bool)
+    num_faces = mesh.num_faces
+
+    face_quadrics = _face_quadrics(positions, faces)
+    quadrics = np.zeros(shape=(mesh.num_vertices, 4, 4))
+    for corner in range(3):
+        np.add.at(quadrics, faces[:, corner], face_quadrics)
+
+    vertex_faces: list[set[int]] = [set() for _ in range(mesh.num_vertices)]
+    for face_index, face in enumerate(faces):
+        for vertex in face:
+            vertex_faces[vertex].add(face_index)
+
+    versions = np.zeros(shape=mesh.num_vertices, dtype=np.int64)
+    vertex_alive = np.ones(shape=mesh.num_vertices, dtype=bool)
+
+    # entries are invalidated lazily, by comparing vertex versions
+    heap: list[tuple[float, int, int, int, int, int, cu.FloatArray]] = []
+    counter = itertools.count()
+
+    def push(a: int, b: int) -> None:
+        cost, position = _optimal_collapse(
+            quadrics[a] + quadrics[b], positions[a], positions[b]
+        )
+        entry = (cost, next(counter), a, b, versions[a], versions[b], position)
+        heapq.heappush(heap, entry)
+
+    for a, b in mesh.edges:
+        push(a, b)
+
+    while num_faces > target_num_faces and heap:
+        _, _, keep, remove, keep_version, remove_version, position = heapq.heappop(heap)
+        if not (vertex_alive[keep] and vertex_alive[remove]):
+            continue
+        if versions[keep] != keep_version or versions[remove] != remove_version:
+            continue
+
+        shared = vertex_faces[keep] & vertex_faces[remove]
+        if _flips_faces(
+            positions, faces, list(vertex_faces[keep] - shared), keep, position
+        ) or _flips_faces(
+            positions, faces, list(vertex_faces[remove] - shared), remove, position
+        ):
+            continue
+
+        for face_index in shared:
+            face_alive[face_index] = False
+            num_faces -= 1
+            for vertex in faces[face_index]:
+                vertex_faces[vertex].discard(face_index)
+
+        for face_index in vertex_faces[remove]:
+            faces[face_index][faces[face_index] == remove] = keep
+            vertex_faces[keep].add(face_index)
+
+        vertex_faces[remove].clear()
+        vertex_alive[remove] = False
+        positions[keep] = position
+        quadrics[keep] += quadrics[remove]
+        versions[keep] += 1
+
+        neighbours = set(faces[list(vertex_faces[keep])].ravel().tolist()) - {keep}
+        for neighbour in neighbours:
+            push(keep, neighbour)
+
+    # dropping unused vertices
+    kept_faces = faces[face_alive]
+    used_vertices, new_faces = np.unique(kept_faces, return_inverse=True)
+    return make_indexed_mesh(
+        positions[used_vertices],
+        new_faces.reshape(-1, 3),
+        dtype=mesh.vertices.dtype,
+    )
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class LevelsOfDetail:
+    """
+    Versões de uma mesma malha, da mais detalhada (`levels[0]`)
+    para a menos detalhada.
+    """
+
+    levels: tuple[IndexedMesh, ...]
+
+    def __post_init__(self) -> None:
+        assert len(self.levels) > 0
+        for finer, coarser in itertools.pairwise(self.levels):
+            assert finer.num_faces > coarser.num_faces
+
+    @property
+    def full_detail(self) -> IndexedMesh:
+        return self.levels[0]
+
+
+def build_levels_of_detail(
+    mesh: IndexedMesh,
+    reduction: float = 0.5,
+    min_num_faces: int = 64,
+) -> LevelsOfDetail:
+    """
+    Cada nível tem (aproximadamente) `reduction` vezes as faces do anterior,
+    e é obtido simplificando o nível anterior.
+    """
+    assert 0 < reduction < 1
+    assert min_num_faces > 0
+
+    levels = [mesh]
+    while True:
+        target = int(levels[-1].num_faces * reduction)
+        if target < min_num_faces:
+            break
+
+        simplified = simplify_mesh(levels[-1], target)
+        if simplified.num_faces >= levels[-1].num_faces:
+            break
+
+        levels.append(simplified)
+
+    return LevelsOfDetail(tuple(levels))
+
+
+def save_levels_of_detail(lods: LevelsOfDetail, path: pathlib.Path) -> None:
+    arrays: dict[str, cu.FloatArray | IndexArray] = {}
+    for i, level in enumerate(lods.levels):
+        arrays[f"vertices_{i}"] = level.vertices
+        arrays[f"faces_{i}"] = level.faces
+
+    with open(path, "wb") as file:
+        np.savez_compressed(file, **arrays)  # type: ignore[arg-type]
+
+
+def load_levels_of_detail(path: pathlib.Path) -> LevelsOfDetail:
+    with np.load(path) as arrays:
+        num_levels = len(arrays.files) // 2
+        levels = tuple(
+            IndexedMesh(
+                vertices=arrays[f"vertices_{i}"],
+                faces=arrays[f"faces_{i}"],
+            )
+            for i in range(num_levels)
+        )
+
+    return LevelsOfDetail(levels)
+
+
+def load_or_build_levels_of_detail(
+    mesh: IndexedMesh,
+    cache_path: pathlib.Path,
+    reduction: float = 0.5,
+    min_num_faces: int = 64,
+) -> LevelsOfDetail:
+    """
+    Usa os níveis salvos em `cache_path` (normalmente ao lado do arquivo da malha)
+    se eles tiverem sido gerados a partir de `mesh`; caso contrário,
+    gera os níveis e os salva em `cache_path`.
+    """
+    if cache_path.exists():
+        lods = load_levels_of_detail(cache_path)
+        if np.array_equal(lods.full_detail.vertices, mesh.vertices) and np.array_equal(
+            lods.full_detail.faces, mesh.faces
+        ):
+            return lods
+
+    lods = build_levels_of_detail(
+        mesh, reduction=reduction, min_num_faces=min_num_faces
+    )
+    save_levels_of_detail(lods, cache_path)
+    return lods
+
+
+def projected_pixel_area(
+    mesh: IndexedMesh,
+    trans: cu.Matrix4x4,
+    zpp: float,
+    zcp: float,
+    window: cu.Window,
+    port: cd.Viewport,
+) -> float:
+    """
+    Estima quantos pixels de `port` a malha ocupa,
+    projetando apenas os 8 cantos da sua caixa envolvente.
+    """
+    if mesh.num_vertices == 0:
+        return 0.0
+
+    lower = mesh.vertices.min(axis=0)
+    upper = mesh.vertices.max(axis=0)
+    corners = np.asarray(list(itertools.product(*zip(lower, upper))))
+
+    points = cu.make_points4(corners, dtype=mesh.vertices.dtype)
+    points = cu.transform_points_3d(points, trans)
+    projected = cu.perspective_project_points(points, zpp=zpp, zcp=zcp)
+    normalized = np.clip(cu.normalize_points_2d(projected, window), 0, 1)
+
+    extent = normalized.max(axis=0) - normalized.min(axis=0)
+    return float(extent[0] * port.num_columns * extent[1] * port.num_rows)
+
+
+def select_level_of_detail(
+    lods: LevelsOfDetail,
+    trans: cu.Matrix4x4,
+    zpp: float,
+    zcp: float,
+    window: cu.Window,
+    port: cd.Viewport,
+    pixels_per_face: float = 4.0,
+) -> IndexedMesh:
+    """
+    Escolhe o nível menos detalhado que ainda tem, aproximadamente,
+    uma face para cada `pixels_per_face` pixels ocupados pela malha.
+    """
+    assert pixels_per_face > 0
+
+    area = projected_pixel_area(lods.full_detail, trans, zpp, zcp, window, port)
+    wanted_faces = area / pixels_per_face
+
+    for level in reversed(lods.levels):
+        if level.num_faces >= wanted_faces:
+            return level
+
+    return lods.full_detail
@@ -0,0 +1,184 @@
+"""
+Renderização de malhas que não cabem na memória.
+
+As malhas ficam em arquivos `.npy` (`vertices.npy`, (V, 3) float32 ou float64, e
+`faces.npy`, (F, 3) int64), abertos com `np.memmap`, e são processadas
+em blocos de faces, cujo tamanho é limitado por um teto de memória.
+"""
+
+import dataclasses
+import itertools
+import pathlib
+import typing
+
+import numpy as np
+import numpy.typing as npt
+
+import cgpy.colors as cc
+import cgpy.devices as cd
+import cgpy.meshes as cm
+import cgpy.universes as cu
+
+VERTICES_FILE_NAME = "vertices.npy"
+FACES_FILE_NAME = "faces.npy"
+
+# upper bound of the temporary memory used per face of a block:
+# indices, corners in every stage of the pipeline and the 3 edges
+BYTES_PER_FACE = 1024
+
+DEFAULT_MAX_MEMORY_BYTES = 64 * 2**20
+
+
+@dataclasses.dataclass(frozen=True, eq=False)
+class MappedMesh:
+    """
+    Malha indexada cujos arrays são mapeados de arquivos.
+    Ao contrário de `cm.IndexedMesh`, os índices não são validados
+    na construção, pois isso exigiria ler o arquivo inteiro.
+    """
+
+    vertices: cu.FloatArray
+    faces: npt.NDArray[np.int64]
+
+    def __post_init__(self) -> None:
+        assert self.vertices.ndim == 2
+        assert self.vertices.shape[1] == 3
+        assert self.vertices.dtype in cu.SUPPORTED_PRECISIONS
+
+        assert self.faces.ndim == 2
+        assert self.faces.shape[1] == 3
+        assert self.faces.dtype == np.int64
+
+    @property
+    def num_vertices(self) -> int:
+        return int(self.vertices.shape[0])
+
+    @property
+    def num_faces(self) -> int:
+        return int(self.faces.shape[0])
+
+
+def save_mesh_npy(mesh: cm.IndexedMesh, directory: pathlib.Path) -> None:
+    directory.mkdir(parents=True, exist_ok=True)
+    np.save(directory / VERTICES_FILE_NAME, mesh.vertices)
+    np.save(directory / FACES_FILE_NAME, mesh.faces)
+
+
+def open_mesh_npy(directory: pathlib.Path) -> MappedMesh:
+    return MappedMesh(
+        vertices=np.load(directory / VERTICES_FILE_NAME, mmap_mode="r"),
+        faces=np.load(directory / FACES_FILE_NAME, mmap_mode="r"),
+    )
+
+
+def _count_data_rows(path: pathlib.Path) -> int:
+    with open(path, "rb") as file:
+        # the first line is the header
+        return sum(1 for _ in file) - 1
+
+
+def _convert_csv_to_npy(
+    csv_path: pathlib.Path,
+    npy_path: pathlib.Path,
+    dtype: npt.DTypeLike,
+    block_rows: int,
+) -> None:
+    num_rows = _count_data_rows(csv_path)
+    output = np.lib.format.open_memmap(
+        npy_path, mode="w+", dtype=dtype, shape=(num_rows, 3)
+    )
+
+    with open(csv_path, encoding="UTF8") as file:
+        next(file)  # header
+
+        start = 0
+        while lines := list(itertools.islice(file, block_rows)):
+            block = np.loadtxt(lines, delimiter=",", dtype=dtype, ndmin=2)
+            # the first column is the row index
+            output[start : start + len(block)] = block[:, 1:]
+            start += len(block)
+
+    output.flush()
+    del output
+
+
+def convert_csv_mesh_to_npy(
+    vertices_path: pathlib.Path,
+    faces_path: pathlib.Path,
+    directory: pathlib.Path,
+    block_rows: int = 2**16,
+    dtype: npt.DTypeLike = np.float64,
+) -> MappedMesh:
+    """
+    Converte uma malha no formato dos arquivos em `cgpy/data`
+    para o formato usado por este módulo, lendo `block_rows` linhas por vez.
+    Os vértices são gravados com precisão `dtype`.
+    """
+    assert block_rows > 0
+    assert np.dtype(dtype) in cu.SUPPORTED_PRECISIONS
+
+    directory.mkdir(parents=True, exist_ok=True)
+    _convert_csv_to_npy(
+        vertices_path, directory / VERTICES_FILE_NAME, dtype, block_rows
+    )
+    _convert_csv_to_npy(faces_path, directory / FACES_FILE_NAME, np.int64, block_rows)
+    return open_mesh_npy(directory)
+
+
+def faces_per_block(max_memory_bytes: int) -> int:
+    assert max_memory_bytes >= BYTES_PER_FACE
+    return max_memory_bytes // BYTES_PER_FACE
+
+
+def iter_face_blocks(
+    mesh: MappedMesh,
+    max_memory_bytes: int = DEFAULT_MAX_MEMORY_BYTES,
+) -> typing.Iterator[npt.NDArray[np.int64]]:
+    block_size = faces_per_block(max_memory_bytes)
+    for start in range(0, mesh.num_faces, block_size):
+        yield np.asarray(mesh.faces[start : start + block_size])
+
+
+def _block_edges(faces: npt.NDArray[np.int64]) -> npt.NDArray[np.int64]:
+    # (a, b), (b, c), (c, a) for every face, as indices into the block's corners,
+    # oriented from the lower to the higher vertex index like `cm.IndexedMesh.edges`,
+    # so an edge shared by faces of different blocks is always clipped the same way
+    corners = np.arange(faces.size, dtype=np.int64).reshape(-1, 3)
+    following = np.roll(corners, shift=-1, axis=1)
+    edges = np.stack([corners, following], axis=2).reshape(-1, 2)
+
+    vertices = faces.ravel()[edges]
+    reversed_edges = vertices[:, 0] > vertices[:, 1]
+    edges[reversed_edges] = edges[reversed_edges, ::-1]
+    return edges
+
+
+def draw_mesh_wireframe_streaming(
+    mesh: MappedMesh,
+    trans: cu.Matrix4x4,
+    zpp: float,
+    zcp: float,
+    window: cu.Window,
+    port: cd.Viewport,
+    color_id: cc.ColorId,
+    max_memory_bytes: int = DEFAULT_MAX_MEMORY_BYTES,
+    dtype: npt.DTypeLike | None = None,
+) -> None:
+    """
+    Equivalente a `cm.draw_mesh_wireframe`, mas cada bloco de faces passa
+    por transformação, projeção, normalização e rasterização antes de o
+    próximo ser lido; apenas as páginas dos vértices usados são carregadas.
+    O pipeline usa a precisão `dtype` (por padrão, a dos vértices).
+    """
+    dtype = mesh.vertices.dtype if dtype is None else np.dtype(dtype)
+    assert dtype in cu.SUPPORTED_PRECISIONS
+
+    for faces in iter_face_blocks(mesh, max_memory_bytes):
+        corners = np.asarray(mesh.vertices[faces.ravel()])
+
+        points = cu.make_points4(corners, dtype=dtype)
+        points = cu.transform_points_3d(points, trans)
+        segments = cm.project_clipped_edges(
+            points, _block_edges(faces), zpp, zcp, window, port
+        )
+        cd.draw_lines(segments, color_id, port)
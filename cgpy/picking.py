@@ -0,0 +1,216 @@
+import math
+
+import numpy as np
+import numpy.typing as npt
+
+import cgpy.devices as cd
+import cgpy.meshes as cm
+import cgpy.universes as cu
+
+
+class FacePicker:
+    """
+    Índice espacial (grade uniforme sobre o `Viewport`) das faces projetadas
+    de uma malha, para descobrir qual face está sob um pixel do dispositivo.
+
+    Para um `Object3D` formado por triângulos, use `cm.object3d_to_mesh`:
+    os índices retornados são as posições das faces no `Object3D` original.
+    """
+
+    def __init__(
+        self,
+        mesh: cm.IndexedMesh,
+        trans: cu.Matrix4x4,
+        zpp: float,
+        zcp: float,
+        window: cu.Window,
+        port: cd.Viewport,
+        cell_size: int = 16,
+    ) -> None:
+        assert cell_size > 0
+
+        self._mesh = mesh
+        self._window = window
+        self._port = port
+        self._cell_size = cell_size
+
+        self._num_cells_x = math.ceil(port.num_columns / cell_size)
+        self._num_cells_y = math.ceil(port.num_rows / cell_size)
+        self._cells: list[set[int]] = [
+            set() for _ in range(self._num_cells_x * self._num_cells_y)
+        ]
+
+        # (x, y) of each vertex, in continuous device coordinates
+        self._screen = np.zeros(shape=(mesh.num_vertices, 2))
+        self._depth = np.zeros(shape=mesh.num_vertices)
+
+        # inclusive range of cells (x0, y0, x1, y1) covered by each face;
+        # faces outside the grid have x0 > x1
+        self._ranges = np.zeros(shape=(mesh.num_faces, 4), dtype=np.int64)
+        self._ranges[:, 0] = 1
+
+        self.update(trans, zpp=zpp, zcp=zcp)
+
+    @property
+    def mesh(self) -> cm.IndexedMesh:
+        return self._mesh
+
+    def update(self, trans: cu.Matrix4x4, zpp: float, zcp: float) -> int:
+        """
+        Atualiza o índice para uma nova transformação (de observador).
+        Apenas as faces que mudaram de célula são reindexadas;
+        retorna quantas foram.
+        """
+        vertices = self._mesh.vertices
+        points = cu.make_points4(vertices, dtype=vertices.dtype)
+        points = cu.transform_points_3d(points, trans)
+        projected = cu.perspective_project_points(points, zpp=zpp, zcp=zcp)
+        normalized = cu.normalize_points_2d(projected, self._window)
+
+        port = self._port
+        self._screen[:, 0] = port.lower_left.x + normalized[:, 0] * (
+            port.num_columns - 1
+        )
+        self._screen[:, 1] = port.lower_left.y + normalized[:, 1] * (port.num_rows - 1)
+        self._depth[:] = points[:, 2] - zcp
+
+        new_ranges = self._cell_ranges()
+        changed = np.flatnonzero((new_ranges != self._ranges).any(axis=1))
+        for face in changed.tolist():
+            for cell in self._range_cells(self._ranges[face]):
+                self._cells[cell].discard(face)
+            for cell in self._range_cells(new_ranges[face]):
+                self._cells[cell].add(face)
+
+        self._ranges = new_ranges
+        return len(changed)
+
+    def _cell_ranges(self) -> npt.NDArray[np.int64]:
+        corners = self._screen[self._mesh.faces]
+        lower = corners.min(axis=1) - self._port_origin()
+        upper = corners.max(axis=1) - self._port_origin()
+
+        ranges = np.empty(shape=(self._mesh.num_faces, 4), dtype=np.int64)
+        ranges[:, :2] = np.floor(lower / self._cell_size)
+        ranges[:, 2:] = np.floor(upper / self._cell_size)
+
+        ranges[:, [0, 2]] = np.clip(ranges[:, [0, 2]], 0, self._num_cells_x - 1)
+        ranges[:, [1, 3]] = np.clip(ranges[:, [1, 3]], 0, self._num_cells_y - 1)
+
+        outside = (
+            (upper[:, 0] < 0)
+            | (upper[:, 1] < 0)
+            | (lower[:, 0] >= self._port.num_columns)
+            | (lower[:, 1] >= self._port.num_rows)
+        )
+        ranges[outside] = (1, 0, 0, 0)
+        return ranges
+
+    def _port_origin(self) -> npt.NDArray[np.float64]:
+        return np.asarray(
+            (self._port.lower_left.x, self._port.lower_left.y), dtype=np.float64
+        )
+
+    def _range_cells(self, cell_range: npt.NDArray[np.int64]) -> list[int]:
+        x0, y0, x1, y1 = cell_range.tolist()
+        return [
+            y * self._num_cells_x + x
+            for y in range(y0, y1 + 1)
+            for x in range(x0, x1 + 1)
+        ]
+
+    def _candidates(self, x0: int, y0: int, x1: int, y1: int) -> npt.NDArray[np.int64]:
+        origin_x = self._port.lower_left.x
+        origin_y = self._port.lower_left.y
+        cell_range = np.asarray(
+            (
+                (x0 - origin_x) // self._cell_size,
+                (y0 - origin_y) // self._cell_size,
+                (x1 - origin_x) // self._cell_size,
+                (y1 - origin_y) // self._cell_size,
+            ),
+            dtype=np.int64,
+        )
+
+        faces: set[int] = set()
+        for cell in self._range_cells(cell_range):
+            faces |= self._cells[cell]
+
+        return np.fromiter(faces, dtype=np.int64, count=len(faces))
+
+    def pick(self, point: cd.DevicePoint) -> int | None:
+        """
+        Retorna o índice da face mais próxima do observador que cobre
+        o pixel `point`, ou `None` se nenhuma face o cobre.
+        """
+        assert point in self._port
+
+        candidates = self._candidates(point.x, point.y, point.x, point.y)
+        if len(candidates) == 0:
+            return None
+
+        # barycentric coordinates of the pixel center in each candidate
+        corners = self._screen[self._mesh.faces[candidates]]
+        a = corners[:, 0]
+        ab = corners[:, 1] - a
+        ac = corners[:, 2] - a
+        ap = np.asarray((point.x + 0.5, point.y + 0.5)) - a
+
+        denominator = ab[:, 0] * ac[:, 1] - ab[:, 1] * ac[:, 0]
+        valid = denominator != 0
+        denominator[~valid] = 1
+
+        v = (ap[:, 0] * ac[:, 1] - ap[:, 1] * ac[:, 0]) / denominator
+        w = (ab[:, 0] * ap[:, 1] - ab[:, 1] * ap[:, 0]) / denominator
+        u = 1 - v - w
+
+        inside = valid & (u >= 0) & (v >= 0) & (w >= 0)
+        if not inside.any():
+            return None
+
+        depths = self._depth[self._mesh.faces[candidates]]
+        depth = u * depths[:, 0] + v * depths[:, 1] + w * depths[:, 2]
+        depth[~inside] = np.inf
+
+        return int(candidates[np.argmin(depth)])
+
+    def select_rectangle(
+        self,
+        pt0: cd.DevicePoint,
+        pt1: cd.DevicePoint,
+        fully_inside: bool = True,
+    ) -> npt.NDArray[np.int64]:
+        """
+        Retorna (em ordem crescente) os índices das faces que estão
+        inteiramente dentro do retângulo com cantos `pt0` e `pt1`,
+        ou, se `fully_inside` for falso, das faces cuja caixa envolvente
+        o intersecta.
+        """
+        assert pt0 in self._port
+        assert pt1 in self._port
+
+        x0, x1 = sorted((pt0.x, pt1.x))
+        y0, y1 = sorted((pt0.y, pt1.y))
+
+        candidates = self._candidates(x0, y0, x1, y1)
+        corners = self._screen[self._mesh.faces[candidates]]
+        lower = corners.min(axis=1)
+        upper = corners.max(axis=1)
+
+        # the rectangle covers the pixels [x0, x1 + 1) x [y0, y1 + 1)
+        if fully_inside:
+            selected = (
+                (lower[:, 0] >= x0)
+                & (lower[:, 1] >= y0)
+                & (upper[:, 0] < x1 + 1)
+                & (upper[:, 1] < y1 + 1)
+            )
+        else:
+            selected = (
+                (upper[:, 0] >= x0)
+                & (upper[:, 1] >= y0)
+                & (lower[:, 0] < x1 + 1)
+                & (lower[:, 1] < y1 + 1)
+            )
+
+        return np.sort(candidates[selected])
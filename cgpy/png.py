@@ -0,0 +1,119 @@
+"""
+Escrita de imagens PNG usando apenas NumPy e zlib (sem SDL/pygame).
+"""
+
+import pathlib
+import struct
+import typing
+import zlib
+
+import numpy as np
+import numpy.typing as npt
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+_BIT_DEPTH = 8
+_COLOR_TYPE_RGB = 2
+_FILTER_NONE = 0
+
+
+def _chunk(chunk_type: bytes, data: bytes) -> bytes:
+    crc = zlib.crc32(chunk_type + data)
+    return struct.pack(">I", len(data)) + chunk_type + data + struct.pack(">I", crc)
+
+
+def validate_rgb_image(image: npt.NDArray[np.uint8]) -> None:
+    assert isinstance(image, np.ndarray)
+    assert image.ndim == 3
+    assert image.shape[0] > 0
+    assert image.shape[1] > 0
+    assert image.shape[2] == 3
+    assert image.dtype == np.uint8
+
+
+def _header(width: int, height: int) -> bytes:
+    return struct.pack(
+        ">IIBBBBB",
+        width,
+        height,
+        _BIT_DEPTH,
+        _COLOR_TYPE_RGB,
+        0,  # compression method
+        0,  # filter method
+        0,  # interlace method
+    )
+
+
+def _scanlines(image: npt.NDArray[np.uint8]) -> bytes:
+    height, width, _ = image.shape
+
+    # every scanline starts with its filter type
+    scanlines = np.empty(shape=(height, 1 + width * 3), dtype=np.uint8)
+    scanlines[:, 0] = _FILTER_NONE
+    scanlines[:, 1:] = image.reshape(height, width * 3)
+    return scanlines.tobytes()
+
+
+def encode_png(image: npt.NDArray[np.uint8], compression_level: int = 6) -> bytes:
+    """
+    Codifica `image`, um array (linhas, colunas, 3) RGB cuja
+    primeira linha é a linha do topo da imagem, como PNG.
+    """
+    validate_rgb_image(image)
+    height, width, _ = image.shape
+
+    return b"".join(
+        [
+            PNG_SIGNATURE,
+            _chunk(b"IHDR", _header(width, height)),
+            _chunk(b"IDAT", zlib.compress(_scanlines(image), compression_level)),
+            _chunk(b"IEND", b""),
+        ]
+    )
+
+
+def write_png(
+    path: pathlib.Path,
+    image: npt.NDArray[np.uint8],
+    compression_level: int = 6,
+) -> None:
+    pathlib.Path(path).write_bytes(encode_png(image, compression_level))
+
+
+def write_png_strips(
+    path: pathlib.Path,
+    width: int,
+    height: int,
+    strips: typing.Iterable[npt.NDArray[np.uint8]],
+    compression_level: int = 6,
+) -> None:
+    """
+    Escreve um PNG cujas linhas são fornecidas, de cima para baixo,
+    em faixas: arrays (linhas, `width`, 3) RGB. Apenas uma faixa
+    (e o estado do compressor) fica em memória por vez.
+    """
+    assert width > 0
+    assert height > 0
+
+    compressor = zlib.compressobj(compression_level)
+    num_rows = 0
+
+    with open(path, "wb") as file:
+        file.write(PNG_SIGNATURE)
+        file.write(_chunk(b"IHDR", _header(width, height)))
+
+        for strip in strips:
+            validate_rgb_image(strip)
+            assert strip.shape[1] == width
+
+            num_rows += strip.shape[0]
+            assert num_rows <= height
+
+            # the compressor buffers its output, so most strips yield no data
+            data = compressor.compress(_scanlines(strip))
+            if data:
+                file.write(_chunk(b"IDAT", data))
+
+        assert num_rows == height
+        file.write(_chunk(b"IDAT", compressor.flush()))
+        file.write(_chunk(b"IEND", b""))
@@ -0,0 +1,225 @@
+"""
+Conjuntos de polígonos 2D empacotados em arrays, para cenas com muitos
+polígonos: os vértices de todos os polígonos ficam em um único array,
+e cada polígono é um intervalo desse array.
+"""
+
+import dataclasses
+import typing
+
+import numpy as np
+import numpy.typing as npt
+
+import cgpy.colors as cc
+import cgpy.devices as cd
+import cgpy.universes as cu
+
+IndexArray = npt.NDArray[np.int64]
+
+
+@dataclasses.dataclass(frozen=True, eq=False)
+class PolygonSet:
+    """
+    `coords` é um array (N, 3) com os vértices (x, y, 1) de todos os polígonos,
+    e o polígono `i` é formado por `coords[offsets[i] : offsets[i + 1]]`.
+    """
+
+    coords: cu.FloatArray
+    offsets: IndexArray
+
+    def __post_init__(self) -> None:
+        assert self.coords.ndim == 2
+        assert self.coords.shape[1] == 3
+        assert self.coords.dtype in cu.SUPPORTED_PRECISIONS
+
+        assert self.offsets.ndim == 1
+        assert self.offsets.dtype == np.int64
+        assert self.offsets[0] == 0
+        assert self.offsets[-1] == len(self.coords)
+        # like `draw_polygon`, every polygon needs at least 2 vertices
+        assert (np.diff(self.offsets) >= 2).all()
+
+    @property
+    def num_polygons(self) -> int:
+        return len(self.offsets) - 1
+
+    @property
+    def num_points(self) -> int:
+        return int(self.coords.shape[0])
+
+    def __len__(self) -> int:
+        return self.num_polygons
+
+    def __getitem__(self, index: int) -> cu.Polygon:
+        if index < 0:
+            index += len(self)
+        if not (0 <= index < len(self)):
+            raise IndexError(index)
+
+        start, stop = self.offsets[index], self.offsets[index + 1]
+        return cu.Polygon(
+            [cu.Vector3(pt.reshape(3, 1).copy()) for pt in self.coords[start:stop]]
+        )
+
+    @property
+    def polygon_ids(self) -> IndexArray:
+        """
+        Array (N,) com o índice do polígono de cada vértice.
+        """
+        ids: IndexArray = np.repeat(
+            np.arange(self.num_polygons, dtype=np.int64), np.diff(self.offsets)
+        )
+        return ids
+
+    @property
+    def next_point(self) -> IndexArray:
+        """
+        Array (N,) com o índice do próximo vértice de cada polígono
+        (o último vértice é ligado ao primeiro).
+        """
+        following = np.arange(1, self.num_points + 1, dtype=np.int64)
+        following[self.offsets[1:] - 1] = self.offsets[:-1]
+        return following
+
+
+def make_polygon_set(
+    polygons: typing.Iterable[npt.ArrayLike],
+    dtype: npt.DTypeLike | None = None,
+) -> PolygonSet:
+    """
+    Cria um `PolygonSet` a partir de arrays (k, 2) com as coordenadas
+    (x, y) de cada polígono. Se `dtype` não for informado,
+    usa a precisão do contexto atual.
+    """
+    dtype = cu.get_precision() if dtype is None else np.dtype(dtype)
+
+    xys = [np.asarray(p).reshape(-1, 2) for p in polygons]
+    sizes = [len(xy) for xy in xys]
+
+    coords = np.ones(shape=(sum(sizes), 3), dtype=dtype)
+    if xys:
+        coords[:, :2] = np.concatenate(xys)
+
+    offsets = np.zeros(shape=len(xys) + 1, dtype=np.int64)
+    np.cumsum(sizes, out=offsets[1:])
+    return PolygonSet(coords=coords, offsets=offsets)
+
+
+def object2d_to_polygon_set(obj: cu.Object2D) -> PolygonSet:
+    for poly in obj:
+        for vec in poly:
+            cu.validate_vector3(vec)
+
+    return make_polygon_set([[vec[:2, 0] for vec in poly] for poly in obj])
+
+
+def polygon_set_to_object2d(polygons: PolygonSet) -> cu.Object2D:
+    return [polygons[i] for i in range(len(polygons))]
+
+
+def transform_polygon_set(polygons: PolygonSet, trans: cu.Matrix3x3) -> PolygonSet:
+    """
+    Versão vetorizada de `transform_polygon`, aplicada a todos os polígonos.
+    """
+    assert trans.shape == (3, 3)
+
+    coords = polygons.coords
+    transformed = coords @ trans.T.astype(coords.dtype, copy=False)
+    return PolygonSet(coords=transformed, offsets=polygons.offsets)
+
+
+def normalize_polygon_set(polygons: PolygonSet, win: cu.Window) -> PolygonSet:
+    """
+    Versão vetorizada de `normalize_polygon`, aplicada a todos os polígonos.
+    """
+    normalized = np.ones_like(polygons.coords)
+    normalized[:, :2] = cu.normalize_points_2d(polygons.coords, win)
+    return PolygonSet(coords=normalized, offsets=polygons.offsets)
+
+
+def polygon_set_segments(
+    normalized: PolygonSet,
+    port: cd.Viewport,
+) -> npt.NDArray[np.int64]:
+    """
+    Retorna um array (N, 4) com as arestas (x0, y0, x1, y1)
+    de todos os polígonos, em coordenadas de `port`.
+    """
+    device_points = cd.normalized_points_to_device_points(
+        np.ascontiguousarray(normalized.coords[:, :2]), port
+    )
+    segments: npt.NDArray[np.int64] = np.concatenate(
+        [device_points, device_points[normalized.next_point]], axis=1
+    )
+    return segments
+
+
+def draw_polygon_set(
+    normalized: PolygonSet,
+    port: cd.Viewport,
+    color_id: cc.ColorId,
+) -> None:
+    """
+    Equivalente a chamar `draw_polygon` para cada polígono,
+    mas desenhando todas as arestas com uma única chamada.
+    """
+    cd.draw_lines(polygon_set_segments(normalized, port), color_id, port)
+
+
+def polygon_set_spans(
+    normalized: PolygonSet,
+    port: cd.Viewport,
+) -> npt.NDArray[np.int64]:
+    """
+    Retorna um array (S, 3) com os trechos (y, x0, x1) do interior
+    de todos os polígonos (regra par-ímpar), em coordenadas de `port`.
+    Um pixel é interior se o ponto (x, y) está dentro do polígono,
+    usando as mesmas coordenadas (antes do truncamento) que as arestas.
+    """
+    cu.validate_normalized_points(normalized.coords[:, :2])
+
+    # device coordinates, before truncation
+    xs = port.lower_left.x + normalized.coords[:, 0] * (port.num_columns - 1)
+    ys = port.lower_left.y + normalized.coords[:, 1] * (port.num_rows - 1)
+
+    following = normalized.next_point
+    x0, y0 = xs, ys
+    x1, y1 = xs[following], ys[following]
+
+    # an edge crosses the rows y with min(y0, y1) <= y < max(y0, y1),
+    # so horizontal edges cross none and shared vertices are counted once
+    first_row = np.ceil(np.minimum(y0, y1)).astype(np.int64)
+    stop_row = np.ceil(np.maximum(y0, y1)).astype(np.int64)
+    num_rows = np.maximum(stop_row - first_row, 0)
+
+    edges = np.repeat(np.arange(len(xs)), num_rows)
+    starts = np.repeat(np.cumsum(num_rows) - num_rows, num_rows)
+    rows = first_row[edges] + np.arange(len(edges)) - starts
+
+    t = (rows - y0[edges]) / (y1[edges] - y0[edges])
+    crossings = x0[edges] + t * (x1[edges] - x0[edges])
+
+    # within each (polygon, row), crossings alternate between entering and leaving
+    # sorted by polygon, then by row and then by crossing (the last key is primary)
+    order = np.lexsort((crossings, rows, normalized.polygon_ids[edges]))
+    pairs = crossings[order].reshape(-1, 2)
+    pair_rows = rows[order][0::2]
+
+    spans = np.empty(shape=(len(pairs), 3), dtype=np.int64)
+    spans[:, 0] = pair_rows
+    spans[:, 1] = np.ceil(pairs[:, 0])
+    spans[:, 2] = np.ceil(pairs[:, 1])
+    return spans
+
+
+def fill_polygon_set(
+    normalized: PolygonSet,
+    port: cd.Viewport,
+    color_id: cc.ColorId,
+) -> None:
+    """
+    Preenche o interior de todos os polígonos com uma única chamada.
+    Ao contrário de `fill_polygon_flood`, não precisa de uma semente
+    e funciona com polígonos côncavos e com vários componentes.
+    """
+    cd.fill_spans(polygon_set_spans(normalized, port), color_id, port)
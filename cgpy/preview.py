@@ -0,0 +1,285 @@
+"""
+Renderização progressiva: cada pedido é primeiro renderizado em um `Device`
+menor (uma prévia, exibida ampliada) e, quando param de chegar pedidos,
+renderizado novamente em resolução completa, em uma thread separada.
+"""
+
+import contextvars
+import math
+import threading
+import time
+import typing
+
+import numpy as np
+
+import cgpy.colors as cc
+import cgpy.devices as cd
+
+Scene = typing.TypeVar("Scene")
+
+
+class CancellationToken:
+    """
+    Indica se o pedido que originou uma renderização
+    já foi substituído por um pedido mais novo.
+    """
+
+    def __init__(
+        self,
+        current_generation: typing.Callable[[], int],
+        generation: int,
+    ) -> None:
+        self._current_generation = current_generation
+        self._generation = generation
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    @property
+    def cancelled(self) -> bool:
+        return self._current_generation() != self._generation
+
+
+# draws `Scene` into the `Viewport`; long renders should return early
+# once the token is cancelled, since their result will be discarded
+RenderFunction = typing.Callable[[Scene, cd.Viewport, CancellationToken], None]
+
+
+def scale_viewport(port: cd.Viewport, factor: int) -> cd.Viewport:
+    """
+    Retorna um `Viewport` proporcional a `port`,
+    em um novo `Device` `factor` vezes menor que `port.device`.
+    """
+    assert factor >= 1
+
+    device = cd.Device(
+        num_rows=math.ceil(port.device.num_rows / factor),
+        num_columns=math.ceil(port.device.num_columns / factor),
+    )
+    lower_left = cd.DevicePoint(
+        x=port.lower_left.x // factor,
+        y=port.lower_left.y // factor,
+    )
+    return cd.Viewport(
+        lower_left=lower_left,
+        num_rows=math.ceil(port.exclusive_top / factor) - lower_left.y,
+        num_columns=math.ceil(port.exclusive_right / factor) - lower_left.x,
+        device=device,
+    )
+
+
+def upscale_device(
+    device: cd.Device,
+    factor: int,
+    num_rows: int,
+    num_columns: int,
+) -> cd.Device:
+    """
+    Amplia `device` por `factor` (vizinho mais próximo),
+    cortando o resultado em (`num_rows`, `num_columns`).
+    """
+    assert factor >= 1
+    assert num_rows <= device.num_rows * factor
+    assert num_columns <= device.num_columns * factor
+
+    rows = np.repeat(device.raw_buffer, factor, axis=0)[:num_rows]
+    buffer = np.repeat(rows, factor, axis=1)[:, :num_columns]
+    return cd.Device.from_buffer(np.ascontiguousarray(buffer))
+
+
+class ProgressiveRenderer(typing.Generic[Scene]):
+    """
+    `request` retorna imediatamente uma prévia (renderizada com resolução
+    `factor` vezes menor); se nenhum outro pedido chegar em `idle_seconds`,
+    a cena é renderizada em resolução completa em uma thread separada,
+    e o resultado é obtido com `poll`. Um pedido novo cancela a renderização
+    em andamento. `render` é chamada pelas duas threads, mas nunca com o
+    mesmo `Device`.
+    """
+
+    def __init__(
+        self,
+        render: RenderFunction[Scene],
+        num_rows: int,
+        num_columns: int,
+        factor: int = 4,
+        idle_seconds: float = 0.1,
+    ) -> None:
+        assert factor >= 1
+        assert idle_seconds >= 0
+
+        self._render = render
+        self._num_rows = num_rows
+        self._num_columns = num_columns
+        self._factor = factor
+        self._idle_seconds = idle_seconds
+
+        self._condition = threading.Condition()
+        self._generation = 0
+        # the scene, when it was requested and the context of the request
+        self._pending: tuple[Scene, float, contextvars.Context] | None = None
+        self._refined: cd.Device | None = None
+        self._error: BaseException | None = None
+        self._closed = False
+        self._on_refined: typing.Callable[[], object] | None = None
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _make_viewport(self) -> cd.Viewport:
+        device = cd.Device(num_rows=self._num_rows, num_columns=self._num_columns)
+        return cd.Viewport(
+            lower_left=cd.DevicePoint(0, 0),
+            num_rows=device.num_rows,
+            num_columns=device.num_columns,
+            device=device,
+        )
+
+    def _token(self, generation: int) -> CancellationToken:
+        return CancellationToken(lambda: self._generation, generation)
+
+    def request(self, scene: Scene) -> cd.Device:
+        """
+        Renderiza e retorna a prévia de `scene`, já ampliada
+        para a resolução completa, e agenda o refinamento.
+        """
+        with self._condition:
+            self._generation += 1
+            generation = self._generation
+            # the refinement runs in the context (e.g., the precision
+            # set with `cu.precision`) of the thread that requested it
+            self._pending = (scene, time.monotonic(), contextvars.copy_context())
+            self._refined = None
+            self._condition.notify_all()
+
+        port = scale_viewport(self._make_viewport(), self._factor)
+        self._render(scene, port, self._token(generation))
+        return upscale_device(
+            port.device, self._factor, self._num_rows, self._num_columns
+        )
+
+    def poll(self) -> cd.Device | None:
+        """
+        Retorna (uma única vez) a imagem em resolução completa
+        do último pedido, se ela já estiver pronta.
+        """
+        with self._condition:
+            if self._error is not None:
+                raise self._error
+
+            refined, self._refined = self._refined, None
+            return refined
+
+    def set_on_refined(self, callback: typing.Callable[[], object] | None) -> None:
+        """
+        `callback` é chamada (na thread de refinamento) sempre que `poll`
+        tiver algo novo a retornar: uma imagem refinada ou um erro.
+        """
+        with self._condition:
+            self._on_refined = callback
+
+    def close(self) -> None:
+        with self._condition:
+            self._closed = True
+            self._generation += 1
+            self._condition.notify_all()
+        self._thread.join()
+
+    def _wait_for_idle_request(
+        self,
+    ) -> tuple[Scene, int, contextvars.Context] | None:
+        with self._condition:
+            while not self._closed:
+                if self._pending is None:
+                    self._condition.wait()
+                    continue
+
+                scene, requested_at, context = self._pending
+                remaining = requested_at + self._idle_seconds - time.monotonic()
+                if remaining > 0:
+                    # a newer request restarts the idle period
+                    self._condition.wait(timeout=remaining)
+                    continue
+
+                self._pending = None
+                return scene, self._generation, context
+
+        return None
+
+    def _run(self) -> None:
+        while (request := self._wait_for_idle_request()) is not None:
+            scene, generation, context = request
+            token = self._token(generation)
+            port = self._make_viewport()
+
+            try:
+                context.run(self._render, scene, port, token)
+            except BaseException as ex:
+                with self._condition:
+                    self._error = ex
+                    on_refined = self._on_refined
+                if on_refined is not None:
+                    on_refined()
+                return
+
+            with self._condition:
+                if token.cancelled:
+                    continue
+                self._refined = port.device
+                on_refined = self._on_refined
+            if on_refined is not None:
+                on_refined()
+
+
+def scrub(
+    renderer: ProgressiveRenderer[Scene],
+    scenes: typing.Sequence[Scene],
+    palette: cc.Palette,
+) -> None:
+    """
+    Exibe `scenes`, uma por vez; as setas para a esquerda e para a direita
+    trocam a cena exibida. Fecha com ESC ou fechando a janela.
+    """
+    import pygame
+
+    assert len(scenes) > 0
+
+    pygame.init()
+    pygame.key.set_repeat(200, 30)
+
+    index = 0
+    surface = cd.device_to_surface(renderer.request(scenes[index]), palette)
+    screen = pygame.display.set_mode(surface.get_size(), pygame.RESIZABLE)
+    cd.present(screen, surface)
+
+    # the refinement thread wakes up the loop below only when it is done,
+    # so the process sleeps inside `event.wait` while nothing changes
+    refined_event = pygame.event.custom_type()
+    renderer.set_on_refined(
+        lambda: pygame.event.post(pygame.event.Event(refined_event))
+    )
+    try:
+        while True:
+            event = pygame.event.wait()
+            if cd.is_quit_event(event):
+                break
+
+            if event.type == pygame.KEYDOWN and event.key in (
+                pygame.K_LEFT,
+                pygame.K_RIGHT,
+            ):
+                step = 1 if event.key == pygame.K_RIGHT else -1
+                index = (index + step) % len(scenes)
+                preview = renderer.request(scenes[index])
+                surface = cd.device_to_surface(preview, palette)
+                cd.present(screen, surface)
+            elif event.type in (pygame.VIDEORESIZE, pygame.WINDOWEXPOSED):
+                cd.present(screen, surface)
+            elif event.type == refined_event:
+                refined = renderer.poll()
+                if refined is not None:
+                    surface = cd.device_to_surface(refined, palette)
+                    cd.present(screen, surface)
+    finally:
+        renderer.set_on_refined(None)
@@ -0,0 +1,217 @@
+"""
+Importação de imagens RGB para `Device`s: cada pixel é trocado pelo
+`ColorId` da cor mais próxima de uma `Palette`, que pode ser dada
+ou construída a partir da imagem (median cut ou k-means).
+"""
+
+import functools
+import pathlib
+
+import numpy as np
+import numpy.typing as npt
+
+import cgpy.colors as cc
+import cgpy.devices as cd
+import cgpy.png as cpng
+
+RgbArray = npt.NDArray[np.uint8]
+
+# the lookup table has (2 ** LUT_BITS) ** 3 entries; with 6 bits,
+# a pixel is mapped to the color nearest to the center of its 4x4x4 cell
+DEFAULT_LUT_BITS = 6
+
+# palettes are built from (at most) this many pixels of the image
+DEFAULT_MAX_SAMPLES = 2**16
+
+# bounds the (pixels, colors) distance matrices to ~32 MiB
+_DISTANCES_PER_CHUNK = 2**22
+
+
+def load_rgb_image(path: pathlib.Path) -> RgbArray:
+    """
+    Carrega uma imagem (em qualquer formato suportado pelo pygame)
+    como um array (linhas, colunas, 3), com a primeira linha no topo.
+    """
+    import pygame
+
+    surface = pygame.image.load(str(path))
+    # surfarray returns (columns, rows, channels)
+    rgb: RgbArray = pygame.surfarray.array3d(surface).transpose(1, 0, 2)
+    return np.ascontiguousarray(rgb)
+
+
+def rgb_to_palette(colors: npt.ArrayLike) -> cc.Palette:
+    """
+    Converte um array (P, 3) de cores em bytes (0 a 255) em uma `Palette`.
+    """
+    rgb = np.asarray(colors).reshape(-1, 3)
+    assert rgb.min() >= 0
+    assert rgb.max() <= cc.MAX_CHANNEL_VALUE
+
+    channels = np.rint(rgb).astype(np.int64) / cc.MAX_CHANNEL_VALUE
+    return cc.Palette([cc.Color(*c) for c in channels.tolist()])
+
+
+def nearest_color_ids(pixels: RgbArray, palette: cc.Palette) -> npt.NDArray[np.uint8]:
+    """
+    Retorna, para cada linha do array (N, 3) `pixels`,
+    o índice da cor de `palette` mais próxima (distância euclidiana).
+    """
+    assert 0 < len(palette) <= cd.MAX_INDEXED_COLORS
+    assert pixels.ndim == 2
+    assert pixels.shape[1] == 3
+
+    colors = cd.palette_to_rgb(palette).astype(np.int32)
+    color_norms = np.einsum("ij,ij->i", colors, colors)
+
+    ids = np.empty(shape=len(pixels), dtype=np.uint8)
+    chunk = max(1, _DISTANCES_PER_CHUNK // len(colors))
+    for start in range(0, len(pixels), chunk):
+        block = pixels[start : start + chunk].astype(np.int32)
+        # |p - c|^2 = |p|^2 - 2 p.c + |c|^2, and |p|^2 does not change the argmin
+        distances = color_norms - 2 * (block @ colors.T)
+        ids[start : start + chunk] = np.argmin(distances, axis=1)
+
+    return ids
+
+
+@functools.lru_cache(maxsize=8)
+def _color_lut(colors: tuple[cc.Color, ...], bits: int) -> npt.NDArray[np.uint8]:
+    levels = 2**bits
+    cell = 256 // levels
+
+    centers = np.arange(levels) * cell + (cell - 1) / 2
+    r, g, b = np.meshgrid(centers, centers, centers, indexing="ij")
+    grid = np.stack([r.ravel(), g.ravel(), b.ravel()], axis=1)
+
+    lut = nearest_color_ids(np.rint(grid).astype(np.uint8), list(colors))
+    lut.flags.writeable = False
+    return lut
+
+
+def map_to_palette(
+    image: RgbArray,
+    palette: cc.Palette,
+    lut_bits: int | None = DEFAULT_LUT_BITS,
+) -> npt.NDArray[np.uint8]:
+    """
+    Retorna um array (linhas, colunas) com o índice da cor de `palette`
+    mais próxima de cada pixel de `image`. Com `lut_bits`, a busca usa uma
+    tabela (guardada entre chamadas com a mesma paleta) indexada pelos
+    `lut_bits` bits mais significativos de cada canal; com `None`, a busca
+    é exata, mas bem mais lenta.
+    """
+    cpng.validate_rgb_image(image)
+    num_rows, num_columns, _ = image.shape
+
+    if lut_bits is None:
+        return nearest_color_ids(image.reshape(-1, 3), palette).reshape(
+            num_rows, num_columns
+        )
+
+    assert 1 <= lut_bits <= 8
+    lut = _color_lut(tuple(palette), lut_bits)
+
+    shift = 8 - lut_bits
+    cells = image >> shift
+    index = (
+        (cells[..., 0].astype(np.int32) << (2 * lut_bits))
+        | (cells[..., 1].astype(np.int32) << lut_bits)
+        | cells[..., 2]
+    )
+    return np.take(lut, index)
+
+
+def image_to_device(
+    image: RgbArray,
+    palette: cc.Palette,
+    lut_bits: int | None = DEFAULT_LUT_BITS,
+) -> cd.Device:
+    """
+    Converte `image` (primeira linha no topo) em um `Device`
+    (primeira linha na base) com os `ColorId`s de `palette`.
+    """
+    ids = map_to_palette(image, palette, lut_bits=lut_bits)
+
+    # place origin on the bottom-left part of the screen
+    buffer = np.flip(ids, axis=0).astype(cc.ColorId)
+    return cd.Device.from_buffer(buffer)
+
+
+def _sample_pixels(image: RgbArray, max_samples: int) -> RgbArray:
+    cpng.validate_rgb_image(image)
+    assert max_samples > 0
+
+    pixels = image.reshape(-1, 3)
+    # regularly spaced samples, so the result is deterministic
+    step = max(1, len(pixels) // max_samples)
+    return pixels[::step]
+
+
+def median_cut_palette(
+    image: RgbArray,
+    num_colors: int,
+    max_samples: int = DEFAULT_MAX_SAMPLES,
+) -> cc.Palette:
+    """
+    Constrói uma paleta com até `num_colors` cores dividindo repetidamente,
+    pela mediana, a caixa (no espaço RGB) com a maior extensão em um canal.
+    Cada cor é a média dos pixels de uma caixa.
+    """
+    assert 0 < num_colors <= cd.MAX_INDEXED_COLORS
+
+    boxes = [_sample_pixels(image, max_samples)]
+    while len(boxes) < num_colors:
+        extents = [np.ptp(box, axis=0) for box in boxes]
+        widest = int(np.argmax([extent.max() for extent in extents]))
+        if extents[widest].max() == 0:
+            break  # every box has a single color
+
+        box = boxes.pop(widest)
+        channel = int(np.argmax(extents[widest]))
+        order = np.argsort(box[:, channel], kind="stable")
+        middle = len(box) // 2
+        boxes.append(box[order[:middle]])
+        boxes.append(box[order[middle:]])
+
+    return rgb_to_palette([box.mean(axis=0) for box in boxes])
+
+
+def kmeans_palette(
+    image: RgbArray,
+    num_colors: int,
+    num_iterations: int = 10,
+    max_samples: int = DEFAULT_MAX_SAMPLES,
+) -> cc.Palette:
+    """
+    Constrói uma paleta com até `num_colors` cores refinando,
+    com o algoritmo de Lloyd (k-means), a paleta de `median_cut_palette`.
+    """
+    assert num_iterations >= 0
+
+    samples = _sample_pixels(image, max_samples)
+    palette = median_cut_palette(image, num_colors, max_samples=max_samples)
+    centers = cd.palette_to_rgb(palette).astype(np.float64)
+
+    for _ in range(num_iterations):
+        labels = nearest_color_ids(samples, rgb_to_palette(centers))
+
+        sizes = np.bincount(labels, minlength=len(centers))
+        sums = np.stack(
+            [
+                np.bincount(labels, weights=samples[:, c], minlength=len(centers))
+                for c in range(3)
+            ],
+            axis=1,
+        )
+
+        # centers without samples are kept where they are
+        assigned = sizes > 0
+        new_centers = centers.copy()
+        new_centers[assigned] = sums[assigned] / sizes[assigned, np.newaxis]
+        if np.allclose(new_centers, centers, atol=0.5):
+            centers = new_centers
+            break
+        centers = new_centers
+
+    return rgb_to_palette(centers)
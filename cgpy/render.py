@@ -0,0 +1,432 @@
+"""
+Renderiza, em paralelo, quadros de uma malha girando em torno dos eixos x e y.
+
+Exemplo:
+    python -m cgpy.render malha.npz --rotate-y 0 360 1 --output quadros/
+
+Cada quadro é escrito assim que fica pronto; quadros que já existem
+em `--output` são pulados, de forma que um trabalho interrompido
+pode ser retomado executando o mesmo comando novamente. As opções usadas
+são guardadas em `--output` e um trabalho só é retomado com as mesmas opções.
+
+Com `--lod-pixels-per-face`, cada quadro desenha o nível de detalhe
+(veja `cgpy.meshes.select_level_of_detail`) adequado ao tamanho da malha
+na imagem; os níveis são gerados uma vez e guardados ao lado da malha.
+"""
+
+import argparse
+import dataclasses
+import json
+import multiprocessing as mp
+import os
+import pathlib
+import sys
+import typing
+
+import numpy as np
+
+import cgpy.colors as cc
+import cgpy.devices as cd
+import cgpy.meshes as cm
+import cgpy.outofcore as oc
+import cgpy.universes as cu
+
+FORMATS = ("png", "npz")
+
+BACKGROUND_COLOR_ID = cc.ColorId(0)
+LINE_COLOR_ID = cc.ColorId(1)
+
+# written to the output directory, to detect resuming with other options
+MANIFEST_NAME = "manifest.json"
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class RenderSettings:
+    normal: tuple[float, float, float]
+    up: tuple[float, float, float]
+    offset: tuple[float, float, float]
+    window: cu.Window
+    zpp: float
+    zcp: float
+    num_rows: int
+    num_columns: int
+    output_format: str
+    palette: tuple[cc.Color, ...]
+    precision: str
+    # if set, each frame draws the coarsest adequate level of detail
+    pixels_per_face: float | None = None
+
+
+# directories of `cgpy.outofcore` are drawn in blocks, without being loaded
+Mesh = cm.IndexedMesh | oc.MappedMesh
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class FrameTask:
+    x_degrees: float
+    y_degrees: float
+    path: pathlib.Path
+
+
+def load_mesh(path: pathlib.Path, faces_path: pathlib.Path | None) -> Mesh:
+    """
+    Carrega uma malha de:
+    - um diretório com `vertices.npy` e `faces.npy` (veja `cgpy.outofcore`),
+      que é apenas mapeado em memória e desenhado em blocos de faces;
+    - um arquivo `.npz` com os arrays `vertices` e `faces`;
+    - um par de arquivos `.csv` no formato de `cgpy/data`
+      (o segundo é passado em `faces_path`).
+    """
+    if path.is_dir():
+        return oc.open_mesh_npy(path)
+
+    if path.suffix == ".npz":
+        with np.load(path) as arrays:
+            return cm.make_indexed_mesh(arrays["vertices"], arrays["faces"])
+
+    if path.suffix == ".csv":
+        if faces_path is None:
+            raise ValueError("malhas em .csv exigem o arquivo de faces (--faces)")
+        return cm.load_indexed_mesh_csv(path, faces_path)
+
+    raise ValueError(f"formato de malha desconhecido: {path}")
+
+
+def levels_of_detail_path(mesh_path: pathlib.Path) -> pathlib.Path:
+    return mesh_path.with_name(f"{mesh_path.name}.lods.npz")
+
+
+def _degrees(start: float, stop: float, step: float) -> list[float]:
+    values: list[float] = np.arange(start, stop, step).tolist()
+    return values if values else [start]
+
+
+def make_tasks(
+    x_range: tuple[float, float, float],
+    y_range: tuple[float, float, float],
+    output: pathlib.Path,
+    output_format: str,
+) -> list[FrameTask]:
+    tasks = []
+    for ix, x_degrees in enumerate(_degrees(*x_range)):
+        for iy, y_degrees in enumerate(_degrees(*y_range)):
+            name = f"frame_x{ix:05d}_y{iy:05d}.{output_format}"
+            tasks.append(FrameTask(x_degrees, y_degrees, output / name))
+    return tasks
+
+
+# per-process state, set by `_init_worker`
+_worker_mesh: Mesh | cm.LevelsOfDetail | None = None
+_worker_workspaces: tuple[cm.MeshWorkspace, ...] = ()
+_worker_settings: RenderSettings | None = None
+
+
+def _init_worker(
+    mesh_path: pathlib.Path,
+    faces_path: pathlib.Path | None,
+    settings: RenderSettings,
+) -> None:
+    # each worker loads the mesh once, instead of receiving it with every task
+    global _worker_mesh, _worker_workspaces, _worker_settings
+    if settings.pixels_per_face is not None:
+        # the levels are built (or checked) by `main`, before the workers start
+        lods = cm.load_levels_of_detail(levels_of_detail_path(mesh_path))
+        levels = tuple(level.astype(settings.precision) for level in lods.levels)
+        _worker_mesh = cm.LevelsOfDetail(levels)
+        _worker_workspaces = tuple(cm.MeshWorkspace(level) for level in levels)
+    else:
+        mesh = load_mesh(mesh_path, faces_path)
+        if isinstance(mesh, cm.IndexedMesh):
+            mesh = mesh.astype(settings.precision)
+            _worker_workspaces = (cm.MeshWorkspace(mesh),)
+        _worker_mesh = mesh
+    _worker_settings = settings
+
+
+def render_frame(
+    mesh: Mesh | cm.LevelsOfDetail,
+    settings: RenderSettings,
+    x_degrees: float,
+    y_degrees: float,
+    workspaces: typing.Sequence[cm.MeshWorkspace] = (),
+) -> cd.Device:
+    """
+    Com níveis de detalhe, desenha o escolhido por `settings.pixels_per_face`.
+    Um dos `workspaces` é reutilizado se tiver sido criado para a malha desenhada.
+    """
+    observer = cu.create_observer_transformation_matrix(
+        normal=cu.make_vector4(*settings.normal),
+        up=cu.make_vector4(*settings.up),
+        offset=cu.make_vector4(*settings.offset),
+    )
+    rotation = cu.make_y_rotation_3d(y_degrees) @ cu.make_x_rotation_3d(x_degrees)
+    trans = cu.Matrix4x4(observer @ rotation)
+
+    device = cd.Device(num_rows=settings.num_rows, num_columns=settings.num_columns)
+    port = cd.Viewport(
+        lower_left=cd.DevicePoint(0, 0),
+        num_rows=device.num_rows,
+        num_columns=device.num_columns,
+        device=device,
+    )
+    device.raw_buffer[:] = BACKGROUND_COLOR_ID
+
+    if isinstance(mesh, cm.LevelsOfDetail):
+        assert settings.pixels_per_face is not None
+        mesh = cm.select_level_of_detail(
+            mesh,
+            trans,
+            zpp=settings.zpp,
+            zcp=settings.zcp,
+            window=settings.window,
+            port=port,
+            pixels_per_face=settings.pixels_per_face,
+        )
+
+    if isinstance(mesh, oc.MappedMesh):
+        oc.draw_mesh_wireframe_streaming(
+            mesh,
+            trans,
+            zpp=settings.zpp,
+            zcp=settings.zcp,
+            window=settings.window,
+            port=port,
+            color_id=LINE_COLOR_ID,
+            dtype=settings.precision,
+        )
+    else:
+        workspace = next((w for w in workspaces if w.mesh is mesh), None)
+        cm.draw_mesh_wireframe(
+            mesh,
+            trans,
+            zpp=settings.zpp,
+            zcp=settings.zcp,
+            window=settings.window,
+            port=port,
+            color_id=LINE_COLOR_ID,
+            workspace=workspace,
+        )
+    return device
+
+
+def make_manifest(
+    settings: RenderSettings,
+    mesh_path: pathlib.Path,
+    faces_path: pathlib.Path | None,
+    x_range: tuple[float, float, float],
+    y_range: tuple[float, float, float],
+) -> dict[str, typing.Any]:
+    """
+    Descreve tudo o que determina os quadros de um trabalho,
+    no formato em que é salvo (JSON).
+    """
+    manifest = {
+        "mesh": str(mesh_path.resolve()),
+        "faces": None if faces_path is None else str(faces_path.resolve()),
+        "rotate_x": list(x_range),
+        "rotate_y": list(y_range),
+        "settings": dataclasses.asdict(settings),
+    }
+    # normalizing (e.g., tuples to lists) to compare with a loaded manifest
+    loaded: dict[str, typing.Any] = json.loads(json.dumps(manifest))
+    return loaded
+
+
+def prepare_output(output: pathlib.Path, manifest: dict[str, typing.Any]) -> bool:
+    """
+    Cria `output`, remove os arquivos temporários deixados por um trabalho
+    interrompido e salva `manifest`. Retorna `False`, sem alterar os quadros,
+    se `output` já tiver quadros de um trabalho com outras opções.
+    """
+    output.mkdir(parents=True, exist_ok=True)
+    for leftover in output.glob(".*.tmp"):
+        leftover.unlink()
+
+    manifest_path = output / MANIFEST_NAME
+    if manifest_path.exists():
+        with open(manifest_path) as file:
+            return bool(json.load(file) == manifest)
+
+    # without a manifest, existing frames cannot be checked
+    if any(output.glob(f"frame_*.{manifest['settings']['output_format']}")):
+        return False
+
+    temporary = output / f".{MANIFEST_NAME}.tmp"
+    with open(temporary, "w") as file:
+        json.dump(manifest, file, indent=2)
+    os.replace(temporary, manifest_path)
+    return True
+
+
+def write_frame(
+    device: cd.Device,
+    settings: RenderSettings,
+    path: pathlib.Path,
+) -> None:
+    # written under a temporary name, so a killed job never leaves partial frames
+    temporary = path.with_name(f".{path.name}.tmp")
+    if settings.output_format == "png":
+        cd.device_to_png(device, list(settings.palette), temporary)
+    else:
+        with open(temporary, "wb") as file:
+            np.savez_compressed(file, buffer=device.raw_buffer)
+    os.replace(temporary, path)
+
+
+def _run_task(task: FrameTask) -> pathlib.Path:
+    assert _worker_mesh is not None
+    assert _worker_settings is not None
+
+    device = render_frame(
+        _worker_mesh,
+        _worker_settings,
+        task.x_degrees,
+        task.y_degrees,
+        workspaces=_worker_workspaces,
+    )
+    write_frame(device, _worker_settings, task.path)
+    return task.path
+
+
+def _parse_resolution(text: str) -> tuple[int, int]:
+    columns, _, rows = text.partition("x")
+    try:
+        num_columns, num_rows = int(columns), int(rows)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"resolução inválida: {text}") from None
+    if num_columns <= 0 or num_rows <= 0:
+        raise argparse.ArgumentTypeError(f"resolução inválida: {text}")
+    return num_columns, num_rows
+
+
+def _parse_positive(text: str) -> float:
+    try:
+        value = float(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"valor inválido: {text}") from None
+    if not value > 0:
+        raise argparse.ArgumentTypeError(f"o valor deve ser positivo: {text}")
+    return value
+
+
+def make_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m cgpy.render",
+        description="Renderiza quadros (wireframe) de uma malha girando.",
+    )
+    parser.add_argument("mesh", type=pathlib.Path)
+    parser.add_argument("--faces", type=pathlib.Path, default=None)
+    parser.add_argument("--output", type=pathlib.Path, required=True)
+    parser.add_argument("--format", choices=FORMATS, default="png")
+    parser.add_argument("--resolution", type=_parse_resolution, default=(800, 600))
+    parser.add_argument(
+        "--precision",
+        choices=[str(p) for p in cu.SUPPORTED_PRECISIONS],
+        default="float64",
+    )
+    parser.add_argument(
+        "--lod-pixels-per-face", type=_parse_positive, default=None, metavar="P"
+    )
+
+    for name, default in (
+        ("--normal", (0.0, 0.0, 1.0)),
+        ("--up", (0.0, 1.0, 0.0)),
+        ("--offset", (0.0, 0.0, 0.0)),
+    ):
+        parser.add_argument(
+            name, nargs=3, type=float, default=default, metavar=("X", "Y", "Z")
+        )
+
+    for name, default in (
+        ("--rotate-x", (0.0, 1.0, 1.0)),
+        ("--rotate-y", (0.0, 360.0, 1.0)),
+    ):
+        parser.add_argument(
+            name,
+            nargs=3,
+            type=float,
+            default=default,
+            metavar=("START", "STOP", "STEP"),
+        )
+
+    parser.add_argument(
+        "--window",
+        nargs=4,
+        type=float,
+        default=(-10.0, -10.0, 10.0, 10.0),
+        metavar=("MIN_X", "MIN_Y", "MAX_X", "MAX_Y"),
+    )
+    parser.add_argument("--zpp", type=float, default=40.0)
+    parser.add_argument("--zcp", type=float, default=-45.0)
+    parser.add_argument(
+        "--line-color", nargs=3, type=float, default=(1.0, 0.0, 0.0), metavar="C"
+    )
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunksize", type=int, default=8)
+    return parser
+
+
+def main(argv: typing.Sequence[str] | None = None) -> int:
+    args = make_parser().parse_args(argv)
+    num_columns, num_rows = args.resolution
+
+    settings = RenderSettings(
+        normal=tuple(args.normal),
+        up=tuple(args.up),
+        offset=tuple(args.offset),
+        window=cu.Window(*args.window),
+        zpp=args.zpp,
+        zcp=args.zcp,
+        num_rows=num_rows,
+        num_columns=num_columns,
+        output_format=args.format,
+        palette=(cc.Color(0, 0, 0), cc.Color(*args.line_color)),
+        precision=args.precision,
+        pixels_per_face=args.lod_pixels_per_face,
+    )
+    if settings.pixels_per_face is not None and args.mesh.is_dir():
+        print(
+            "--lod-pixels-per-face não é suportado com malhas em diretórios",
+            file=sys.stderr,
+        )
+        return 1
+
+    manifest = make_manifest(
+        settings, args.mesh, args.faces, args.rotate_x, args.rotate_y
+    )
+    if not prepare_output(args.output, manifest):
+        print(
+            f"{args.output} contém quadros renderizados com outras opções; "
+            "use outro diretório ou apague o atual",
+            file=sys.stderr,
+        )
+        return 1
+
+    tasks = make_tasks(args.rotate_x, args.rotate_y, args.output, args.format)
+    pending = [t for t in tasks if not t.path.exists()]
+    print(f"{len(tasks) - len(pending)} de {len(tasks)} quadros já existem")
+
+    if pending and settings.pixels_per_face is not None:
+        # built once here, so that the workers only load them
+        mesh = load_mesh(args.mesh, args.faces)
+        assert isinstance(mesh, cm.IndexedMesh)
+        cm.load_or_build_levels_of_detail(mesh, levels_of_detail_path(args.mesh))
+
+    if pending:
+        with mp.Pool(
+            processes=max(1, args.workers),
+            initializer=_init_worker,
+            initargs=(args.mesh, args.faces, settings),
+        ) as pool:
+            results = pool.imap_unordered(
+                _run_task, pending, chunksize=max(1, args.chunksize)
+            )
+            for done, _ in enumerate(results, start=1):
+                print(f"\r{done}/{len(pending)}", end="", flush=True)
+        print()
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
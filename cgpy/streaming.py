@@ -0,0 +1,386 @@
+"""
+Transmissão de quadros por um socket local, para visualizar renderizações
+feitas sem tela (por exemplo, em processos de `cgpy.render`).
+
+Como em `cgpy.framestore`, cada quadro é enviado com um byte por pixel
+(índice na paleta) e comprimido com zlib; depois do primeiro quadro,
+apenas o XOR com o quadro anterior é enviado. A paleta só é enviada
+quando muda.
+"""
+
+import argparse
+import socket
+import struct
+import sys
+import threading
+import typing
+import zlib
+
+import numpy as np
+
+import cgpy.colors as cc
+import cgpy.devices as cd
+import cgpy.framestore as cfs
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 7797
+
+# level 1 is several times faster than the default and, for XOR deltas
+# (which are mostly zeros), compresses almost as well
+DEFAULT_COMPRESSION_LEVEL = 1
+
+# a client that takes longer than this to accept a frame is dropped,
+# so a stalled viewer never blocks the process that publishes frames
+DEFAULT_SEND_TIMEOUT_SECONDS = 1.0
+
+# every message is (kind, payload size) followed by the payload
+_HEADER = struct.Struct("!BI")
+_SHAPE = struct.Struct("!II")
+
+# payload: the RGB bytes of each color
+_PALETTE = 1
+# payload: (rows, columns) followed by the compressed indices
+_KEYFRAME = 2
+# payload: the compressed XOR of the indices with those of the previous frame
+_DELTA = 3
+
+RgbColors = list[tuple[int, int, int]]
+
+
+class ReceivedFrame(typing.NamedTuple):
+    device: cd.Device
+    # the palette, as expected by `pygame.Surface.set_palette`
+    colors: RgbColors
+
+
+def _message(kind: int, payload: bytes) -> bytes:
+    return _HEADER.pack(kind, len(payload)) + payload
+
+
+def _to_indices(device: cd.Device) -> cfs.IndexBuffer:
+    buffer = device.raw_buffer
+    if np.min(buffer) < 0 or np.max(buffer) >= cfs.MAX_PALETTE_SIZE:
+        raise ValueError(
+            f"apenas `ColorId`s entre 0 e {cfs.MAX_PALETTE_SIZE - 1} são transmitidos"
+        )
+    return buffer.astype(np.uint8)
+
+
+class FrameServer:
+    """
+    Aceita conexões em (`host`, `port`) e envia a todos os clientes conectados
+    cada quadro publicado com `publish`. Clientes podem se conectar a qualquer
+    momento: o primeiro quadro enviado a um cliente novo é um quadro-chave.
+    Clientes que não recebem um quadro em `send_timeout_seconds` são descartados.
+    Com `port` igual a 0, uma porta livre é escolhida (veja `address`).
+    """
+
+    def __init__(
+        self,
+        host: str = DEFAULT_HOST,
+        port: int = DEFAULT_PORT,
+        compression_level: int = DEFAULT_COMPRESSION_LEVEL,
+        send_timeout_seconds: float = DEFAULT_SEND_TIMEOUT_SECONDS,
+    ) -> None:
+        assert send_timeout_seconds > 0
+
+        self._compression_level = compression_level
+        self._send_timeout_seconds = send_timeout_seconds
+
+        self._listener = socket.create_server((host, port))
+        self._lock = threading.Lock()
+        # clients that have not received any frame yet
+        self._new_clients: list[socket.socket] = []
+        self._clients: list[socket.socket] = []
+
+        self._previous: cfs.IndexBuffer | None = None
+        self._palette: bytes | None = None
+
+        self._thread = threading.Thread(target=self._accept, daemon=True)
+        self._thread.start()
+
+    @property
+    def address(self) -> tuple[str, int]:
+        host, port = self._listener.getsockname()[:2]
+        return host, port
+
+    @property
+    def num_clients(self) -> int:
+        with self._lock:
+            return len(self._new_clients) + len(self._clients)
+
+    def _accept(self) -> None:
+        while True:
+            try:
+                client, _ = self._listener.accept()
+            except OSError:
+                return  # the listener was closed
+
+            # frames are sent as soon as they are published
+            client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            client.settimeout(self._send_timeout_seconds)
+            with self._lock:
+                self._new_clients.append(client)
+
+    def _compress(self, indices: cfs.IndexBuffer) -> bytes:
+        return zlib.compress(indices.tobytes(), self._compression_level)
+
+    def publish(self, device: cd.Device, palette: cc.Palette) -> None:
+        """
+        Envia `device` (e `palette`, caso ela tenha mudado) aos clientes.
+        Clientes que se desconectaram ou ficaram para trás são descartados.
+        """
+        current = _to_indices(device)
+        palette_bytes = cd.palette_to_rgb(palette).tobytes()
+        assert len(palette) <= cfs.MAX_PALETTE_SIZE
+
+        with self._lock:
+            new_clients, self._new_clients = self._new_clients, []
+            clients = self._clients
+
+        previous = self._previous
+        if previous is not None and previous.shape != current.shape:
+            # a different size can only be sent as a keyframe
+            new_clients += clients
+            clients = []
+
+        palette_message = _message(_PALETTE, palette_bytes)
+        keyframe = b""
+        if new_clients:
+            keyframe = palette_message + _message(
+                _KEYFRAME, _SHAPE.pack(*current.shape) + self._compress(current)
+            )
+
+        update = b""
+        if clients:
+            assert previous is not None
+            if palette_bytes != self._palette:
+                update = palette_message
+            delta = np.bitwise_xor(current, previous)
+            update += _message(_DELTA, self._compress(delta))
+
+        connected = [c for c in new_clients if self._send(c, keyframe)]
+        connected += [c for c in clients if self._send(c, update)]
+
+        self._previous = current
+        self._palette = palette_bytes
+        with self._lock:
+            self._clients = connected
+
+    def _send(self, client: socket.socket, data: bytes) -> bool:
+        try:
+            client.sendall(data)
+            return True
+        except OSError:
+            # includes timeouts; after a partial send the stream cannot be
+            # resumed, so the client has to reconnect to get a new keyframe
+            client.close()
+            return False
+
+    def close(self) -> None:
+        # closing alone does not wake up a thread blocked in `accept`
+        try:
+            self._listener.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._listener.close()
+        self._thread.join()
+
+        with self._lock:
+            for client in self._new_clients + self._clients:
+                client.close()
+            self._new_clients = []
+            self._clients = []
+
+
+def _receive_exactly(sock: socket.socket, size: int) -> bytes | None:
+    # returns `None` if the connection is closed before any byte is received
+    chunks = []
+    remaining = size
+    while remaining > 0:
+        chunk = sock.recv(min(remaining, 2**20))
+        if not chunk:
+            if remaining == size:
+                return None
+            raise ConnectionError("conexão encerrada no meio de uma mensagem")
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b"".join(chunks)
+
+
+class FrameClient:
+    """
+    Conecta-se a um `FrameServer` e decodifica os quadros recebidos.
+    """
+
+    def __init__(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> None:
+        self._socket = socket.create_connection((host, port))
+        self._previous: cfs.IndexBuffer | None = None
+        self._colors: RgbColors | None = None
+
+    def _receive_message(self) -> tuple[int, bytes] | None:
+        header = _receive_exactly(self._socket, _HEADER.size)
+        if header is None:
+            return None
+
+        kind, size = _HEADER.unpack(header)
+        payload = _receive_exactly(self._socket, size) if size > 0 else b""
+        if payload is None:
+            raise ConnectionError("conexão encerrada no meio de uma mensagem")
+        return kind, payload
+
+    def receive(self) -> ReceivedFrame | None:
+        """
+        Bloqueia até o próximo quadro chegar.
+        Retorna `None` quando o servidor encerra a conexão.
+        """
+        while (message := self._receive_message()) is not None:
+            kind, payload = message
+
+            if kind == _PALETTE:
+                rgb = np.frombuffer(payload, dtype=np.uint8).reshape(-1, 3)
+                self._colors = [(r, g, b) for r, g, b in rgb.tolist()]
+                continue
+
+            if kind == _KEYFRAME:
+                shape = _SHAPE.unpack_from(payload)
+                data = zlib.decompress(payload[_SHAPE.size :])
+                current = np.frombuffer(data, dtype=np.uint8).reshape(shape)
+            elif kind == _DELTA:
+                if self._previous is None:
+                    raise ValueError("quadro delta recebido antes de um quadro-chave")
+                data = zlib.decompress(payload)
+                delta = np.frombuffer(data, dtype=np.uint8)
+                # a new array, since previously returned devices may still be in use
+                current = np.bitwise_xor(
+                    self._previous, delta.reshape(self._previous.shape)
+                )
+            else:
+                raise ValueError(f"tipo de mensagem desconhecido: {kind}")
+
+            if self._colors is None:
+                raise ValueError("quadro recebido antes da paleta")
+
+            self._previous = current
+            device = cd.Device.from_buffer(current.astype(cc.ColorId))
+            return ReceivedFrame(device, self._colors)
+
+        return None
+
+    def __iter__(self) -> typing.Iterator[ReceivedFrame]:
+        while (frame := self.receive()) is not None:
+            yield frame
+
+    def close(self) -> None:
+        self._socket.close()
+
+
+class _LatestFrame:
+    """
+    Recebe quadros em uma thread separada, guardando apenas o mais recente:
+    se a exibição for mais lenta que o servidor, quadros intermediários
+    são decodificados, mas não exibidos. `notify` é chamada (na thread
+    de recepção) a cada quadro novo e quando a recepção termina.
+    """
+
+    def __init__(
+        self,
+        client: FrameClient,
+        notify: typing.Callable[[], object],
+    ) -> None:
+        self._client = client
+        self._notify = notify
+        self._lock = threading.Lock()
+        self._frame: ReceivedFrame | None = None
+        self._finished = False
+        self._error: BaseException | None = None
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        try:
+            for frame in self._client:
+                with self._lock:
+                    self._frame = frame
+                self._notify()
+        except BaseException as ex:
+            with self._lock:
+                self._error = ex
+        finally:
+            with self._lock:
+                self._finished = True
+            self._notify()
+
+    def poll(self) -> ReceivedFrame | None:
+        """
+        Retorna (uma única vez) o quadro mais recente, se houver um novo.
+        """
+        with self._lock:
+            if self._error is not None:
+                raise self._error
+
+            frame, self._frame = self._frame, None
+            return frame
+
+
+def view_stream(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> None:
+    """
+    Exibe os quadros enviados por um `FrameServer` até a janela ser fechada
+    ou a tecla ESC ser pressionada. Quando o servidor encerra a conexão,
+    o último quadro continua sendo exibido.
+    """
+    import pygame
+
+    pygame.init()
+    client = FrameClient(host, port)
+
+    # the receiving thread wakes up the loop below only when there is news,
+    # so the process sleeps inside `event.wait` while no frames arrive
+    frame_event = pygame.event.custom_type()
+    frames = _LatestFrame(
+        client, lambda: pygame.event.post(pygame.event.Event(frame_event))
+    )
+
+    screen = None
+    surface = None
+    frame_size = None
+    try:
+        while True:
+            event = pygame.event.wait()
+            if cd.is_quit_event(event):
+                break
+
+            if event.type in (pygame.VIDEORESIZE, pygame.WINDOWEXPOSED):
+                if screen is not None and surface is not None:
+                    cd.present(screen, surface)
+            elif event.type == frame_event:
+                frame = frames.poll()
+                if frame is None:
+                    # an older event, whose frame was already shown
+                    continue
+
+                surface = cd.device_to_indexed_surface(frame.device)
+                surface.set_palette(frame.colors)
+                if screen is None or surface.get_size() != frame_size:
+                    frame_size = surface.get_size()
+                    screen = pygame.display.set_mode(frame_size, pygame.RESIZABLE)
+                cd.present(screen, surface)
+    finally:
+        client.close()
+
+
+def main(argv: typing.Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Exibe os quadros transmitidos por um `FrameServer`."
+    )
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    args = parser.parse_args(argv)
+
+    view_stream(args.host, args.port)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
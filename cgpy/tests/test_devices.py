@@ -0,0 +1,125 @@
+import typing
+
+import numpy as np
+import pytest
+
+import cgpy.colors as cc
+import cgpy.devices as cd
+import cgpy.universes as cu
+
+pygame = pytest.importorskip("pygame")
+
+PALETTE = cc.Palette([cc.Color(0, 0, 0), cc.Color(1, 0, 0)])
+
+
+def _surface_indices(surface: typing.Any) -> np.ndarray:
+    # surfarray uses (columns, rows), with the first row on top
+    return np.flip(pygame.surfarray.array2d(surface).transpose(), axis=0)
+
+
+def _converted_indices(
+    frames: typing.Iterable[tuple[cd.Device, cc.Palette]],
+) -> list[np.ndarray]:
+    # the schedule is never started, so no frame is skipped
+    converted = cd._convert_frames(iter(frames), cd._Schedule(fps=60))
+    return [_surface_indices(frame.surface) for _, frame in converted]
+
+
+def test_redrawn_device_is_converted_again() -> None:
+    # a generator may draw every frame into the same `Device`
+    device = cd.Device(num_rows=20, num_columns=10)
+
+    def frames() -> typing.Iterator[tuple[cd.Device, cc.Palette]]:
+        for row in range(device.num_rows):
+            device.raw_buffer[:] = 0
+            device.raw_buffer[row] = 1
+            yield device, PALETTE
+
+    for row, indices in enumerate(_converted_indices(frames())):
+        expected = np.zeros(shape=(20, 10), dtype=indices.dtype)
+        expected[row] = 1
+        np.testing.assert_array_equal(indices, expected)
+
+
+def test_unchanged_device_reuses_indexed_surface() -> None:
+    device = cd.Device(num_rows=4, num_columns=4)
+    device.raw_buffer[1, 2] = 1
+    other_palette = cc.Palette([cc.Color(0, 0, 1), cc.Color(0, 1, 0)])
+
+    converted = list(
+        cd._convert_frames(
+            iter([(device, PALETTE), (device, other_palette)]),
+            cd._Schedule(fps=60),
+        )
+    )
+
+    first, second = (frame for _, frame in converted)
+    assert first.surface is second.surface
+    assert first.palette != second.palette
+
+
+def test_palette_change_does_not_convert_indices(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    device = cd.Device(num_rows=4, num_columns=4)
+    device.raw_buffer[1, 2] = 1
+    palettes = [PALETTE, cc.Palette([cc.Color(0, 0, 1), cc.Color(0, 1, 0)])] * 3
+
+    conversions = []
+    device_to_indexed_surface = cd.device_to_indexed_surface
+
+    def counted(device: cd.Device) -> typing.Any:
+        conversions.append(device)
+        return device_to_indexed_surface(device)
+
+    monkeypatch.setattr(cd, "device_to_indexed_surface", counted)
+    versions = []
+
+    def frames() -> typing.Iterator[tuple[cd.Device, cc.Palette]]:
+        for palette in palettes:
+            versions.append(device.version)
+            yield device, palette
+
+    converted = list(cd._convert_frames(frames(), cd._Schedule(fps=60)))
+
+    assert len(converted) == len(palettes)
+    assert len(conversions) == 1
+    # after the first conversion, the buffer is not even read
+    assert len(set(versions[1:])) == 1
+
+
+def test_device_drawn_between_frames_is_converted_again() -> None:
+    device = cd.Device(num_rows=10, num_columns=10)
+    port = cd.Viewport(cd.DevicePoint(0, 0), 10, 10, device)
+
+    def frames() -> typing.Iterator[tuple[cd.Device, cc.Palette]]:
+        yield device, PALETTE
+        cd.draw_line_bresenham(
+            cd.DevicePoint(0, 0), cd.DevicePoint(9, 9), cc.ColorId(1), port
+        )
+        yield device, PALETTE
+        device.set(x=0, y=9, color_id=cc.ColorId(1))
+        yield device, PALETTE
+
+    first, second, third = _converted_indices(frames())
+    assert not first.any()
+    np.testing.assert_array_equal(second, np.eye(10))
+    assert third[9, 0] == 1 and third.sum() == 11
+
+
+def test_prefetcher_renders_in_context_of_caller() -> None:
+    precisions = []
+
+    def frames() -> typing.Iterator[cd._TimedFrame]:
+        precisions.append(cu.get_precision())
+        device = cd.Device(num_rows=2, num_columns=2)
+        yield from cd._convert_frames(iter([(device, PALETTE)]), cd._Schedule(60))
+
+    with cu.precision(np.float32):
+        prefetcher = cd._SurfacePrefetcher(frames(), max_buffered_frames=1)
+    try:
+        assert prefetcher.wait() is not None
+    finally:
+        prefetcher.close()
+
+    assert precisions == [np.float32]
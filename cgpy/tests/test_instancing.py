@@ -0,0 +1,102 @@
+import pathlib
+
+import numpy as np
+import pytest
+
+import cgpy.colors as cc
+import cgpy.devices as cd
+import cgpy.instancing as ci
+import cgpy.meshes as cm
+import cgpy.universes as cu
+
+DATA_DIR = pathlib.Path(cm.__file__).parent / "data"
+
+ZPP = 40
+ZCP = -45
+WINDOW = cu.Window(-10, -10, 10, 10)
+
+
+@pytest.fixture(scope="module")
+def teapot() -> cm.IndexedMesh:
+    return cm.load_indexed_mesh_csv(
+        DATA_DIR / "teapot_vertices.csv", DATA_DIR / "teapot_faces.csv"
+    )
+
+
+def _make_viewport() -> cd.Viewport:
+    device = cd.Device(num_rows=90, num_columns=120)
+    return cd.Viewport(
+        lower_left=cd.DevicePoint(0, 0),
+        num_rows=device.num_rows,
+        num_columns=device.num_columns,
+        device=device,
+    )
+
+
+def _grid(size: int, spacing: float, z: float = 0) -> cu.FloatArray:
+    offsets = [
+        (spacing * (i - size // 2), spacing * (j - size // 2), z)
+        for i in range(size)
+        for j in range(size)
+    ]
+    return ci.make_translation_matrices(offsets)
+
+
+def _scale(factor: float) -> cu.Matrix4x4:
+    matrix = np.eye(4) * factor
+    matrix[3, 3] = 1
+    return cu.Matrix4x4(matrix)
+
+
+def test_grid_crossing_window_border(teapot: cm.IndexedMesh) -> None:
+    # 11 x 11 instances, most of them outside the window
+    matrices = _grid(11, spacing=5.0)
+    trans = _scale(0.3)
+
+    visible = ci.visible_instances(teapot, matrices, trans, ZPP, ZCP, WINDOW)
+    assert 0 < visible.sum() < len(matrices)
+
+    port = _make_viewport()
+    drawn = ci.draw_instances_wireframe(
+        teapot, matrices, trans, ZPP, ZCP, WINDOW, port, cc.ColorId(1)
+    )
+    assert drawn == visible.sum()
+
+    # the same as drawing every instance, clipped, on its own
+    expected = _make_viewport()
+    for matrix in matrices:
+        cm.draw_mesh_wireframe(
+            teapot,
+            cu.Matrix4x4(trans @ matrix),
+            ZPP,
+            ZCP,
+            WINDOW,
+            expected,
+            cc.ColorId(1),
+        )
+    np.testing.assert_array_equal(port.device.raw_buffer, expected.device.raw_buffer)
+    # instances are cut by every side of the viewport
+    buffer = port.device.raw_buffer
+    assert buffer[0].any() and buffer[-1].any()
+    assert buffer[:, 0].any() and buffer[:, -1].any()
+
+
+def test_instances_behind_center_of_projection(teapot: cm.IndexedMesh) -> None:
+    matrices = ci.make_translation_matrices(
+        [
+            (0, 0, ZCP - 50),  # entirely behind
+            (0, 0, ZCP),  # around the center of projection
+            (0, 0, 0),  # in front
+        ]
+    )
+    trans = _scale(1.0)
+
+    visible = ci.visible_instances(teapot, matrices, trans, ZPP, ZCP, WINDOW)
+    np.testing.assert_array_equal(visible, [False, True, True])
+
+    port = _make_viewport()
+    drawn = ci.draw_instances_wireframe(
+        teapot, matrices, trans, ZPP, ZCP, WINDOW, port, cc.ColorId(1)
+    )
+    assert drawn == 2
+    assert (port.device.raw_buffer == 1).any()
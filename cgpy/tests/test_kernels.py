@@ -0,0 +1,199 @@
+import typing
+
+import hypothesis
+import hypothesis.strategies as st
+import numpy as np
+import numpy.typing as npt
+import pytest
+
+import cgpy.colors as cc
+import cgpy.kernels as kernels
+
+NUM_ROWS = 40
+NUM_COLUMNS = 60
+
+requires_numba = pytest.mark.skipif(
+    kernels.NUMBA_BACKEND not in kernels.available_backends(),
+    reason="numba não está instalado",
+)
+
+
+def _run_with_backend(
+    name: str,
+    draw: typing.Callable[[kernels.Buffer, kernels.Counts], int],
+    buffer: kernels.Buffer,
+) -> tuple[kernels.Buffer, kernels.Counts, int]:
+    previous = kernels.get_backend()
+    kernels.set_backend(name)
+    try:
+        result = buffer.copy()
+        counts = np.zeros(shape=buffer.shape, dtype=np.uint32)
+        writes = draw(result, counts)
+    finally:
+        kernels.set_backend(previous)
+    return result, counts, writes
+
+
+def _assert_backends_agree(
+    draw: typing.Callable[[kernels.Buffer, kernels.Counts], int],
+    buffer: kernels.Buffer,
+) -> None:
+    expected = _run_with_backend(kernels.PYTHON_BACKEND, draw, buffer)
+    actual = _run_with_backend(kernels.NUMBA_BACKEND, draw, buffer)
+
+    np.testing.assert_array_equal(actual[0], expected[0])
+    np.testing.assert_array_equal(actual[1], expected[1])
+    assert actual[2] == expected[2]
+    # every write is counted once
+    assert int(expected[1].sum()) == expected[2]
+
+
+def _empty_buffer() -> kernels.Buffer:
+    return np.zeros(shape=(NUM_ROWS, NUM_COLUMNS), dtype=cc.ColorId)
+
+
+def _random_segments(rng: np.random.Generator, n: int) -> npt.NDArray[np.int64]:
+    segments = np.empty(shape=(n, 4), dtype=np.int64)
+    segments[:, 0::2] = rng.integers(0, NUM_COLUMNS, size=(n, 2))
+    segments[:, 1::2] = rng.integers(0, NUM_ROWS, size=(n, 2))
+    return segments
+
+
+@requires_numba
+@hypothesis.settings(deadline=None, max_examples=50)
+@hypothesis.given(
+    x0=st.integers(0, NUM_COLUMNS - 1),
+    y0=st.integers(0, NUM_ROWS - 1),
+    x1=st.integers(0, NUM_COLUMNS - 1),
+    y1=st.integers(0, NUM_ROWS - 1),
+)
+def test_line_backends_agree(x0: int, y0: int, x1: int, y1: int) -> None:
+    _assert_backends_agree(
+        lambda buffer, counts: kernels.draw_line(
+            buffer, x0, y0, x1, y1, cc.ColorId(1), counts=counts
+        ),
+        _empty_buffer(),
+    )
+
+
+@requires_numba
+@pytest.mark.parametrize("seed", range(5))
+def test_lines_backends_agree(seed: int) -> None:
+    segments = _random_segments(np.random.default_rng(seed), 200)
+    _assert_backends_agree(
+        lambda buffer, counts: kernels.draw_lines(
+            buffer, segments, cc.ColorId(2), counts=counts
+        ),
+        _empty_buffer(),
+    )
+
+
+@requires_numba
+@pytest.mark.parametrize("seed", range(5))
+def test_flood_fill_backends_agree(seed: int) -> None:
+    rng = np.random.default_rng(seed)
+    border = cc.ColorId(1)
+
+    buffer = _empty_buffer()
+    kernels.draw_lines(buffer, _random_segments(rng, 15), border)
+    seed_x = int(rng.integers(1, NUM_COLUMNS))
+    seed_y = int(rng.integers(1, NUM_ROWS))
+
+    _assert_backends_agree(
+        lambda buffer, counts: kernels.flood_fill(
+            buffer, seed_x, seed_y, cc.ColorId(3), border, counts=counts
+        ),
+        buffer,
+    )
+
+
+@requires_numba
+@pytest.mark.parametrize("seed", range(5))
+def test_spans_backends_agree(seed: int) -> None:
+    rng = np.random.default_rng(seed)
+    n = 100
+
+    # includes empty spans (x0 >= x1), which write nothing
+    spans = np.empty(shape=(n, 3), dtype=np.int64)
+    spans[:, 0] = rng.integers(0, NUM_ROWS, size=n)
+    spans[:, 1:] = rng.integers(0, NUM_COLUMNS + 1, size=(n, 2))
+
+    _assert_backends_agree(
+        lambda buffer, counts: kernels.fill_spans(
+            buffer, spans, cc.ColorId(4), counts=counts
+        ),
+        _empty_buffer(),
+    )
+
+
+@pytest.mark.parametrize("backend", kernels.available_backends())
+@pytest.mark.parametrize("seed", range(3))
+def test_lines_outside_buffer_are_cropped(backend: str, seed: int) -> None:
+    # drawing into a larger buffer and cropping its center
+    # gives the pixels that should be written in the smaller one
+    margin = 50
+    rng = np.random.default_rng(seed)
+    segments = np.empty(shape=(100, 4), dtype=np.int64)
+    segments[:, 0::2] = rng.integers(0, NUM_COLUMNS + 2 * margin, size=(100, 2))
+    segments[:, 1::2] = rng.integers(0, NUM_ROWS + 2 * margin, size=(100, 2))
+
+    large = np.zeros(
+        shape=(NUM_ROWS + 2 * margin, NUM_COLUMNS + 2 * margin), dtype=cc.ColorId
+    )
+    kernels.draw_lines(large, segments, cc.ColorId(1))
+    expected = large[margin:-margin, margin:-margin]
+
+    shifted = segments - margin
+    buffer, counts, writes = _run_with_backend(
+        backend,
+        lambda buffer, counts: kernels.draw_lines(
+            buffer, shifted, cc.ColorId(1), counts=counts
+        ),
+        _empty_buffer(),
+    )
+
+    np.testing.assert_array_equal(buffer, expected)
+    assert int(counts.sum()) == writes
+
+
+@pytest.mark.parametrize("backend", kernels.available_backends())
+def test_spans_outside_buffer_are_cropped(backend: str) -> None:
+    spans = np.asarray(
+        [
+            (-1, 0, NUM_COLUMNS),
+            (NUM_ROWS, 0, NUM_COLUMNS),
+            (0, -10, 5),
+            (1, NUM_COLUMNS - 5, NUM_COLUMNS + 10),
+            (2, -10, NUM_COLUMNS + 10),
+        ],
+        dtype=np.int64,
+    )
+
+    buffer, counts, writes = _run_with_backend(
+        backend,
+        lambda buffer, counts: kernels.fill_spans(
+            buffer, spans, cc.ColorId(1), counts=counts
+        ),
+        _empty_buffer(),
+    )
+
+    expected = _empty_buffer()
+    expected[0, :5] = 1
+    expected[1, NUM_COLUMNS - 5 :] = 1
+    expected[2, :] = 1
+    np.testing.assert_array_equal(buffer, expected)
+    assert writes == 5 + 5 + NUM_COLUMNS
+    assert int(counts.sum()) == writes
+
+
+def test_without_counts_returns_writes() -> None:
+    buffer = _empty_buffer()
+    writes = kernels.draw_line(buffer, 0, 0, 9, 3, cc.ColorId(1))
+
+    assert writes == 10
+    assert int(np.count_nonzero(buffer)) == 10
+
+
+def test_unknown_backend() -> None:
+    with pytest.raises(ValueError):
+        kernels.set_backend("cuda")
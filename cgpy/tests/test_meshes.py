@@ -0,0 +1,253 @@
+import pathlib
+
+import numpy as np
+import pytest
+
+import cgpy.colors as cc
+import cgpy.devices as cd
+import cgpy.meshes as cm
+import cgpy.universes as cu
+
+ZPP = 40
+ZCP = -45
+WINDOW = cu.Window(-10, -10, 10, 10)
+
+
+def _make_sphere(
+    radius: float = 5.0,
+    num_rings: int = 12,
+    num_segments: int = 20,
+) -> cm.IndexedMesh:
+    # a UV sphere centered at the origin, with the faces pointing out
+    theta = np.linspace(0, np.pi, num_rings + 1)[1:-1]
+    phi = np.linspace(0, 2 * np.pi, num_segments, endpoint=False)
+    rings = np.stack(
+        [
+            np.outer(np.sin(theta), np.cos(phi)),
+            np.outer(np.cos(theta), np.ones_like(phi)),
+            np.outer(np.sin(theta), np.sin(phi)),
+        ],
+        axis=-1,
+    ).reshape(-1, 3)
+    vertices = radius * np.concatenate([[[0, 1, 0]], rings, [[0, -1, 0]]])
+
+    def ring_vertex(ring: int, segment: int) -> int:
+        return 1 + ring * num_segments + segment % num_segments
+
+    south = len(vertices) - 1
+    faces = []
+    for s in range(num_segments):
+        faces.append((0, ring_vertex(0, s), ring_vertex(0, s + 1)))
+        faces.append(
+            (south, ring_vertex(num_rings - 2, s + 1), ring_vertex(num_rings - 2, s))
+        )
+        for r in range(num_rings - 2):
+            a, b = ring_vertex(r, s), ring_vertex(r, s + 1)
+            c, d = ring_vertex(r + 1, s), ring_vertex(r + 1, s + 1)
+            faces += [(a, c, b), (b, c, d)]
+
+    faces_array = np.asarray(faces)
+    outward = _face_normals(vertices, faces_array)
+    centroids = vertices[faces_array].mean(axis=1)
+    inward = np.einsum("ij,ij->i", outward, centroids) < 0
+    faces_array[inward] = faces_array[inward][:, ::-1]
+
+    return cm.make_indexed_mesh(vertices, faces_array, dtype=np.float64)
+
+
+def _face_normals(vertices: np.ndarray, faces: np.ndarray) -> np.ndarray:
+    corners = vertices[faces]
+    return np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+
+
+def _make_viewport() -> cd.Viewport:
+    device = cd.Device(num_rows=120, num_columns=160)
+    return cd.Viewport(
+        lower_left=cd.DevicePoint(0, 0),
+        num_rows=device.num_rows,
+        num_columns=device.num_columns,
+        device=device,
+    )
+
+
+@pytest.mark.parametrize("target_num_faces", [300, 100, 20])
+def test_simplify_mesh_respects_face_budget(target_num_faces: int) -> None:
+    mesh = _make_sphere()
+    simplified = cm.simplify_mesh(mesh, target_num_faces)
+
+    assert 0 < simplified.num_faces <= target_num_faces
+    # unused vertices are dropped
+    assert np.array_equal(
+        np.unique(simplified.faces), np.arange(simplified.num_vertices)
+    )
+
+
+def _make_jittered_grid(size: int, seed: int) -> cm.IndexedMesh:
+    # a flat (z = 0) mesh facing +z, with the interior vertices jittered
+    # so that collapses can fold faces over their neighbours
+    xs, ys = np.meshgrid(np.arange(size + 1.0), np.arange(size + 1.0))
+    vertices = np.stack([xs.ravel(), ys.ravel(), np.zeros(xs.size)], axis=1)
+
+    interior = (np.minimum(vertices[:, 0], vertices[:, 1]) > 0) & (
+        np.maximum(vertices[:, 0], vertices[:, 1]) < size
+    )
+    rng = np.random.default_rng(seed)
+    vertices[interior, :2] += rng.uniform(-0.3, 0.3, size=(interior.sum(), 2))
+
+    faces = []
+    for row in range(size):
+        for column in range(size):
+            a = row * (size + 1) + column
+            b, c, d = a + 1, a + size + 1, a + size + 2
+            faces += [(a, b, d), (a, d, c)]
+
+    return cm.make_indexed_mesh(vertices, faces, dtype=np.float64)
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("target_num_faces", [60, 20])
+def test_simplify_mesh_does_not_flip_faces(seed: int, target_num_faces: int) -> None:
+    mesh = _make_jittered_grid(12, seed)
+    assert (_face_normals(mesh.vertices, mesh.faces)[:, 2] > 0).all()
+
+    simplified = cm.simplify_mesh(mesh, target_num_faces)
+
+    # on a plane, a flipped face is one whose normal points to -z
+    normals = _face_normals(simplified.vertices, simplified.faces)
+    assert (normals[:, 2] >= 0).all()
+
+
+def test_levels_of_detail_round_trip_through_cache(
+    tmp_path: pathlib.Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    mesh = _make_sphere()
+    cache_path = tmp_path / "sphere.lods.npz"
+
+    built = cm.load_or_build_levels_of_detail(mesh, cache_path, min_num_faces=50)
+    assert cache_path.exists()
+    assert len(built.levels) > 1
+
+    def fail(*args: object, **kwargs: object) -> cm.LevelsOfDetail:
+        raise AssertionError("os níveis deveriam vir do cache")
+
+    monkeypatch.setattr(cm, "build_levels_of_detail", fail)
+    loaded = cm.load_or_build_levels_of_detail(mesh, cache_path, min_num_faces=50)
+
+    assert len(loaded.levels) == len(built.levels)
+    for built_level, loaded_level in zip(built.levels, loaded.levels):
+        np.testing.assert_array_equal(loaded_level.vertices, built_level.vertices)
+        np.testing.assert_array_equal(loaded_level.faces, built_level.faces)
+
+
+def test_levels_of_detail_cache_of_other_mesh_is_rebuilt(
+    tmp_path: pathlib.Path,
+) -> None:
+    cache_path = tmp_path / "sphere.lods.npz"
+    cm.load_or_build_levels_of_detail(_make_sphere(), cache_path, min_num_faces=50)
+
+    other = _make_sphere(radius=3.0)
+    lods = cm.load_or_build_levels_of_detail(other, cache_path, min_num_faces=50)
+
+    np.testing.assert_array_equal(lods.full_detail.vertices, other.vertices)
+    np.testing.assert_array_equal(
+        cm.load_levels_of_detail(cache_path).full_detail.vertices, other.vertices
+    )
+
+
+@pytest.mark.parametrize("degrees", [0, 30, 125])
+def test_wireframe_matches_draw_polygon(degrees: float) -> None:
+    mesh = _make_sphere()
+    rotation = cu.make_y_rotation_3d(degrees) @ cu.make_x_rotation_3d(20)
+    trans = cu.Matrix4x4(rotation)
+
+    port = _make_viewport()
+    cm.draw_mesh_wireframe(mesh, trans, ZPP, ZCP, WINDOW, port, cc.ColorId(1))
+
+    expected_port = _make_viewport()
+    obj = cu.transform_object(cm.mesh_to_object3d(mesh), trans)
+    projected = cu.perspective_project_object(obj, zpp=ZPP, zcp=ZCP)
+    for poly in cu.object3d_to_object2d(projected):
+        npoly = cu.normalize_polygon(poly, WINDOW)
+        cd.draw_polygon(npoly, expected_port, cc.ColorId(1))
+
+    assert (expected_port.device.raw_buffer == 1).any()
+    np.testing.assert_array_equal(
+        port.device.raw_buffer, expected_port.device.raw_buffer
+    )
+
+
+def _wireframe(
+    mesh: cm.IndexedMesh, trans: cu.Matrix4x4, window: cu.Window = WINDOW
+) -> np.ndarray:
+    port = _make_viewport()
+    cm.draw_mesh_wireframe(mesh, trans, ZPP, ZCP, window, port, cc.ColorId(1))
+    return port.device.raw_buffer
+
+
+def test_faces_outside_window_do_not_change_other_edges() -> None:
+    sphere = _make_sphere()
+    trans = cu.Matrix4x4(cu.make_y_rotation_3d(30))
+
+    # a triangle far to the right of the window forces the clipping path
+    outside = np.asarray([(40, 0, 0), (50, 0, 0), (45, 5, 0)])
+    with_outside = cm.make_indexed_mesh(
+        np.concatenate([sphere.vertices, outside]),
+        np.concatenate([sphere.faces, [np.arange(3) + sphere.num_vertices]]),
+        dtype=np.float64,
+    )
+
+    np.testing.assert_array_equal(
+        _wireframe(with_outside, trans), _wireframe(sphere, trans)
+    )
+
+
+def _distances_to_segments(points: np.ndarray, segments: np.ndarray) -> np.ndarray:
+    # distance from each point (P, 2) to the closest segment (S, 2, 2)
+    starts = segments[np.newaxis, :, 0]
+    deltas = segments[np.newaxis, :, 1] - starts
+    lengths = np.maximum((deltas**2).sum(axis=2), 1e-12)
+    t = ((points[:, np.newaxis] - starts) * deltas).sum(axis=2) / lengths
+    closest = starts + np.clip(t, 0, 1)[..., np.newaxis] * deltas
+    distances: np.ndarray = np.linalg.norm(points[:, np.newaxis] - closest, axis=2)
+    return distances.min(axis=1)
+
+
+@pytest.mark.parametrize("degrees", [0, 45])
+def test_wireframe_crossing_window_is_clipped(degrees: float) -> None:
+    mesh = _make_sphere()
+    trans = cu.Matrix4x4(cu.make_y_rotation_3d(degrees))
+    # the sphere is larger than the window
+    window = cu.Window(-4, -3, 6, 3)
+    buffer = _wireframe(mesh, trans, window)
+
+    # the exact segments, in (unclipped and untruncated) device coordinates
+    port = _make_viewport()
+    points = cu.transform_points_3d(cu.make_points4(mesh.vertices), trans)
+    projected = cu.perspective_project_points(points, zpp=ZPP, zcp=ZCP)
+    normalized = cu.normalize_points_2d(projected, window)
+    scale = np.asarray([port.num_columns - 1, port.num_rows - 1])
+    segments = (normalized * scale)[mesh.edges]
+
+    # every drawn pixel lies on a segment (truncation moves it by up to a pixel)
+    rows, columns = np.nonzero(buffer)
+    drawn = np.stack([columns, rows], axis=1).astype(np.float64)
+    assert len(drawn) > 0
+    assert _distances_to_segments(drawn, segments).max() <= 1.5
+
+    # and every segment is drawn where it is inside the viewport
+    t = np.linspace(0, 1, 50)[:, np.newaxis, np.newaxis]
+    samples = (segments[:, 0] + t * (segments[:, 1] - segments[:, 0])).reshape(-1, 2)
+    samples = samples[((samples >= 0) & (samples <= scale)).all(axis=1)]
+    assert len(samples) < 50 * len(segments)
+    assert (
+        _distances_to_segments(samples, drawn[:, np.newaxis].repeat(2, 1)).max() <= 1.5
+    )
+
+
+def test_wireframe_behind_center_of_projection_is_clipped() -> None:
+    # the center of projection is inside the sphere
+    mesh = _make_sphere(radius=60.0)
+    buffer = _wireframe(mesh, cu.Matrix4x4(cu.make_y_rotation_3d(10)))
+
+    assert (buffer == 1).any()
@@ -0,0 +1,83 @@
+import pathlib
+
+import numpy as np
+import pytest
+
+import cgpy.colors as cc
+import cgpy.devices as cd
+import cgpy.meshes as cm
+import cgpy.outofcore as oc
+import cgpy.universes as cu
+
+ZPP = 40
+ZCP = -45
+WINDOW = cu.Window(-10, -10, 10, 10)
+
+
+def _make_surface(extent: float, size: int = 10) -> cm.IndexedMesh:
+    # a wavy grid, so that most edges are shared by two faces
+    xs, ys = np.meshgrid(
+        np.linspace(-extent, extent, size + 1), np.linspace(-extent, extent, size + 1)
+    )
+    zs = 0.2 * extent * np.sin(xs) * np.cos(ys)
+    vertices = np.stack([xs.ravel(), ys.ravel(), zs.ravel()], axis=1)
+
+    faces = []
+    for row in range(size):
+        for column in range(size):
+            a = row * (size + 1) + column
+            b, c, d = a + 1, a + size + 1, a + size + 2
+            faces += [(a, b, d), (a, d, c)]
+
+    return cm.make_indexed_mesh(vertices, faces, dtype=np.float64)
+
+
+def _make_viewport() -> cd.Viewport:
+    device = cd.Device(num_rows=90, num_columns=120)
+    return cd.Viewport(
+        lower_left=cd.DevicePoint(0, 0),
+        num_rows=device.num_rows,
+        num_columns=device.num_columns,
+        device=device,
+    )
+
+
+@pytest.mark.parametrize(
+    "extent",
+    [
+        6.0,  # inside the window
+        25.0,  # crossing the window
+        80.0,  # crossing the plane of the center of projection
+    ],
+)
+@pytest.mark.parametrize("degrees", [0, 70])
+def test_streaming_matches_draw_mesh_wireframe(
+    tmp_path: pathlib.Path,
+    extent: float,
+    degrees: float,
+) -> None:
+    mesh = _make_surface(extent)
+    trans = cu.Matrix4x4(cu.make_x_rotation_3d(degrees))
+
+    oc.save_mesh_npy(mesh, tmp_path / "mesh")
+    mapped = oc.open_mesh_npy(tmp_path / "mesh")
+    assert isinstance(mapped.vertices, np.memmap)
+
+    # 7 faces per block, so edges are shared by faces of different blocks
+    port = _make_viewport()
+    oc.draw_mesh_wireframe_streaming(
+        mapped,
+        trans,
+        ZPP,
+        ZCP,
+        WINDOW,
+        port,
+        cc.ColorId(1),
+        max_memory_bytes=7 * oc.BYTES_PER_FACE,
+    )
+
+    expected = _make_viewport()
+    cm.draw_mesh_wireframe(mesh, trans, ZPP, ZCP, WINDOW, expected, cc.ColorId(1))
+
+    assert (expected.device.raw_buffer == 1).any()
+    np.testing.assert_array_equal(port.device.raw_buffer, expected.device.raw_buffer)
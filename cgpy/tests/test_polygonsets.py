@@ -0,0 +1,80 @@
+import numpy as np
+import numpy.typing as npt
+import pytest
+
+import cgpy.devices as cd
+import cgpy.polygonsets as cps
+
+
+def _make_viewport() -> cd.Viewport:
+    device = cd.Device(num_rows=50, num_columns=70)
+    return cd.Viewport(
+        lower_left=cd.DevicePoint(5, 3),
+        num_rows=40,
+        num_columns=60,
+        device=device,
+    )
+
+
+def _random_polygons(
+    rng: np.random.Generator,
+    num_polygons: int,
+) -> list[npt.NDArray[np.float64]]:
+    # random vertices make concave and self-intersecting polygons
+    return [
+        rng.uniform(0, 1, size=(rng.integers(3, 9), 2)) for _ in range(num_polygons)
+    ]
+
+
+def _even_odd_coverage(
+    polygons: list[npt.NDArray[np.float64]],
+    port: cd.Viewport,
+) -> npt.NDArray[np.int64]:
+    # for every pixel and polygon, counts the crossings to the left of
+    # (or at) the pixel, with the same half-open rule for the rows
+    coverage = np.zeros(shape=(port.num_rows, port.num_columns), dtype=np.int64)
+    ys, xs = np.mgrid[
+        port.inclusive_bottom : port.exclusive_top,
+        port.inclusive_left : port.exclusive_right,
+    ]
+
+    for polygon in polygons:
+        px = port.lower_left.x + polygon[:, 0] * (port.num_columns - 1)
+        py = port.lower_left.y + polygon[:, 1] * (port.num_rows - 1)
+        inside = np.zeros(shape=coverage.shape, dtype=bool)
+
+        for (x0, y0), (x1, y1) in zip(
+            zip(px, py), zip(np.roll(px, -1), np.roll(py, -1))
+        ):
+            crossed = (np.minimum(y0, y1) <= ys) & (ys < np.maximum(y0, y1))
+            with np.errstate(divide="ignore", invalid="ignore"):
+                crossing = x0 + (ys - y0) / (y1 - y0) * (x1 - x0)
+            inside ^= crossed & (crossing <= xs)
+
+        coverage += inside
+    return coverage
+
+
+def _span_coverage(
+    spans: npt.NDArray[np.int64],
+    port: cd.Viewport,
+) -> npt.NDArray[np.int64]:
+    coverage = np.zeros(shape=(port.num_rows, port.num_columns), dtype=np.int64)
+    for y, x0, x1 in spans.tolist():
+        row = y - port.inclusive_bottom
+        coverage[row, x0 - port.inclusive_left : x1 - port.inclusive_left] += 1
+    return coverage
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_spans_match_even_odd_rule(seed: int) -> None:
+    polygons = _random_polygons(np.random.default_rng(seed), num_polygons=6)
+    port = _make_viewport()
+
+    spans = cps.polygon_set_spans(
+        cps.make_polygon_set(polygons, dtype=np.float64), port
+    )
+
+    np.testing.assert_array_equal(
+        _span_coverage(spans, port), _even_odd_coverage(polygons, port)
+    )
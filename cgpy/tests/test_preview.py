@@ -0,0 +1,61 @@
+import threading
+import time
+
+import numpy as np
+
+import cgpy.colors as cc
+import cgpy.devices as cd
+import cgpy.preview as cp
+import cgpy.universes as cu
+
+
+def _wait_for_refined(renderer: cp.ProgressiveRenderer[int]) -> cd.Device:
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        refined = renderer.poll()
+        if refined is not None:
+            return refined
+        time.sleep(0.01)
+    raise TimeoutError
+
+
+def test_refinement_uses_precision_of_request() -> None:
+    precisions = []
+
+    def render(scene: int, port: cd.Viewport, token: cp.CancellationToken) -> None:
+        precisions.append(cu.get_precision())
+        # fails if the vectors and the validation disagree on the precision
+        polygon = [
+            cu.NormalizedPoint(cu.make_vector3(0.1, 0.1)),
+            cu.NormalizedPoint(cu.make_vector3(0.9, 0.9)),
+        ]
+        cd.draw_polygon(polygon, port, cc.ColorId(scene))
+
+    renderer = cp.ProgressiveRenderer(render, 40, 60, idle_seconds=0)
+    try:
+        with cu.precision(np.float32):
+            renderer.request(1)
+        refined = _wait_for_refined(renderer)
+    finally:
+        renderer.close()
+
+    assert precisions == [np.float32, np.float32]
+    assert (refined.raw_buffer == 1).any()
+
+
+def test_on_refined_is_called_when_refinement_is_ready() -> None:
+    def render(scene: int, port: cd.Viewport, token: cp.CancellationToken) -> None:
+        port.device.raw_buffer[:] = scene
+
+    ready = threading.Event()
+    renderer = cp.ProgressiveRenderer(render, 40, 60, idle_seconds=0)
+    renderer.set_on_refined(ready.set)
+    try:
+        renderer.request(2)
+        assert ready.wait(timeout=10)
+        refined = renderer.poll()
+    finally:
+        renderer.close()
+
+    assert refined is not None
+    assert (refined.raw_buffer == 2).all()
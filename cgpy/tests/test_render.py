@@ -0,0 +1,165 @@
+import pathlib
+
+import numpy as np
+import pytest
+
+import cgpy.meshes as cm
+import cgpy.outofcore as oc
+import cgpy.render as cr
+
+
+@pytest.fixture
+def mesh_path(tmp_path: pathlib.Path) -> pathlib.Path:
+    path = tmp_path / "tetrahedron.npz"
+    vertices = 2 * np.asarray([(1, 1, 1), (1, -1, -1), (-1, 1, -1), (-1, -1, 1)])
+    faces = np.asarray([(0, 1, 2), (0, 3, 1), (0, 2, 3), (1, 3, 2)])
+    np.savez(path, vertices=vertices, faces=faces)
+    return path
+
+
+def _render(mesh_path: pathlib.Path, output: pathlib.Path, *options: str) -> int:
+    return cr.main(
+        [
+            str(mesh_path),
+            "--output",
+            str(output),
+            "--format",
+            "npz",
+            "--resolution",
+            "40x30",
+            "--rotate-y",
+            "0",
+            "3",
+            "1",
+            "--workers",
+            "1",
+            *options,
+        ]
+    )
+
+
+def test_resume_with_same_options(
+    mesh_path: pathlib.Path,
+    tmp_path: pathlib.Path,
+) -> None:
+    output = tmp_path / "frames"
+    assert _render(mesh_path, output) == 0
+    frames = sorted(output.glob("frame_*.npz"))
+    assert len(frames) == 3
+    assert (output / cr.MANIFEST_NAME).exists()
+
+    # an interrupted job: a missing frame and a partially written one
+    frames[1].unlink()
+    (output / f".{frames[1].name}.tmp").write_bytes(b"partial")
+
+    assert _render(mesh_path, output) == 0
+    assert sorted(output.glob("frame_*.npz")) == frames
+    assert not list(output.glob(".*.tmp"))
+
+
+def test_refuses_to_resume_with_other_options(
+    mesh_path: pathlib.Path,
+    tmp_path: pathlib.Path,
+) -> None:
+    output = tmp_path / "frames"
+    assert _render(mesh_path, output) == 0
+    frames = sorted(output.glob("frame_*.npz"))
+    frames[0].unlink()
+
+    assert _render(mesh_path, output, "--zpp", "30") == 1
+    assert sorted(output.glob("frame_*.npz")) == frames[1:]
+
+
+def test_refuses_frames_without_manifest(
+    mesh_path: pathlib.Path,
+    tmp_path: pathlib.Path,
+) -> None:
+    output = tmp_path / "frames"
+    assert _render(mesh_path, output) == 0
+    (output / cr.MANIFEST_NAME).unlink()
+
+    assert _render(mesh_path, output) == 1
+
+
+def _frames(output: pathlib.Path) -> list[np.ndarray]:
+    return [np.load(path)["buffer"] for path in sorted(output.glob("frame_*.npz"))]
+
+
+def test_mesh_larger_than_window_is_clipped(
+    mesh_path: pathlib.Path,
+    tmp_path: pathlib.Path,
+) -> None:
+    output = tmp_path / "frames"
+    assert _render(mesh_path, output, "--window", "-1", "-1", "1", "1") == 0
+
+    frames = _frames(output)
+    assert len(frames) == 3
+    # the edges reach the border of the image
+    assert all(frame[:, [0, -1]].any() or frame[[0, -1]].any() for frame in frames)
+
+
+def test_mesh_directory_is_streamed(
+    mesh_path: pathlib.Path,
+    tmp_path: pathlib.Path,
+) -> None:
+    mesh = cr.load_mesh(mesh_path, None)
+    assert isinstance(mesh, cm.IndexedMesh)
+    directory = tmp_path / "mesh"
+    oc.save_mesh_npy(mesh, directory)
+    assert isinstance(cr.load_mesh(directory, None), oc.MappedMesh)
+
+    assert _render(mesh_path, tmp_path / "from_file") == 0
+    assert _render(directory, tmp_path / "from_directory") == 0
+
+    expected = _frames(tmp_path / "from_file")
+    for frame, expected_frame in zip(_frames(tmp_path / "from_directory"), expected):
+        np.testing.assert_array_equal(frame, expected_frame)
+
+
+@pytest.fixture
+def grid_path(tmp_path: pathlib.Path) -> pathlib.Path:
+    # a flat 16 x 16 grid (512 faces), facing the observer
+    path = tmp_path / "grid.npz"
+    size = 16
+    xs, ys = np.meshgrid(np.linspace(-8, 8, size + 1), np.linspace(-8, 8, size + 1))
+    vertices = np.stack([xs.ravel(), ys.ravel(), np.zeros(xs.size)], axis=1)
+    faces = []
+    for row in range(size):
+        for column in range(size):
+            a = row * (size + 1) + column
+            b, c, d = a + 1, a + size + 1, a + size + 2
+            faces += [(a, b, d), (a, d, c)]
+    np.savez(path, vertices=vertices, faces=np.asarray(faces))
+    return path
+
+
+def test_levels_of_detail_are_selected_per_frame(
+    grid_path: pathlib.Path,
+    tmp_path: pathlib.Path,
+) -> None:
+    assert _render(grid_path, tmp_path / "full") == 0
+    full = _frames(tmp_path / "full")
+
+    # a face per (at most) a millionth of a pixel: always the full detail
+    assert _render(grid_path, tmp_path / "fine", "--lod-pixels-per-face", "1e-6") == 0
+    lods_path = cr.levels_of_detail_path(grid_path)
+    assert len(cm.load_levels_of_detail(lods_path).levels) > 1
+    for frame, expected in zip(_frames(tmp_path / "fine"), full):
+        np.testing.assert_array_equal(frame, expected)
+
+    # a face per million pixels: always the coarsest level
+    assert _render(grid_path, tmp_path / "coarse", "--lod-pixels-per-face", "1e6") == 0
+    for frame, expected in zip(_frames(tmp_path / "coarse"), full):
+        assert 0 < np.count_nonzero(frame) < np.count_nonzero(expected)
+
+
+def test_levels_of_detail_require_mesh_file(
+    mesh_path: pathlib.Path,
+    tmp_path: pathlib.Path,
+) -> None:
+    directory = tmp_path / "mesh"
+    mesh = cr.load_mesh(mesh_path, None)
+    assert isinstance(mesh, cm.IndexedMesh)
+    oc.save_mesh_npy(mesh, directory)
+
+    assert _render(directory, tmp_path / "frames", "--lod-pixels-per-face", "4") == 1
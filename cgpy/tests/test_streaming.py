@@ -0,0 +1,68 @@
+import socket
+import time
+
+import numpy as np
+
+import cgpy.colors as cc
+import cgpy.devices as cd
+import cgpy.streaming as cs
+
+PALETTE = cc.Palette([cc.Color(0, 0, 0), cc.Color(1, 0, 0), cc.Color(0, 1, 0)])
+
+
+def _wait_for_clients(server: cs.FrameServer, n: int) -> None:
+    deadline = time.monotonic() + 5
+    while server.num_clients < n:
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+
+def _random_device(rng: np.random.Generator) -> cd.Device:
+    # random indices barely compress, so every frame is large
+    buffer = rng.integers(0, len(PALETTE), size=(400, 400)).astype(cc.ColorId)
+    return cd.Device.from_buffer(buffer)
+
+
+def test_frames_round_trip() -> None:
+    rng = np.random.default_rng(0)
+    devices = [_random_device(rng) for _ in range(3)]
+
+    server = cs.FrameServer(port=0)
+    client = cs.FrameClient(*server.address)
+    try:
+        _wait_for_clients(server, 1)
+        for device in devices:
+            server.publish(device, PALETTE)
+    finally:
+        server.close()
+
+    received = list(client)
+    client.close()
+
+    assert len(received) == len(devices)
+    for frame, device in zip(received, devices):
+        np.testing.assert_array_equal(frame.device.raw_buffer, device.raw_buffer)
+        assert frame.colors == [(0, 0, 0), (255, 0, 0), (0, 255, 0)]
+
+
+def test_stalled_client_is_dropped() -> None:
+    rng = np.random.default_rng(0)
+    server = cs.FrameServer(port=0, send_timeout_seconds=0.1)
+
+    # connects, but never reads
+    stalled = socket.create_connection(server.address)
+    stalled.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+    try:
+        _wait_for_clients(server, 1)
+
+        start = time.monotonic()
+        for _ in range(100):
+            server.publish(_random_device(rng), PALETTE)
+            if server.num_clients == 0:
+                break
+
+        assert server.num_clients == 0
+        assert time.monotonic() - start < 5
+    finally:
+        stalled.close()
+        server.close()
@@ -1,10 +1,52 @@
+import contextlib
+import contextvars
 import dataclasses
 import typing
 
 import numpy as np
 import numpy.typing as npt
 
-FloatArray = npt.NDArray[np.float64]
+FloatArray = npt.NDArray[np.floating[typing.Any]]
+
+SUPPORTED_PRECISIONS = (np.dtype(np.float32), np.dtype(np.float64))
+
+_precision: contextvars.ContextVar[np.dtype[typing.Any]] = contextvars.ContextVar(
+    "precision", default=np.dtype(np.float64)
+)
+
+
+def get_precision() -> np.dtype[typing.Any]:
+    return _precision.get()
+
+
+def set_precision(dtype: npt.DTypeLike) -> None:
+    """
+    Define o tipo (float32 ou float64) dos vetores e matrizes criados
+    (e aceitos pelos validadores) no contexto atual.
+
+    Com float32, as coordenadas têm ~7 dígitos significativos: pontos que
+    caem a menos de ~1e-4 pixel de uma fronteira entre pixels podem ser
+    mapeados para o pixel vizinho, ou seja, as imagens podem diferir das
+    geradas com float64 em pixels isolados, por no máximo 1 pixel de distância.
+    """
+    precision = np.dtype(dtype)
+    if precision not in SUPPORTED_PRECISIONS:
+        raise ValueError(f"precisão não suportada: {precision}")
+    _precision.set(precision)
+
+
+@contextlib.contextmanager
+def precision(dtype: npt.DTypeLike) -> typing.Iterator[None]:
+    """
+    Usa `dtype` como precisão apenas dentro do bloco `with`.
+    """
+    previous = get_precision()
+    set_precision(dtype)
+    try:
+        yield
+    finally:
+        _precision.set(previous)
+
 
 # 2d
 Vector3 = typing.NewType("Vector3", FloatArray)
@@ -51,20 +93,20 @@ class Window:
 
 
 def make_vector4(x: float, y: float, z: float) -> Vector4:
-    vec = np.asfarray((x, y, z, 1)).reshape(4, 1)
+    vec = np.asarray((x, y, z, 1), dtype=get_precision()).reshape(4, 1)
     return Vector4(vec)
 
 
 def validate_vector4(vec: typing.Any) -> None:
     assert isinstance(vec, np.ndarray)
     assert vec.shape == (4, 1)
-    assert vec.dtype == np.float64
+    assert vec.dtype == get_precision()
 
 
 def validate_matrix4x4(matrix: typing.Any) -> None:
     assert isinstance(matrix, np.ndarray)
     assert matrix.shape == (4, 4)
-    assert matrix.dtype == np.float64
+    assert matrix.dtype == get_precision()
 
 
 def make_versor(vec: npt.ArrayLike) -> Vector4:
@@ -73,10 +115,10 @@ def make_versor(vec: npt.ArrayLike) -> Vector4:
     mas módulo=1 e coordenada homogenea=1.
     """
 
-    direction = np.asfarray(vec)[:3]  # x, y, z
+    direction = np.asarray(vec, dtype=get_precision()).reshape(-1)[:3]  # x, y, z
     norm = np.linalg.norm(direction)
 
-    versor = np.empty(shape=(4, 1))
+    versor = np.empty(shape=(4, 1), dtype=get_precision())
     versor[:3] = (direction / norm).reshape((3, 1))
     versor[3] = 1
 
@@ -110,16 +152,16 @@ def create_observer_transformation_matrix(
         u[:3].flatten(),
     )
 
-    matrix = np.empty(shape=(4, 4))
+    matrix = np.empty(shape=(4, 4), dtype=get_precision())
 
     matrix[0, :3] = u[:3].flatten()
-    matrix[0, 3] = offset[0]
+    matrix[0, 3] = offset[0, 0]
 
     matrix[1, :3] = v[:3].flatten()
-    matrix[1, 3] = offset[1]
+    matrix[1, 3] = offset[1, 0]
 
     matrix[2, :3] = w[:3].flatten()
-    matrix[2, 3] = offset[2]
+    matrix[2, 3] = offset[2, 0]
 
     matrix[3, :3] = 0
     matrix[3, 3] = 1
@@ -167,6 +209,122 @@ def perspective_project_object(obj: Object3D, zpp: float, zcp: float) -> Object3
     return [perspective_project_face(f, zpp=zpp, zcp=zcp) for f in obj]
 
 
+def validate_points4(points: typing.Any) -> None:
+    """
+    Valida um conjunto de N pontos homogêneos,
+    armazenados como linhas de um array (N, 4).
+    """
+    assert isinstance(points, np.ndarray)
+    assert points.ndim == 2
+    assert points.shape[1] == 4
+    assert points.dtype in SUPPORTED_PRECISIONS
+
+
+def make_points4(xyz: npt.ArrayLike, dtype: npt.DTypeLike | None = None) -> FloatArray:
+    """
+    Converte um array (N, 3) de coordenadas cartesianas em
+    um array (N, 4) de coordenadas homogêneas.
+    Se `dtype` não for informado, usa a precisão do contexto atual.
+    """
+    dtype = get_precision() if dtype is None else np.dtype(dtype)
+
+    cartesian = np.asarray(xyz).reshape(-1, 3)
+    points = np.ones(shape=(cartesian.shape[0], 4), dtype=dtype)
+    points[:, :3] = cartesian
+    return points
+
+
+def _validate_out(out: FloatArray, shape: tuple[int, ...], dtype: np.dtype) -> None:
+    assert out.shape == shape
+    assert out.dtype == dtype
+
+
+def transform_points_3d(
+    points: FloatArray,
+    trans: Matrix4x4,
+    out: FloatArray | None = None,
+) -> FloatArray:
+    """
+    Versão vetorizada de `transform_point_3d` para um array (N, 4).
+    O resultado tem a mesma precisão que `points` e, se `out` for informado,
+    é escrito nele (que não pode ser o próprio `points`).
+    """
+    validate_points4(points)
+    assert trans.shape == (4, 4)
+    if out is not None:
+        _validate_out(out, points.shape, points.dtype)
+
+    transformed: FloatArray = np.matmul(
+        points, trans.T.astype(points.dtype, copy=False), out=out
+    )
+    return transformed
+
+
+def perspective_project_points(
+    points: FloatArray,
+    zpp: float,
+    zcp: float,
+    out: FloatArray | None = None,
+) -> FloatArray:
+    """
+    Versão vetorizada de `perspective_project_point` para um array (N, 4).
+    Se `out` for informado, o resultado é escrito nele
+    (que pode ser o próprio `points`).
+    """
+    validate_points4(points)
+    if out is None:
+        out = np.empty_like(points)
+    _validate_out(out, points.shape, points.dtype)
+
+    # the last column holds the scale factor until x and y are scaled
+    scalar = points.dtype.type
+    factor = out[:, 3:4]
+    np.subtract(points[:, 2:3], scalar(zcp), out=factor)
+    np.divide(scalar(zpp - zcp), factor, out=factor)
+    # column by column, since broadcasting (N, 1) over (N, 2) needs a temporary
+    for column in (0, 1):
+        np.multiply(points[:, column], factor[:, 0], out=out[:, column])
+    out[:, 2] = zpp
+    out[:, 3] = 1
+
+    return out
+
+
+def normalize_points_2d(
+    points: FloatArray,
+    win: Window,
+    out: FloatArray | None = None,
+) -> FloatArray:
+    """
+    Versão vetorizada de `normalize_vector3_naive`.
+    Recebe um array (N, 2+) e retorna as coordenadas x e y
+    normalizadas em relação à `win`, como um array (N, 2),
+    que é escrito em `out`, se ele for informado.
+    """
+    assert points.ndim == 2
+    assert points.shape[1] >= 2
+
+    shape = (points.shape[0], 2)
+    if out is None:
+        out = np.empty(shape=shape, dtype=points.dtype)
+    _validate_out(out, shape, points.dtype)
+
+    scalar = points.dtype.type
+    for column, low, extent in ((0, win.min_x, win.width), (1, win.min_y, win.height)):
+        np.subtract(points[:, column], scalar(low), out=out[:, column])
+        np.divide(out[:, column], scalar(extent), out=out[:, column])
+    return out
+
+
+def validate_normalized_points(points: FloatArray) -> None:
+    assert points.ndim == 2
+    assert points.shape[1] == 2
+    # reductions, so validating does not allocate arrays as large as `points`
+    if points.size > 0:
+        assert points.min() >= 0
+        assert points.max() <= 1
+
+
 def face_to_polygon(face: Face) -> Polygon:
     poly = []
 
@@ -174,8 +332,8 @@ def face_to_polygon(face: Face) -> Polygon:
         validate_vector4(vec4)
         poly.append(
             make_vector3(
-                x=vec4[0],
-                y=vec4[1],
+                x=vec4[0, 0],
+                y=vec4[1, 0],
             )
         )
 
@@ -187,21 +345,21 @@ def object3d_to_object2d(obj: Object3D) -> Object2D:
 
 
 def make_vector3(x: float, y: float) -> Vector3:
-    vec = np.asfarray((x, y, 1)).reshape(3, 1)
+    vec = np.asarray((x, y, 1), dtype=get_precision()).reshape(3, 1)
     return Vector3(vec)
 
 
 def validate_vector3(vec: Vector3) -> None:
     assert isinstance(vec, np.ndarray)
     assert vec.shape == (3, 1)
-    assert vec.dtype == np.float64
+    assert vec.dtype == get_precision()
 
 
 def normalize_vector3_naive(pt: Vector3, win: Window) -> NormalizedPoint:
     validate_vector3(pt)
 
-    x = pt[0]
-    y = pt[1]
+    x = pt[0, 0]
+    y = pt[1, 0]
 
     normalized = make_vector3(
         x=(x - win.min_x) / win.width,
@@ -222,7 +380,7 @@ def normalize_polygon(poly: Polygon, win: Window) -> NormalizedPolygon:
 
 
 def make_translation_2d(delta_x: float, delta_y: float) -> Matrix3x3:
-    matrix = np.eye(3, 3)
+    matrix = np.eye(3, 3, dtype=get_precision())
     matrix[0, 2] = delta_x
     matrix[1, 2] = delta_y
     return Matrix3x3(matrix)
@@ -230,7 +388,7 @@ def make_translation_2d(delta_x: float, delta_y: float) -> Matrix3x3:
 
 def make_counterclockwise_rotation_2d(degrees: float) -> Matrix3x3:
     radians = degrees * np.pi / 180
-    matrix = np.eye(3, 3)
+    matrix = np.eye(3, 3, dtype=get_precision())
     matrix[0, 0] = np.cos(radians)
     matrix[0, 1] = -1 * np.sin(radians)
     matrix[1, 0] = np.sin(radians)
@@ -240,7 +398,7 @@ def make_counterclockwise_rotation_2d(degrees: float) -> Matrix3x3:
 
 
 def make_scale_2d(x_factor: float, y_factor: float) -> Matrix3x3:
-    matrix = np.eye(3, 3)
+    matrix = np.eye(3, 3, dtype=get_precision())
     matrix[0, 0] = x_factor
     matrix[1, 1] = y_factor
 
@@ -250,7 +408,7 @@ def make_scale_2d(x_factor: float, y_factor: float) -> Matrix3x3:
 def validate_matrix3x3(matrix: typing.Any) -> None:
     assert isinstance(matrix, np.ndarray)
     assert matrix.shape == (3, 3)
-    assert matrix.dtype == np.float64
+    assert matrix.dtype == get_precision()
 
 
 def transform_polygon(
@@ -270,7 +428,7 @@ def transform_polygon(
 
 def make_x_rotation_3d(degrees: float) -> Matrix4x4:
     radians = degrees * np.pi / 180
-    matrix = np.eye(4, 4)
+    matrix = np.eye(4, 4, dtype=get_precision())
 
     matrix[0, 0] = np.cos(radians)
     matrix[0, 2] = np.sin(radians)
@@ -282,7 +440,7 @@ def make_x_rotation_3d(degrees: float) -> Matrix4x4:
 
 def make_y_rotation_3d(degrees: float) -> Matrix4x4:
     radians = degrees * np.pi / 180
-    matrix = np.eye(4, 4)
+    matrix = np.eye(4, 4, dtype=get_precision())
 
     matrix[1, 1] = np.cos(radians)
     matrix[1, 2] = -np.sin(radians)